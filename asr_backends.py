@@ -0,0 +1,166 @@
+"""Speech recognition engines behind one transcribe(audio, **options) call.
+
+"whisper" is the openai-whisper reference implementation (PyTorch, fp32 on CPU). "faster-whisper"
+runs the same models through CTranslate2 with int8 weights, several times faster on CPU for the
+same accuracy. Both return whisper's result format: {"text": ..., "segments": [{start, end, text}]}.
+
+With the model name "auto", the candidate models are benchmarked on this machine (once, the
+choice is cached) and the largest one that stays under a real-time factor is used. They decode a
+real French utterance (samples/asr_benchmark.wav, `python bench_asr.py --record` makes one):
+Whisper's speed depends on the words it has to produce, a synthetic signal says little about it.
+Without it, the first start uses AUTO_FALLBACK and saves the user's first long enough command
+(asr_benchmark.wav), which the next start measures on.
+"""
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# Smallest to largest: a bigger model is never faster than a smaller one
+AUTO_CANDIDATES = ["tiny", "base", "small", "medium"]
+AUTO_CACHE = "asr_auto.json"
+AUTO_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples", "asr_benchmark.wav")
+AUTO_RECORDED = "asr_benchmark.wav" # The user's first command, when there is no sample above
+AUTO_RECORD_SECONDS = 3.0 # Shorter commands say little about the decoding speed
+AUTO_FALLBACK = "base" # Without a speech sample to measure on
+
+# Whisper options that faster-whisper understands under the same name
+FASTER_WHISPER_OPTIONS = ("language", "task", "initial_prompt", "beam_size", "best_of", "temperature",
+                          "condition_on_previous_text", "word_timestamps", "vad_filter")
+
+class WhisperBackend:
+    """openai-whisper (the reference PyTorch implementation)."""
+
+    engine = "whisper"
+
+    def __init__(self, model_name="base", compute_type=None):
+        import whisper
+        self.model_name = model_name
+        self.model = whisper.load_model(model_name)
+
+    def transcribe(self, audio, **options):
+        return self.model.transcribe(audio, **options)
+
+class FasterWhisperBackend:
+    """faster-whisper (CTranslate2), int8 by default."""
+
+    engine = "faster-whisper"
+
+    def __init__(self, model_name="base", compute_type="int8"):
+        from faster_whisper import WhisperModel
+        self.model_name = model_name
+        self.model = WhisperModel(model_name, device="cpu", compute_type=compute_type)
+
+    def transcribe(self, audio, **options):
+        kwargs = {key: value for key, value in options.items() if key in FASTER_WHISPER_OPTIONS}
+        segments, _ = self.model.transcribe(audio, **kwargs)
+        # The segments are generated lazily: decoding happens here
+        segments = [{"start": seg.start, "end": seg.end, "text": seg.text} for seg in segments]
+        return {"text": "".join(seg["text"] for seg in segments), "segments": segments}
+
+ENGINES = {"whisper": WhisperBackend, "faster-whisper": FasterWhisperBackend}
+
+def engine_class(engine):
+    """The backend class, falling back to openai-whisper if faster-whisper isn't installed."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown ASR engine: {engine}")
+    if engine == "faster-whisper":
+        try:
+            import faster_whisper
+        except ImportError:
+            print("faster-whisper is not installed, using openai-whisper")
+            engine = "whisper"
+    return ENGINES[engine]
+
+def benchmark_audio(path=AUTO_SAMPLE):
+    """The speech sample as Whisper's float32 audio, None if there is none."""
+    if not path or not os.path.exists(path):
+        return None
+    from audio_source import load_audio
+    return load_audio(path).astype(np.float32) / 32768.0
+
+def benchmark_sample():
+    """The speech sample "auto" measures on: the shipped one, else the recorded one (None if neither)."""
+    for path in (AUTO_SAMPLE, AUTO_RECORDED):
+        if os.path.exists(path):
+            return path
+    return None
+
+def save_benchmark_sample(pcm, path=AUTO_RECORDED):
+    """Saves a recorded command (16 kHz mono int16) as the speech sample for the next start."""
+    import wave
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(np.asarray(pcm, dtype=np.int16).tobytes())
+    print(f"ASR auto: your command was saved as {path}, the models are measured on it at the next start")
+
+def real_time_factor(backend, audio, **options):
+    backend.transcribe(audio[:SAMPLE_RATE], **options) # Warm-up (lazy init, caches)
+    start = time.perf_counter()
+    backend.transcribe(audio, **options)
+    return (time.perf_counter() - start) / (len(audio) / SAMPLE_RATE)
+
+def machine_key(engine, compute_type, max_rtf):
+    return f"{engine}/{compute_type}/rtf{max_rtf}/{platform.machine()}/{os.cpu_count()}cpu"
+
+def select_model(engine, compute_type="int8", max_rtf=0.3, candidates=AUTO_CANDIDATES, audio=None,
+                 cache_path=AUTO_CACHE, sample_path=None):
+    """Largest candidate whose real-time factor is <= max_rtf here (the smallest if none is).
+
+    The result is cached per engine/machine in `cache_path`, the benchmark only runs once.
+    Without speech to measure on (`audio` or the sample file, benchmark_sample() by default),
+    AUTO_FALLBACK is used, not cached.
+    """
+    cls = engine_class(engine)
+    key = machine_key(cls.engine, compute_type, max_rtf)
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+    if key in cache and cache[key]["model"] in candidates:
+        return cache[key]["model"]
+
+    if audio is None:
+        sample_path = sample_path or benchmark_sample()
+        audio = benchmark_audio(sample_path)
+    if audio is None:
+        fallback = AUTO_FALLBACK if AUTO_FALLBACK in candidates else candidates[0]
+        print(f"ASR auto: no speech sample to measure on ({sample_path or AUTO_SAMPLE} / {AUTO_RECORDED}),"
+              f" NOT benchmarked: using {fallback} until your first command is recorded")
+        return fallback
+    chosen = candidates[0]
+    results = {}
+    for name in candidates:
+        backend = cls(name, compute_type)
+        rtf = results[name] = real_time_factor(backend, audio, language="fr", fp16=False)
+        del backend
+        print(f"ASR auto: {cls.engine} {name} RTF {rtf:.2f} (budget {max_rtf})")
+        if rtf > max_rtf:
+            break # The next ones are bigger
+        chosen = name
+
+    cache[key] = {"model": chosen, "rtf": results, "time": time.time()}
+    if cache_path:
+        try:
+            with open(cache_path, "w") as f:
+                json.dump(cache, f, indent=2)
+        except OSError as e:
+            print(f"ASR auto: can't save the choice ({e})")
+    return chosen
+
+def load_backend(engine="whisper", model_name="base", compute_type="int8", max_rtf=0.3):
+    """Loads an engine ("whisper" or "faster-whisper") with a model name or "auto"."""
+    cls = engine_class(engine)
+    if model_name == "auto":
+        model_name = select_model(cls.engine, compute_type, max_rtf)
+    print(f"ASR: {cls.engine} {model_name}" + (f" ({compute_type})" if cls is FasterWhisperBackend else ""))
+    return cls(model_name, compute_type)
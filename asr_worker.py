@@ -0,0 +1,296 @@
+"""Whisper in a separate process.
+
+The ASR worker process owns the Whisper model, so inference never holds the GIL of the Qt/wake
+word process and a crash or OOM in the model doesn't take the overlay down (the worker is
+restarted automatically). Audio goes through shared memory, only a small header is pickled.
+
+ASRClient exposes the same transcribe(audio, **options) call as a Whisper model, plus priorities
+(the final tail of an utterance goes before background partial passes) and cancellation. Whisper
+can't be interrupted: a cancelled request the worker is already on is dropped when it returns,
+only a worker stuck on one request for `request_timeout` seconds is killed and restarted.
+"""
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+PRIORITY_FINAL = 0 # End of utterance: someone is waiting
+PRIORITY_PARTIAL = 1 # Background streaming passes
+
+class ASRCancelled(Exception):
+    """The request was cancelled before its result arrived."""
+
+class ASRError(Exception):
+    """The worker failed to transcribe (or died too many times)."""
+
+def _serve(backend_options, shm_name, capacity, conn):
+    """Entry point of the worker process."""
+    from asr_backends import load_backend
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        model = load_backend(**backend_options)
+        conn.send(("ready",))
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return
+            if message is None:
+                return
+            request_id, source, options = message
+            try:
+                if isinstance(source, str):
+                    audio = source # File path (WAV fallback)
+                else:
+                    # Copy out of shared memory: the client may reuse it for the next request
+                    audio = np.ndarray((source,), dtype=np.float32, buffer=shm.buf[:capacity * 4]).copy()
+                result = model.transcribe(audio, **options)
+                segments = [{"start": seg["start"], "end": seg["end"], "text": seg["text"]} for seg in result.get("segments", [])]
+                conn.send(("result", request_id, {"text": result["text"], "segments": segments}))
+            except Exception as e:
+                conn.send(("error", request_id, str(e)))
+    finally:
+        shm.close()
+
+class ASRRequest:
+    def __init__(self, request_id, priority, audio, options):
+        self.id = request_id
+        self.priority = priority
+        self.audio = audio
+        self.options = options
+        self.submitted = time.time()
+        self.dispatched = None
+        self.finished = None
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+        self.cancelled = False
+        self.attempts = 0
+
+    def result(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise ASRError("ASR timeout")
+        if self.cancelled:
+            raise ASRCancelled()
+        if self.error:
+            raise ASRError(self.error)
+        return self.response
+
+class ASRClient:
+    """Owns the ASR worker process: queue, dispatch, cancellation and restarts."""
+
+    def __init__(self, model_name="base", max_seconds=60, max_attempts=2, on_error=None,
+                 engine="whisper", compute_type="int8", max_rtf=0.3, request_timeout=120):
+        self.model_name = model_name
+        # See asr_backends.load_backend ("auto" benchmarks the models in the worker process)
+        self.backend_options = {"engine": engine, "model_name": model_name, "compute_type": compute_type, "max_rtf": max_rtf}
+        self.on_error = on_error # Called with a message when the worker can't be started
+        self.capacity = int(max_seconds * 16000) # float32 samples in shared memory
+        self.max_attempts = max_attempts # A request that killed the worker is retried once
+        self.request_timeout = request_timeout # Longer than that on one request: the worker is stuck
+        self.context = multiprocessing.get_context("spawn") # No fork of the Qt process
+        self.shm = shared_memory.SharedMemory(create=True, size=self.capacity * 4)
+        self.lock = threading.Condition()
+        self.queue = [] # heap of (priority, seq, request)
+        self.seq = itertools.count()
+        self.in_flight = None
+        self.process = None
+        self.conn = None
+        self.ready = threading.Event()
+        self.restarts = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    # --- Public API ---
+
+    def submit(self, audio, priority=PRIORITY_FINAL, **options):
+        """Queues a transcription. `audio` is a float32 array (16 kHz) or a file path."""
+        if not isinstance(audio, str):
+            audio = np.asarray(audio, dtype=np.float32)
+            if len(audio) > self.capacity:
+                audio = audio[-self.capacity:]
+        request = ASRRequest(next(self.seq), priority, audio, options)
+        with self.lock:
+            heapq.heappush(self.queue, (priority, request.id, request))
+            self.lock.notify_all()
+        return request
+
+    def transcribe(self, audio, priority=PRIORITY_FINAL, timeout=None, **options):
+        """Same call as whisper's model.transcribe, blocking until the result arrives."""
+        return self.submit(audio, priority, **options).result(timeout)
+
+    def cancel(self, request):
+        """Drops a request: its caller gets ASRCancelled right away.
+
+        A queued request never reaches the worker. The one the worker is already on keeps it
+        busy until it returns (restarting the worker would reload the whole model), and its
+        result is thrown away.
+        """
+        with self.lock:
+            if request.done.is_set():
+                return
+            request.cancelled = True
+            if self.in_flight is not request:
+                self.queue = [item for item in self.queue if item[2] is not request]
+                heapq.heapify(self.queue)
+            request.done.set()
+            self.lock.notify_all()
+
+    def cancel_all(self, priority=None):
+        """Cancels every request (or only the ones of a given priority)."""
+        with self.lock:
+            requests = [item[2] for item in self.queue]
+            if self.in_flight:
+                requests.append(self.in_flight)
+        for request in requests:
+            if priority is None or request.priority == priority:
+                self.cancel(request)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.thread.join(5)
+        self._stop_process()
+        self.shm.close()
+        self.shm.unlink()
+
+    # --- Worker process management ---
+
+    def _spawn(self):
+        self.ready.clear()
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_serve,
+            args=(self.backend_options, self.shm.name, self.capacity, child_conn),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        start = time.time()
+        try:
+            message = self.conn.recv() # Blocks while the model loads
+        except EOFError:
+            raise ASRError("ASR worker died while loading the model")
+        if message[0] != "ready":
+            raise ASRError(f"Unexpected message from the ASR worker: {message}")
+        print(f"ASR worker ready (pid {self.process.pid}, {time.time() - start:.1f}s)")
+        self.ready.set()
+
+    def _stop_process(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.process = None
+        self.ready.clear()
+
+    def _finish(self, request, response=None, error=None):
+        with self.lock:
+            if self.in_flight is request:
+                self.in_flight = None
+            if request.cancelled:
+                self.lock.notify_all()
+                return # Its caller is gone, the result is dropped
+            request.response = response
+            request.error = error
+            request.finished = time.time()
+            request.done.set()
+            self.lock.notify_all()
+
+    def _run(self):
+        failures = 0
+        while not self.closed:
+            if self.process is None or not self.process.is_alive():
+                if self.process is not None:
+                    self.restarts += 1
+                    print(f"ASR worker died, restarting (#{self.restarts})")
+                    self._requeue_in_flight()
+                try:
+                    self._spawn()
+                    failures = 0
+                except Exception as e:
+                    failures += 1
+                    print(f"ASR worker start error: {e}")
+                    self._stop_process()
+                    if failures >= 3:
+                        self._fail_all(str(e))
+                        if failures == 3 and self.on_error:
+                            self.on_error(str(e))
+                    time.sleep(min(failures, 5))
+                    continue
+
+            with self.lock:
+                stuck = self.in_flight
+                if stuck and time.time() - stuck.dispatched > self.request_timeout:
+                    # Hung (not merely slow): the only way out is a new worker
+                    self.in_flight = None
+                    self.restarts += 1
+                    print(f"ASR worker stuck for {self.request_timeout}s, restarting (#{self.restarts})")
+                    self._stop_process()
+                    if not stuck.done.is_set():
+                        stuck.error = "ASR worker stuck on this request"
+                        stuck.done.set()
+                    continue
+                if self.in_flight is None and self.queue:
+                    _, _, request = heapq.heappop(self.queue)
+                    self.in_flight = request
+                    self._dispatch(request)
+                elif self.in_flight is None:
+                    self.lock.wait(0.5)
+                    continue
+
+            # Wait for the result, waking up regularly to handle cancellations
+            try:
+                if not self.conn.poll(0.05):
+                    continue
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                continue # The process died: handled at the top of the loop
+            kind, request_id, payload = message
+            request = self.in_flight
+            if request is None or request.id != request_id:
+                continue
+            if kind == "result":
+                self._finish(request, response=payload)
+            else:
+                self._finish(request, error=payload)
+
+    def _dispatch(self, request):
+        request.attempts += 1
+        request.dispatched = time.time()
+        if isinstance(request.audio, str):
+            source = request.audio
+        else:
+            source = len(request.audio)
+            # One memcpy into shared memory, nothing big goes through the pipe
+            np.ndarray((self.capacity,), dtype=np.float32, buffer=self.shm.buf)[:source] = request.audio
+        try:
+            self.conn.send((request.id, source, request.options))
+        except (BrokenPipeError, OSError):
+            pass # Worker died, it will be restarted and the request retried
+
+    def _requeue_in_flight(self):
+        with self.lock:
+            request = self.in_flight
+            self.in_flight = None
+            if request is None or request.done.is_set():
+                return
+            if request.attempts < self.max_attempts:
+                heapq.heappush(self.queue, (request.priority, request.id, request))
+                return
+        self._finish(request, error="ASR worker crashed on this request")
+
+    def _fail_all(self, error):
+        with self.lock:
+            requests = [item[2] for item in self.queue]
+            self.queue = []
+        for request in requests:
+            self._finish(request, error=error)
@@ -0,0 +1,141 @@
+"""Microphone capture in a dedicated thread, into a preallocated ring buffer.
+
+The capture thread only reads the audio stream and copies it into a fixed-size int16 NumPy ring
+buffer, so nothing is lost while the consumers (wake word, VAD, Whisper) are busy. Samples are
+addressed by absolute position (number of samples captured since start): each consumer has its
+own cursor, reads at its own pace and gets zero-copy views when the slice doesn't wrap around.
+"""
+import threading
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+class RingBuffer:
+    """Fixed-size int16 ring buffer, addressed by absolute sample position."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.int16) # Preallocated once
+        self.position = 0 # Total samples written
+        self.cond = threading.Condition()
+        self.closed = False
+
+    @property
+    def oldest(self):
+        """Oldest position still in the buffer."""
+        return max(0, self.position - self.capacity)
+
+    def write(self, samples):
+        total = len(samples)
+        if total > self.capacity:
+            samples = samples[-self.capacity:]
+        n = len(samples)
+        with self.cond:
+            start = (self.position + total - n) % self.capacity
+            first = min(n, self.capacity - start)
+            self.buffer[start:start + first] = samples[:first]
+            if first < n:
+                self.buffer[:n - first] = samples[first:]
+            self.position += total
+            self.cond.notify_all()
+
+    def read(self, start, end):
+        """Samples [start, end). A view on the buffer when it doesn't wrap (valid until overwritten)."""
+        start = max(start, self.oldest)
+        end = min(end, self.position)
+        if end <= start:
+            return self.buffer[:0]
+        i = start % self.capacity
+        j = i + (end - start)
+        if j <= self.capacity:
+            return self.buffer[i:j]
+        return np.concatenate((self.buffer[i:], self.buffer[:j - self.capacity]))
+
+    def wait_for(self, position, timeout=None):
+        """Blocks until `position` samples have been written (or the buffer is closed)."""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.position >= position or self.closed, timeout)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class RingReader:
+    """A consumer's cursor in the ring buffer."""
+
+    def __init__(self, ring, position=None):
+        self.ring = ring
+        self.position = ring.position if position is None else position
+        self.dropped = 0 # Samples overwritten before this reader got to them
+
+    def read(self, n, timeout=None):
+        """Next `n` samples (blocking). Returns fewer only if the capture stopped."""
+        self.ring.wait_for(self.position + n, timeout)
+        if self.position < self.ring.oldest:
+            # Too slow: skip what was overwritten
+            self.dropped += self.ring.oldest - self.position
+            self.position = self.ring.oldest
+        chunk = self.ring.read(self.position, self.position + n)
+        self.position += len(chunk)
+        return chunk
+
+    @property
+    def seconds(self):
+        """Audio clock of this reader (seconds of audio consumed), unaffected by processing delays."""
+        return self.position / SAMPLE_RATE
+
+class AudioCapture:
+    """Reads `stream` (anything with PyAudio's read(n) -> bytes) in its own thread."""
+
+    def __init__(self, stream, chunk=1000, seconds=60, clock=time.monotonic):
+        self.stream = stream
+        self.chunk = chunk
+        self.ring = RingBuffer(int(seconds * SAMPLE_RATE))
+        self.clock = clock
+        self.overruns = 0 # Input overflows (audio the driver dropped because we read too late)
+        self.lost_samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def reader(self, preroll=0):
+        """New cursor starting `preroll` samples before the current position."""
+        return RingReader(self.ring, max(self.ring.oldest, self.ring.position - preroll))
+
+    def _run(self):
+        received = None # Samples we should have by now if nothing was lost, anchored on the clock
+        while not self.stop_event.is_set():
+            before = self.clock()
+            try:
+                # No exception on overflow: it would throw away the chunk the driver still has
+                data = self.stream.read(self.chunk, exception_on_overflow=False)
+            except Exception as e:
+                print(f"Audio capture error: {e}")
+                break
+            if not data:
+                break # End of stream
+            samples = np.frombuffer(data, dtype=np.int16)
+            now = self.clock()
+            if received is None:
+                anchor = now
+                received = 0
+            received += len(samples)
+            if now - before >= 0.5 * self.chunk / SAMPLE_RATE:
+                # The read waited for fresh audio, so nothing is queued in the driver: if the
+                # clock says more audio was recorded than we got, the driver dropped it
+                expected = int((now - anchor) * SAMPLE_RATE)
+                if expected - received > 2 * self.chunk:
+                    self.overruns += 1
+                    self.lost_samples += expected - received
+                    print(f"Audio overrun #{self.overruns}: {(expected - received) / SAMPLE_RATE:.2f}s lost")
+                anchor, received = now, 0 # Re-anchored: the sound card's clock drifts from ours
+            self.ring.write(samples)
+        self.ring.close()
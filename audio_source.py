@@ -0,0 +1,132 @@
+"""Where the worker's audio comes from: the microphone, or recorded files for offline replays.
+
+A source's open() returns a stream with PyAudio's read(n) -> bytes (16 kHz mono int16), which is
+all AudioCapture needs. FileSource plays a script of recordings and pauses, paced like a real
+microphone, and remembers where each recording starts and ends so a benchmark can compare the
+worker's reactions with the actual audio.
+"""
+import os
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg")
+
+class MicrophoneSource:
+    """The default input device through PyAudio."""
+
+    def __init__(self, frames_per_buffer=8000):
+        self.frames_per_buffer = frames_per_buffer
+        self.pyaudio = None
+        self.stream = None
+
+    def open(self):
+        import pyaudio
+        self.pyaudio = pyaudio.PyAudio()
+        self.stream = self.pyaudio.open(format=pyaudio.paInt16, channels=1, rate=SAMPLE_RATE, input=True,
+                                        frames_per_buffer=self.frames_per_buffer)
+        self.stream.start_stream()
+        return self.stream
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+        if self.pyaudio is not None:
+            self.pyaudio.terminate()
+
+def load_audio(path):
+    """Reads a WAV (or FLAC & co. with soundfile) as 16 kHz mono int16."""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, 'rb') as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit PCM")
+            rate = wf.getframerate()
+            audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            audio = audio.reshape(-1, wf.getnchannels()).astype(np.float32)
+    else:
+        import soundfile
+        audio, rate = soundfile.read(path, dtype="int16", always_2d=True)
+        audio = audio.astype(np.float32)
+    audio = audio.mean(axis=1) # Mono
+    if rate != SAMPLE_RATE:
+        # Linear interpolation is plenty for speech recognition
+        n = int(len(audio) * SAMPLE_RATE / rate)
+        audio = np.interp(np.arange(n) * rate / SAMPLE_RATE, np.arange(len(audio)), audio)
+    return np.clip(np.round(audio), -32768, 32767).astype(np.int16)
+
+def find_recordings(paths):
+    """Audio files in the given folders (sorted) and files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+class Segment:
+    """A recording of the script and where it lands in the stream (in samples)."""
+
+    def __init__(self, path, start, end):
+        self.path = path
+        self.start = start
+        self.end = end
+
+class FileSource:
+    """Plays a script of recordings (paths) and pauses (seconds of background noise).
+
+    realtime: deliver audio at the microphone's pace (times `speed`), otherwise as fast as read
+    noise_level: standard deviation of the "silence" between recordings (pure zeros are unrealistic)
+    tail: seconds of silence after the last recording, so the end of speech can be detected
+    """
+
+    def __init__(self, script, realtime=True, speed=1.0, noise_level=30, tail=3.0, seed=0):
+        self.realtime = realtime
+        self.speed = speed
+        rng = np.random.default_rng(seed)
+        parts = []
+        self.segments = []
+        position = 0
+        for item in list(script) + [tail]:
+            if isinstance(item, (int, float)):
+                part = rng.normal(0, noise_level, int(item * SAMPLE_RATE)).astype(np.int16)
+            else:
+                part = load_audio(item)
+                self.segments.append(Segment(item, position, position + len(part)))
+            parts.append(part)
+            position += len(part)
+        self.audio = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16)
+        self.position = 0
+        self.start_time = None
+
+    @property
+    def duration(self):
+        return len(self.audio) / SAMPLE_RATE
+
+    def open(self):
+        return self
+
+    def close(self):
+        self.position = len(self.audio)
+
+    def wall_time(self, position):
+        """When the sample at `position` was (or will be) delivered, in time.time() terms."""
+        return self.start_time + position / SAMPLE_RATE / self.speed
+
+    def read(self, n, exception_on_overflow=True):
+        """Same call as PyAudio's stream.read, returns b"" at the end of the script."""
+        if self.start_time is None:
+            self.start_time = time.time()
+        end = min(self.position + n, len(self.audio))
+        if self.realtime:
+            # A microphone only returns a buffer once it has been recorded
+            delay = self.wall_time(end) - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        data = self.audio[self.position:end].tobytes()
+        self.position = end
+        return data
@@ -0,0 +1,69 @@
+"""Real-time factor of each ASR engine and model on this machine.
+
+Usage: python bench_asr.py [utterance.wav ...] [--engines whisper faster-whisper] [--models tiny base small]
+       python bench_asr.py --record [--seconds 6]
+RTF = transcription time / audio duration (0.3 means 3s of speech are transcribed in 0.9s).
+Without WAV files the speech sample the "auto" model choice uses is decoded (samples/asr_benchmark.wav).
+--record records that sample from the microphone: say a typical command, in French.
+"""
+import os
+import sys
+import wave
+import argparse
+
+import numpy as np
+
+from asr_backends import ENGINES, AUTO_CANDIDATES, AUTO_SAMPLE, SAMPLE_RATE, benchmark_audio, real_time_factor
+from audio_source import load_audio
+
+def record_sample(path, seconds):
+    import pyaudio
+    audio = pyaudio.PyAudio()
+    stream = audio.open(format=pyaudio.paInt16, channels=1, rate=SAMPLE_RATE, input=True, frames_per_buffer=1000)
+    print(f"Recording {seconds:g}s, speak now...")
+    data = stream.read(int(seconds * SAMPLE_RATE), exception_on_overflow=False)
+    stream.close()
+    audio.terminate()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(data)
+    print(f"Saved {path} (delete asr_auto.json so that 'auto' measures again)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wavs", nargs="*")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES))
+    parser.add_argument("--models", nargs="+", default=AUTO_CANDIDATES[:3])
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--record", action="store_true", help=f"Record the speech sample ({AUTO_SAMPLE})")
+    parser.add_argument("--seconds", type=float, default=6.0)
+    args = parser.parse_args()
+
+    if args.record:
+        record_sample(AUTO_SAMPLE, args.seconds)
+        return 0
+    if args.wavs:
+        audio = np.concatenate([load_audio(path) for path in args.wavs]).astype(np.float32) / 32768.0
+    else:
+        audio = benchmark_audio()
+        if audio is None:
+            print(f"No speech sample: give WAV files or record one with --record ({AUTO_SAMPLE})")
+            return 1
+    print(f"{len(audio) / 16000:.1f}s of audio")
+
+    for engine in args.engines:
+        for model in args.models:
+            try:
+                backend = ENGINES[engine](model, args.compute_type)
+            except ImportError as e:
+                print(f"{engine:<15} not installed ({e})")
+                break
+            rtf = real_time_factor(backend, audio, language="fr", fp16=False)
+            print(f"{engine:<15} {model:<8} RTF {rtf:.3f}")
+            del backend
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Load test of the engine daemon with scripted text commands (no audio, no ASR).
+
+Usage: python bench_engine.py [--socket PATH] [--count 50] [--commands commands.txt] [--interval 0]
+Start the engine first, without the response cache (the same few questions would be cache hits
+after the first round) and with a throwaway history instead of yours:
+  python engine.py --no-audio --llm stub --no-cache --history /tmp/bench-history.jsonl
+(--llm stub measures the engine alone.) Each command is sent once the previous answer is finished
+(or `--interval` seconds after it was sent, to fire commands faster than they are answered: the
+newer ones supersede the older ones). Events are matched to their command by its ID, a late event
+of a superseded command isn't counted for the next one. Reports p50/p95 of:
+  reply         command sent -> acknowledged (fast track, cache, prompt building)
+  first token   command sent -> first partial answer
+  finished      command sent -> complete answer
+plus the throughput and the engine's own metrics.
+"""
+import sys
+import time
+import queue
+import argparse
+import threading
+
+import numpy as np
+
+from engine_client import EngineClient, socket_path
+
+COMMANDS = [
+    "quelle est la capitale du Japon",
+    "explique-moi la différence entre TCP et UDP",
+    "donne-moi une idée de dîner rapide",
+    "combien font 17 fois 23",
+    "c'est quoi un inode",
+]
+
+def percentiles(values):
+    if not values:
+        return "      n/a"
+    p50, p95 = np.percentile(values, [50, 95])
+    return f"p50 {p50*1000:7.1f} ms   p95 {p95*1000:7.1f} ms   (n={len(values)})"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default=socket_path())
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--commands", help="One command per line (default: a few questions)")
+    parser.add_argument("--interval", type=float, help="Seconds between commands instead of waiting for the answer")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    commands = COMMANDS
+    if args.commands:
+        with open(args.commands) as f:
+            commands = [line.strip() for line in f if line.strip()]
+
+    events = queue.Queue()
+    subscriber = EngineClient(args.socket)
+    stream = subscriber.subscribe()
+    threading.Thread(target=lambda: [events.put((time.time(), event)) for event in stream], daemon=True).start()
+    client = EngineClient(args.socket)
+
+    replies = []
+    sent, first_tokens, finished = {}, {}, {} # Command ID -> time sent, first token, answer (or error)
+    cancelled = set() # Superseded IDs
+    def handle(timestamp, event):
+        request = event.get("id")
+        if request not in sent:
+            return # Someone else's (a wake word...)
+        if event["event"] == "partial":
+            first_tokens.setdefault(request, timestamp - sent[request])
+        elif event["event"] in ("finished", "error"):
+            finished.setdefault(request, timestamp - sent[request])
+        elif event["event"] == "stage" and event["name"] == "llm_cancelled":
+            cancelled.add(request)
+    def wait(until, request=None):
+        """Handles events until `until`, or until `request` is answered."""
+        while request is None or (request not in finished and request not in cancelled):
+            try:
+                handle(*events.get(timeout=max(until - time.time(), 0)))
+            except queue.Empty:
+                return
+
+    start = time.time()
+    for i in range(args.count):
+        command = commands[i % len(commands)]
+        before = time.time()
+        request = client.text(command)["id"]
+        sent[request] = before
+        replies.append(time.time() - before)
+        if args.interval is not None:
+            wait(before + args.interval) # Next command (superseding this one)
+        else:
+            wait(before + args.timeout, request)
+    wait(time.time() + args.timeout, request) # The last answer
+    while not events.empty(): # And whatever came with it
+        handle(*events.get_nowait())
+    elapsed = time.time() - start
+
+    print(f"{args.count} commands in {elapsed:.1f}s ({args.count / elapsed:.2f}/s), {len(finished)} answered, "
+          f"{len(cancelled)} superseded")
+    for stage, values in (("reply", replies), ("first token", list(first_tokens.values())),
+                          ("finished", list(finished.values()))):
+        print(f"{stage:<12} {percentiles(values)}")
+    metrics = client.metrics()
+    print(f"scheduler    {metrics['scheduler']}")
+    for name, stage in sorted(metrics["stages"].items()):
+        if stage["p50"] is not None:
+            print(f"  {name:<18} p50 {stage['p50']*1000:7.1f} ms   p95 {stage['p95']*1000:7.1f} ms   (n={stage['count']})")
+    client.close()
+    subscriber.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Microbenchmark of the fast-track intent matcher.
+
+Usage: python bench_intents.py [--runs 20000]
+Matches typical commands against the real table and against synthetic tables of growing size,
+next to a naive "keyword in text" scan, to check that lookup cost stays flat.
+"""
+import sys
+import time
+import argparse
+
+from intents import Intent, IntentMatcher, load_intents, normalize
+
+COMMANDS = [
+    "Ouvre Firefox.",
+    "Open the project Ok-Claude.",
+    "open youtube in firefox please",
+    "Quelle heure est-il à Tokyo ?",
+    "Lance le terminal et ouvre github",
+    "What's the command to restart pipewire?",
+]
+
+def synthetic_table(size):
+    intents = [Intent(f"App {i}", "app", [f"app{i}", f"application numero {i}"], exec=[f"app{i}"]) for i in range(size)]
+    return intents
+
+def bench(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        for command in COMMANDS:
+            fn(command)
+    return (time.perf_counter() - start) / (runs * len(COMMANDS)) * 1e6
+
+def naive_matcher(intents):
+    keywords = [(normalize(k), intent) for intent in intents for k in intent.keywords]
+    def match(text):
+        text = normalize(text)
+        for keyword, intent in keywords:
+            if keyword in text:
+                return intent
+        return None
+    return match
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20000)
+    args = parser.parse_args()
+
+    table = load_intents("intents.json")
+    print(f"intents.json ({len(table.intents)} intents): {bench(table.match, args.runs):.1f} us/command")
+
+    for size in (10, 100, 1000):
+        intents = table.intents + synthetic_table(size)
+        matcher = IntentMatcher(intents, ["open", "launch", "ouvre", "lance"])
+        naive = naive_matcher(intents)
+        print(f"+{size:>4} synthetic intents: automaton {bench(matcher.match, args.runs // 10):.1f} us/command | "
+              f"naive scan {bench(naive, args.runs // 10):.1f} us/command")
+
+if __name__ == "__main__":
+    sys.exit(main())
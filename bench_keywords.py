@@ -0,0 +1,206 @@
+"""Keyword spotting on replayed audio: grammar spotters vs the old open-vocabulary substring check.
+
+Usage: python bench_keywords.py corpus/ [--vosk-model models/fr] [--confidence 0.7] [--thresholds 0.4 0.6 0.8]
+                                        [--asr-engine faster-whisper] [--asr-model base] [--cost-samples 5]
+The corpus is a folder of WAV/FLAC recordings. A sidecar JSON (cmd.wav -> cmd.json) lists the
+phrases actually spoken: {"keywords": ["claude", "envoyer"]}. Recordings without one (podcasts,
+TV, conversations) are negatives: every detection there is a false accept.
+For the wake word, stop words and dictation triggers it reports the CPU time per hour of audio,
+false rejects (missed keywords) and false accepts (per file and per hour of negative audio).
+The wake word is also run through the two-stage cascade (grammar spotter + WakeVerifier) for each
+verifier threshold, with the CPU saved: the false wakes it avoids, each costing a recorded and
+transcribed conversation, minus the verifier's own CPU. That cost is measured on the corpus: after
+the first --cost-samples false wakes of the grammar spotter, the capture the worker would start
+(VAD and trigger spotter until the end of speech, 20 s at most) and a Whisper pass on it.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+from audio_source import load_audio, find_recordings, SAMPLE_RATE
+from keyword_spotter import KeywordSpotter, WakeVerifier, WAKE_PHRASES, STOP_PHRASES, TRIGGER_PHRASES, normalize_phrase
+from vad import make_vad
+
+CHUNK = 2000
+# What the worker does after a wake word (worker.py)
+PREROLL_SECONDS = 0.5
+MAX_CAPTURE_SECONDS = 20
+VAD_HANGOVER_MS = 1200
+WAKE_VERIFY_POSTROLL = 0.2
+
+class SubstringSpotter:
+    """The old way: full-vocabulary recognizer, phrase searched in the partial text."""
+
+    def __init__(self, model, phrases):
+        from vosk import KaldiRecognizer
+        self.rec = KaldiRecognizer(model, SAMPLE_RATE)
+        self.phrases = [normalize_phrase(p) for p in phrases]
+
+    def reset(self):
+        self.rec.Reset()
+
+    def feed(self, data):
+        if self.rec.AcceptWaveform(data):
+            text = json.loads(self.rec.Result()).get("text", "")
+        else:
+            text = json.loads(self.rec.PartialResult()).get("partial", "")
+        for phrase in self.phrases:
+            if phrase in text.lower():
+                self.rec.Reset()
+                return phrase
+        return None
+
+class CascadeSpotter:
+    """Grammar spotter whose detections are confirmed by a WakeVerifier on the last seconds of audio."""
+
+    def __init__(self, spotter, verifier, window_seconds=1.5, postroll_seconds=WAKE_VERIFY_POSTROLL):
+        self.spotter = spotter
+        self.verifier = verifier
+        self.window_bytes = int(window_seconds * SAMPLE_RATE) * 2
+        self.postroll_bytes = int(postroll_seconds * SAMPLE_RATE) * 2
+        self.window = bytearray()
+        self.pending = None # Detected, verified once the post-roll is in the window
+        self.pending_bytes = 0
+
+    def reset(self):
+        self.spotter.reset()
+        self.window.clear()
+        self.pending = None
+
+    def feed(self, data):
+        self.window += data
+        del self.window[:-self.window_bytes]
+        if self.pending is None:
+            self.pending = self.spotter.feed(data)
+            self.pending_bytes = 0
+            if self.pending is None:
+                return None
+        else:
+            self.pending_bytes += len(data)
+        if self.pending_bytes < self.postroll_bytes:
+            return None
+        phrase, self.pending = self.pending, None
+        self.spotter.reset()
+        return phrase if self.verifier.verify(bytes(self.window))[0] else None
+
+def labels(path):
+    sidecar = os.path.splitext(path)[0] + ".json"
+    if not os.path.exists(sidecar):
+        return set()
+    with open(sidecar) as f:
+        return {normalize_phrase(k) for k in json.load(f).get("keywords", [])}
+
+def run(spotter, audio):
+    """Detections in one recording and the CPU time it took."""
+    spotter.reset()
+    detections = []
+    start = time.process_time()
+    for i in range(0, len(audio), CHUNK):
+        phrase = spotter.feed(audio[i:i + CHUNK].tobytes())
+        if phrase:
+            detections.append(phrase)
+    return detections, time.process_time() - start
+
+def evaluate(name, spotter, phrases, corpus):
+    phrases = {normalize_phrase(p) for p in phrases}
+    cpu = audio_seconds = negative_seconds = 0.0
+    positives = missed = negatives = false_files = false_count = 0
+    for path, audio, spoken in corpus:
+        detections, seconds = run(spotter, audio)
+        cpu += seconds
+        audio_seconds += len(audio) / SAMPLE_RATE
+        expected = spoken & phrases
+        wrong = [d for d in detections if d not in expected]
+        if expected:
+            positives += 1
+            missed += not any(d in expected for d in detections)
+        else:
+            negatives += 1
+            negative_seconds += len(audio) / SAMPLE_RATE
+        false_count += len(wrong)
+        false_files += bool(wrong) and not expected
+    hours = audio_seconds / 3600
+    fr = f"{missed}/{positives}" if positives else "n/a"
+    fa_rate = f"{false_count / (negative_seconds / 3600):.1f}/h" if negative_seconds else "n/a"
+    print(f"  {name:<22} CPU {cpu / hours:7.0f} s per audio hour ({cpu / audio_seconds * 100:5.2f}% of a core) | "
+          f"false rejects {fr} | false accepts {false_files}/{negatives} negative files, {false_count} total, {fa_rate}")
+    return cpu, false_count
+
+def false_wake_cost(model, corpus, confidence, asr, samples):
+    """Measured CPU seconds of the conversations false wakes start on the negative recordings."""
+    spotter = KeywordSpotter(model, WAKE_PHRASES, confidence)
+    trigger_spotter = KeywordSpotter(model, TRIGGER_PHRASES, confidence)
+    wake = {normalize_phrase(p) for p in WAKE_PHRASES}
+    costs = []
+    for path, audio, spoken in corpus:
+        if spoken & wake:
+            continue
+        spotter.reset()
+        for i in range(0, len(audio), CHUNK):
+            if not spotter.feed(audio[i:i + CHUNK].tobytes()):
+                continue
+            start = time.process_time()
+            vad = make_vad(hangover_ms=VAD_HANGOVER_MS)
+            trigger_spotter.reset()
+            begin = end = i + CHUNK
+            while end < min(len(audio), begin + MAX_CAPTURE_SECONDS * SAMPLE_RATE):
+                chunk = audio[end:end + 1000]
+                end += len(chunk)
+                if vad.feed(chunk):
+                    break
+                if vad.in_speech:
+                    trigger_spotter.feed(chunk.tobytes())
+            captured = audio[max(0, begin - int(PREROLL_SECONDS * SAMPLE_RATE)):end]
+            asr.transcribe(captured.astype("float32") / 32768.0, language="fr", fp16=False)
+            costs.append(time.process_time() - start)
+            print(f"  false wake in {os.path.basename(path)}: {len(captured) / SAMPLE_RATE:.1f}s captured, "
+                  f"{costs[-1]:.2f}s CPU")
+            if len(costs) >= samples:
+                return costs
+    return costs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--vosk-model", default="models/fr")
+    parser.add_argument("--confidence", type=float, default=0.7)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.4, 0.5, 0.6, 0.7, 0.8],
+                        help="Wake word verifier operating points to try")
+    parser.add_argument("--asr-engine", default=os.environ.get("CLAUDE_OVERLAY_ASR_ENGINE", "faster-whisper"))
+    parser.add_argument("--asr-model", default=os.environ.get("CLAUDE_OVERLAY_ASR_MODEL", "base"))
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--cost-samples", type=int, default=5, help="False wakes to measure the cost of")
+    args = parser.parse_args()
+
+    from vosk import Model, SetLogLevel
+    SetLogLevel(-1)
+    model = Model(args.vosk_model)
+    corpus = [(path, load_audio(path), labels(path)) for path in find_recordings(args.paths)]
+    print(f"{len(corpus)} recordings, {sum(len(a) for _, a, _ in corpus) / SAMPLE_RATE / 60:.1f} min of audio")
+
+    for title, phrases in (("Wake word", WAKE_PHRASES), ("Stop words", STOP_PHRASES), ("Dictation triggers", TRIGGER_PHRASES)):
+        print(f"{title}:")
+        evaluate("open vocabulary", SubstringSpotter(model, phrases), phrases, corpus)
+        grammar_cpu, grammar_false = evaluate(f"grammar (conf {args.confidence})", KeywordSpotter(model, phrases, args.confidence), phrases, corpus)
+        if phrases is not WAKE_PHRASES:
+            continue
+        from asr_backends import load_backend
+        costs = false_wake_cost(model, corpus, args.confidence, load_backend(args.asr_engine, args.asr_model, args.compute_type),
+                                args.cost_samples)
+        wake_cost = sum(costs) / len(costs) if costs else 0.0
+        if costs:
+            print(f"  {'':<22} one false conversation: {wake_cost:.2f}s CPU (mean of {len(costs)})")
+        else:
+            print(f"  {'':<22} no false wake on the negative recordings: nothing for the verifier to save")
+        for threshold in args.thresholds:
+            verifier = WakeVerifier(model, phrases, threshold)
+            cascade = CascadeSpotter(KeywordSpotter(model, phrases, args.confidence), verifier)
+            cpu, false_count = evaluate(f"+ verifier ({threshold})", cascade, phrases, corpus)
+            saved = (grammar_false - false_count) * wake_cost - (cpu - grammar_cpu)
+            print(f"  {'':<22} {verifier.rejected}/{verifier.candidates} detections rejected, "
+                  f"{verifier.cpu_seconds * 1000 / max(verifier.candidates, 1):.0f} ms CPU per check, {saved:.1f} s CPU saved")
+
+if __name__ == "__main__":
+    sys.exit(main())
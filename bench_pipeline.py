@@ -0,0 +1,128 @@
+"""Offline replay of recorded commands through the whole voice pipeline.
+
+Usage: python bench_pipeline.py corpus/ [--gap 8] [--first-token-delay 0.3] [--token-delay 0.05] [--speculate]
+The corpus is a folder (or a list) of WAV/FLAC recordings of full commands, wake word and trigger
+included ("Claude, ouvre Firefox, send"). An optional sidecar JSON next to a recording
+(cmd.wav -> cmd.json) gives {"wake_end": seconds} for the wake word delay, otherwise it's measured
+from the start of the file. Runs headless with the real Vosk/Whisper models and a stub LLM, and
+reports p50/p95 of each stage:
+  wake          end of the wake word -> wake word detected
+  speech end    end of the recording -> end of speech detected (includes the VAD hangover)
+  transcription end of speech detected -> Whisper text
+  first token   LLM request -> first token
+  end to end    end of the recording -> first token (or fast-track intent executed)
+With --speculate, dictated commands are sent to the LLM before their trigger (speculation.py) and
+the hit/miss counts and the wasted LLM time are printed too.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+import worker
+from audio_source import FileSource, find_recordings
+from history import HistoryStore
+from llm import StubBackend
+from prompt_builder import PromptBuilder
+from response_cache import ResponseCache
+
+def wake_offset(path):
+    sidecar = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            return json.load(f).get("wake_end", 0.0)
+    return 0.0
+
+def percentiles(values):
+    if not values:
+        return "      n/a"
+    p50, p95 = np.percentile(values, [50, 95])
+    return f"p50 {p50*1000:7.0f} ms  p95 {p95*1000:7.0f} ms  (n={len(values)})"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--gap", type=float, default=8.0, help="Seconds of silence between two commands")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (1 = real time)")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    parser.add_argument("--speculate", action="store_true", help="Speculative LLM requests in dictation mode")
+    parser.add_argument("--output", help="Writes the raw measurements as JSON")
+    args = parser.parse_args()
+
+    recordings = find_recordings(args.paths)
+    if not recordings:
+        print("No recordings found")
+        return 1
+    script = [2.0] # Startup: Vosk loads, the noise floor settles
+    for path in recordings:
+        script += [path, args.gap]
+    source = FileSource(script, speed=args.speed)
+    print(f"{len(recordings)} recordings, {source.duration:.0f}s of audio")
+
+    # Don't touch the real history, cache and summary (and don't measure cache hits), don't launch anything
+    worker.conversation_history = HistoryStore(os.path.join(tempfile.mkdtemp(), "history.jsonl"))
+    worker.response_cache = ResponseCache(None, max_entries=0) # Nothing kept: every answer comes from the LLM
+    worker.prompt_builder = PromptBuilder(worker.SYSTEM_PROMPT, budget_tokens=worker.PROMPT_BUDGET_TOKENS,
+                                          summary_tokens=worker.PROMPT_SUMMARY_TOKENS)
+    worker.SPECULATIVE_PREFETCH = args.speculate
+    llm = StubBackend(first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    audio_worker = worker.AudioWorker(audio_source=source, llm=llm, dry_run=True)
+
+    events = []
+    lock = threading.Lock()
+    def on_event(name, timestamp, info):
+        with lock:
+            events.append((name, timestamp, info))
+    audio_worker.on_event = on_event
+
+    audio_worker.listen_and_process() # Returns at the end of the script
+    time.sleep(args.first_token_delay + 1) # Let the last answer start
+    if hasattr(audio_worker.whisper_model, "close"):
+        audio_worker.whisper_model.close()
+
+    # Each event belongs to the last recording started before it
+    starts = [source.wall_time(segment.start) for segment in source.segments]
+    per_segment = [{} for _ in source.segments]
+    for name, timestamp, info in events:
+        if "position" in info:
+            index = max((i for i, s in enumerate(source.segments) if s.start <= info["position"]), default=None)
+        else:
+            index = max((i for i, t in enumerate(starts) if t <= timestamp), default=None)
+        if index is not None:
+            per_segment[index].setdefault(name, timestamp) # First occurrence
+
+    stages = {"wake": [], "speech end": [], "transcription": [], "first token": [], "end to end": []}
+    for segment, seen in zip(source.segments, per_segment):
+        start = source.wall_time(segment.start) + wake_offset(segment.path) / args.speed
+        end = source.wall_time(segment.end)
+        if "wake" in seen:
+            stages["wake"].append(seen["wake"] - start)
+        else:
+            print(f"Wake word missed: {segment.path}")
+        if "speech_end" in seen:
+            stages["speech end"].append(seen["speech_end"] - end)
+            if "transcribed" in seen:
+                stages["transcription"].append(seen["transcribed"] - seen["speech_end"])
+        if "first_token" in seen and "llm_start" in seen:
+            stages["first token"].append(seen["first_token"] - seen["llm_start"])
+        answered = seen.get("first_token", seen.get("intent"))
+        if answered is not None:
+            stages["end to end"].append(answered - end)
+
+    for stage, values in stages.items():
+        print(f"{stage:<14} {percentiles(values)}")
+    if args.speculate:
+        print(f"speculation    {audio_worker.speculation_stats.summary()}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"recordings": recordings, "stages": stages, "events": events}, f, indent=2)
+
+if __name__ == "__main__":
+    sys.exit(main())
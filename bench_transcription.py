@@ -0,0 +1,63 @@
+"""Compares the in-memory Whisper path with the old temporary WAV + ffmpeg path.
+
+Usage: python bench_transcription.py utterance1.wav [utterance2.wav ...] [--model base] [--runs 3]
+The WAV files must be 16 kHz mono int16 recordings (like the ones captured by the worker).
+"""
+import sys
+import time
+import wave
+import argparse
+
+from worker import transcribe_frames_via_wav, frames_to_float32, WHISPER_SAMPLE_RATE
+
+def load_frames(path, chunk=1000):
+    """Reads a WAV file as the list of small PCM chunks listen_and_process builds."""
+    with wave.open(path, 'rb') as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != WHISPER_SAMPLE_RATE:
+            raise ValueError(f"{path}: expected 16 kHz mono int16")
+        frames = []
+        while True:
+            data = wf.readframes(chunk)
+            if not data:
+                break
+            frames.append(data)
+    return frames
+
+def timed(fn, runs):
+    durations = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return durations[len(durations) // 2], result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wavs", nargs="+")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    import whisper
+    print(f"Loading Whisper model '{args.model}'...")
+    model = whisper.load_model(args.model)
+
+    total_memory = 0.0
+    total_wav = 0.0
+    for path in args.wavs:
+        frames = load_frames(path)
+        seconds = sum(len(f) for f in frames) / 2 / WHISPER_SAMPLE_RATE
+        t_memory, r_memory = timed(lambda: model.transcribe(frames_to_float32(frames), fp16=False, language='fr'), args.runs)
+        t_wav, r_wav = timed(lambda: transcribe_frames_via_wav(model, frames), args.runs)
+        total_memory += t_memory
+        total_wav += t_wav
+        same = r_memory["text"].strip() == r_wav["text"].strip()
+        print(f"{path} ({seconds:.1f}s audio): memory {t_memory*1000:.0f} ms | wav+ffmpeg {t_wav*1000:.0f} ms | "
+              f"saved {(t_wav - t_memory)*1000:.0f} ms | same text: {same}")
+
+    print(f"TOTAL: memory {total_memory*1000:.0f} ms | wav+ffmpeg {total_wav*1000:.0f} ms")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Cost of end-of-speech detection: vectorized VAD vs Vosk partial-result polling.
+
+Usage: python bench_vad.py [utterance1.wav ...] [--vosk-model models/fr] [--runs 5]
+Without WAV files a synthetic utterance (noise, voiced segments, pauses) is used. The WAV files
+must be 16 kHz mono int16. Vosk is only measured when it's installed and the model exists.
+"""
+import os
+import sys
+import time
+import json
+import wave
+import argparse
+
+import numpy as np
+
+from vad import make_vad, SAMPLE_RATE
+
+CHUNK = 1000 # Same chunk size as the worker's capture loop
+
+def load_wav(path):
+    with wave.open(path, 'rb') as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path}: expected 16 kHz mono int16")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+def synthetic(seconds=10):
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 150, int(seconds * SAMPLE_RATE))
+    t = np.arange(len(audio)) / SAMPLE_RATE
+    voiced = np.sin(2 * np.pi * 140 * t) + 0.5 * np.sin(2 * np.pi * 280 * t)
+    for start, end in ((1, 2.5), (2.8, 4), (4.2, 6)):
+        audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] += 5000 * voiced[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+    return audio.astype(np.int16)
+
+def run_vad(kind, audio):
+    vad = make_vad(kind)
+    start = time.perf_counter()
+    end = None
+    for i in range(0, len(audio), CHUNK):
+        if vad.feed(audio[i:i + CHUNK]) and end is None:
+            end = (i + CHUNK) / SAMPLE_RATE
+    return time.perf_counter() - start, end
+
+def run_vosk(model, audio):
+    from vosk import KaldiRecognizer
+    rec = KaldiRecognizer(model, SAMPLE_RATE)
+    start = time.perf_counter()
+    last_partial, last_change, end = "", 0, None
+    # The old rule: 1.2s without a change of the partial result
+    for i in range(0, len(audio), CHUNK):
+        now = (i + CHUNK) / SAMPLE_RATE
+        if rec.AcceptWaveform(audio[i:i + CHUNK].tobytes()):
+            continue
+        partial = json.loads(rec.PartialResult()).get("partial", "")
+        if partial and partial != last_partial:
+            last_partial, last_change = partial, now
+        elif partial and now - last_change > 1.2 and end is None:
+            end = now
+    return time.perf_counter() - start, end
+
+def report(name, runs, fn, audio):
+    results = sorted(fn(audio) for _ in range(runs))
+    elapsed, end = results[len(results) // 2]
+    seconds = len(audio) / SAMPLE_RATE
+    end_text = f"end at {end:.2f}s" if end is not None else "no end detected"
+    print(f"  {name:<8} {elapsed / seconds * 1000:8.3f} ms per audio second (RTF {elapsed / seconds:.5f}), {end_text}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wavs", nargs="*")
+    parser.add_argument("--vosk-model", default="models/fr")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    inputs = [(path, load_wav(path)) for path in args.wavs] or [("synthetic", synthetic())]
+
+    vosk_model = None
+    try:
+        if os.path.isdir(args.vosk_model):
+            from vosk import Model, SetLogLevel
+            SetLogLevel(-1)
+            vosk_model = Model(args.vosk_model)
+    except ImportError:
+        pass
+    if vosk_model is None:
+        print("Vosk not available, only the VAD is measured")
+
+    for name, audio in inputs:
+        print(f"{name} ({len(audio) / SAMPLE_RATE:.1f}s):")
+        report("energy", args.runs, lambda a: run_vad("energy", a), audio)
+        try:
+            import webrtcvad
+            report("webrtc", args.runs, lambda a: run_vad("webrtc", a), audio)
+        except ImportError:
+            pass
+        if vosk_model is not None:
+            report("vosk", 1, lambda a: run_vosk(vosk_model, a), audio)
+
+if __name__ == "__main__":
+    sys.exit(main())
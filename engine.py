@@ -0,0 +1,277 @@
+"""Headless engine daemon: wake word, ASR and Claude without the overlay.
+
+Usage: python engine.py [--socket PATH] [--no-audio] [--llm stub] [--no-cache] [--history PATH]
+The models stay loaded as long as the daemon runs: the overlay (main.py) is only a client and can
+be restarted freely, and scripts can drive the engine with text commands (bench_engine.py).
+For load tests, --no-cache turns the response cache off (every answer comes from the LLM) and
+--history keeps the conversation in another file than the user's history.jsonl.
+
+Protocol: one JSON object per line on a UNIX socket (engine_client.py), each command gets a reply
+{"reply": cmd, "ok": true, ...} or {"reply": cmd, "ok": false, "error": "..."}.
+  {"cmd": "text", "text": "..."}       a command without wake word nor ASR, reply has its "id"
+  {"cmd": "audio", "pcm": "<base64>"}  a recorded command (16 kHz mono int16), reply has its "text"
+  {"cmd": "cancel"}                    stops the answer in progress
+  {"cmd": "metrics"}                   stage percentiles, scheduler/launcher/cache counters
+  {"cmd": "subscribe"}                 then the events of the engine, until the client leaves:
+    {"event": "listening"|"recognized"|"processing"|"partial"|"finished"|"error", "text": ..., "id": ...}
+    {"event": "stage", "name": "first_token", "time": ..., "info": {...}, "id": ...}
+  "id" is the interaction (a text command, or a wake word and what follows) the event belongs to:
+  a late event of a superseded command keeps the ID of that command.
+A client that falls 1000 messages behind (stopped reading) is disconnected.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import base64
+import signal
+import socket
+import argparse
+import threading
+import traceback
+
+from PyQt6.QtCore import Qt
+
+import worker
+from engine_client import socket_path, EXIT_PREFIX
+from history import HistoryStore
+from prompt_builder import PromptBuilder
+from response_cache import ResponseCache
+from tracing import Tracer
+
+class Connection:
+    """A client. Its messages are written by its own thread from a bounded queue: the audio and
+    LLM threads that broadcast events never wait for a client, one that stops reading is dropped."""
+
+    def __init__(self, sock, max_queue=1000):
+        self.sock = sock
+        self.file = sock.makefile("rb")
+        self.lock = threading.Lock()
+        self.closed = False
+        self.outgoing = queue.Queue(max_queue) # Replies and events, in order
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def send(self, message):
+        """Queues a message, raises OSError if the client is gone or too far behind."""
+        data = (json.dumps(message, ensure_ascii=False, default=str) + "\n").encode()
+        with self.lock:
+            if self.closed:
+                raise OSError("connection closed")
+            try:
+                self.outgoing.put_nowait(data)
+                return
+            except queue.Full:
+                pass
+        print("Engine client not reading its events, dropped")
+        self.close()
+        raise OSError("client too slow")
+
+    def _write_loop(self):
+        while True:
+            data = self.outgoing.get()
+            if data is None:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.close()
+                return
+
+    def close(self, drain=0):
+        """Closes the connection, after up to `drain` seconds spent sending what is queued."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        if drain:
+            try:
+                self.outgoing.put_nowait(None)
+                self.writer.join(drain)
+            except queue.Full:
+                pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR) # Wakes up the threads reading and writing it
+        except OSError:
+            pass
+        self.file.close()
+        self.sock.close()
+        try:
+            self.outgoing.put_nowait(None) # Stops the writer
+        except queue.Full:
+            pass
+
+class EngineServer:
+    """Serves an AudioWorker on a UNIX socket, one thread per client."""
+
+    def __init__(self, audio_worker, path=None):
+        self.audio_worker = audio_worker
+        self.path = path or socket_path()
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.server = None
+        # Direct connections: called on the worker's threads, no Qt event loop needed
+        direct = Qt.ConnectionType.DirectConnection
+        for signal, name in ((audio_worker.signal_listening, "listening"), (audio_worker.signal_recognized, "recognized"),
+                             (audio_worker.signal_processing, "processing"), (audio_worker.signal_partial_response, "partial"),
+                             (audio_worker.signal_finished, "finished"), (audio_worker.signal_error, "error")):
+            signal.connect(lambda *args, name=name: self.broadcast(
+                {"event": name, "text": args[0] if args else None, "id": audio_worker.current_interaction()}), type=direct)
+        audio_worker.on_event = lambda name, timestamp, info: self.broadcast(
+            {"event": "stage", "name": name, "time": timestamp, "info": info, "id": info.pop("interaction", None)})
+
+    def start(self):
+        if os.path.exists(self.path):
+            try: # Another engine answering there?
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(self.path)
+                raise RuntimeError(f"An engine is already running on {self.path}")
+            except ConnectionRefusedError:
+                os.unlink(self.path) # Left over by a crash
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        os.chmod(self.path, 0o600) # It runs commands: only for this user
+        self.server.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Engine listening on {self.path}")
+
+    def close(self):
+        if self.server:
+            self.server.close()
+            self.server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        with self.lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for connection in subscribers:
+            connection.close(drain=1.0) # The last events (an "error" on the way out...) still go out
+
+    def broadcast(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for connection in subscribers:
+            try:
+                connection.send(event)
+            except OSError:
+                with self.lock:
+                    if connection in self.subscribers:
+                        self.subscribers.remove(connection)
+
+    def metrics(self):
+        tracer = worker.tracer
+        with tracer.lock:
+            names = sorted(tracer.histograms)
+            counts = {name: tracer.histograms[name].count for name in names}
+        stages = {}
+        for name in names:
+            p50, p95 = tracer.percentiles(name)
+            stages[name] = {"count": counts[name], "p50": p50, "p95": p95}
+        speculation = self.audio_worker.speculation_stats
+        return {
+            "stages": stages,
+            "scheduler": dict(self.audio_worker.scheduler.stats, busy=self.audio_worker.scheduler.busy),
+            "launcher": dict(worker.launcher.stats, running=len(worker.launcher.running())),
+            "response_cache": {"entries": len(worker.response_cache), "hits": worker.response_cache.hits,
+                               "misses": worker.response_cache.misses},
+            "speculation": {"hits": speculation.hits, "misses": speculation.misses,
+                            "wasted_seconds": speculation.wasted_seconds},
+        }
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except (OSError, AttributeError): # Closed
+                return
+            threading.Thread(target=self._serve, args=(Connection(sock),), daemon=True).start()
+
+    def _serve(self, connection):
+        try:
+            for line in connection.file:
+                cmd = None
+                try:
+                    message = json.loads(line)
+                    cmd = message.get("cmd")
+                    reply = self._handle(cmd, message, connection)
+                except Exception as e: # Bad request, Whisper not loaded... the client is told, the engine goes on
+                    connection.send({"reply": cmd, "ok": False, "error": str(e) or type(e).__name__})
+                    continue
+                if reply is not None:
+                    connection.send({"reply": cmd, "ok": True, **reply})
+        except OSError:
+            pass # Client gone
+        finally:
+            with self.lock:
+                if connection in self.subscribers:
+                    self.subscribers.remove(connection)
+            connection.close()
+
+    def _handle(self, cmd, message, connection):
+        if cmd == "text":
+            text = message["text"].strip()
+            if not text:
+                raise ValueError("empty command")
+            message, interaction = self.audio_worker.submit_text(text)
+            return {"message": message, "id": interaction}
+        if cmd == "audio":
+            return {"text": self.audio_worker.submit_audio(base64.b64decode(message["pcm"]))}
+        if cmd == "cancel":
+            self.audio_worker.cancel_llm("cancelled")
+            return {}
+        if cmd == "metrics":
+            return self.metrics()
+        if cmd == "subscribe":
+            connection.send({"reply": cmd, "ok": True}) # Before the first event
+            with self.lock:
+                self.subscribers.append(connection)
+            return None
+        raise ValueError(f"unknown command: {cmd}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default=socket_path())
+    parser.add_argument("--no-audio", action="store_true", help="Text commands only (no microphone, no wake word)")
+    parser.add_argument("--llm", help="LLM backend (default: CLAUDE_OVERLAY_LLM)")
+    parser.add_argument("--no-cache", action="store_true", help="No response cache (load tests)")
+    parser.add_argument("--history", help="Conversation history file (default: history.jsonl)")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        worker.response_cache = ResponseCache(None, max_entries=0) # Nothing kept, nothing written
+    if args.history:
+        worker.conversation_history = HistoryStore(args.history, window=worker.HISTORY_WINDOW, legacy_path=None)
+        worker.prompt_builder = PromptBuilder(worker.SYSTEM_PROMPT, budget_tokens=worker.PROMPT_BUDGET_TOKENS,
+                                              summary_tokens=worker.PROMPT_SUMMARY_TOKENS)
+        worker.prompt_builder.add(*worker.conversation_history.recent())
+
+    if not worker.tracer.enabled:
+        worker.tracer = Tracer(enabled=True) # In memory only: for the metrics command
+    audio_worker = worker.AudioWorker(llm=worker.make_backend(args.llm) if args.llm else None)
+    server = EngineServer(audio_worker, args.socket)
+    try:
+        server.start()
+    except RuntimeError as e:
+        print(e)
+        return 1
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0)) # Removes the socket on the way out
+    try:
+        if args.no_audio:
+            audio_worker.start_engine() # Whisper is only loaded by the first audio command
+            while True:
+                time.sleep(3600)
+        else:
+            audio_worker.run() # Listens until the audio input goes away
+    except KeyboardInterrupt:
+        pass
+    except Exception as e: # No model, no microphone...: the overlay shows why instead of restarting us in a loop
+        traceback.print_exc()
+        server.broadcast({"event": "error", "text": f"{EXIT_PREFIX}{e}"})
+        print(f"{EXIT_PREFIX}{e}", flush=True) # Last line of the log: engine_client.exit_error()
+        return 1
+    finally:
+        server.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Client side of the engine daemon (engine.py): JSON lines over its UNIX socket.
+
+    client = EngineClient()
+    client.text("quelle est la capitale du Japon")
+    for event in EngineClient().subscribe(): ...
+
+connect() starts the daemon when none is running, so the overlay (or a script) never has to.
+Its output goes to <socket>.log, where exit_error() finds why it stopped.
+"""
+import base64
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import time
+
+def socket_path():
+    """CLAUDE_OVERLAY_SOCKET, or claude-overlay.sock in the user's runtime directory.
+
+    Without XDG_RUNTIME_DIR, a private /tmp/claude-overlay-<uid> directory: a socket directly in
+    /tmp could be created first by another user, who would then get the commands (or send events).
+    """
+    if os.environ.get("CLAUDE_OVERLAY_SOCKET"):
+        return os.environ["CLAUDE_OVERLAY_SOCKET"]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], "claude-overlay.sock")
+    return os.path.join(private_dir(f"/tmp/claude-overlay-{os.getuid()}"), "claude-overlay.sock")
+
+def private_dir(path):
+    """Creates `path` with mode 0700, or checks that the existing one is ours and private."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path) # Not a symlink someone else points somewhere
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} isn't a private directory of this user, refusing to use it "
+                              f"(set XDG_RUNTIME_DIR or CLAUDE_OVERLAY_SOCKET)")
+    return path
+
+class EngineError(Exception):
+    """The engine refused a command (or went away)."""
+
+class EngineClient:
+    """One connection to the engine. Use one for commands and another one for subscribe()."""
+
+    def __init__(self, path=None, timeout=None):
+        self.path = path or socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(self.path)
+        self.file = self.sock.makefile("rb")
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def send(self, cmd, **args):
+        self.sock.sendall((json.dumps({"cmd": cmd, **args}) + "\n").encode())
+
+    def receive(self):
+        line = self.file.readline()
+        if not line:
+            raise EngineError("Engine closed the connection")
+        return json.loads(line)
+
+    def request(self, cmd, **args):
+        """Sends a command and returns its reply (raises EngineError if it failed)."""
+        self.send(cmd, **args)
+        reply = self.receive()
+        if not reply.get("ok"):
+            raise EngineError(reply.get("error", "unknown error"))
+        return reply
+
+    def text(self, text):
+        """A command as if it had been dictated (no ASR). Its answer comes as events."""
+        return self.request("text", text=text)
+
+    def audio(self, pcm):
+        """A recorded command (16 kHz mono int16 bytes). The reply has what Whisper heard."""
+        return self.request("audio", pcm=base64.b64encode(pcm).decode())
+
+    def cancel(self):
+        return self.request("cancel")
+
+    def metrics(self):
+        return self.request("metrics")
+
+    def subscribe(self):
+        """Subscribes now, returns an iterator over the engine's events (listening, partial, stage...)."""
+        self.request("subscribe")
+        return self._events()
+
+    def _events(self):
+        while True:
+            yield self.receive()
+
+EXIT_PREFIX = "Engine stopped: " # engine.py prints this last when it fails
+
+def log_tail(path, offset=0, count=20):
+    """Last lines of the daemon's log (written after `offset`)."""
+    try:
+        with open(path + ".log", "rb") as f:
+            f.seek(max(offset, os.path.getsize(path + ".log") - 16384))
+            text = f.read().decode(errors="replace")
+    except OSError:
+        return []
+    return [line.strip()[:200] for line in text.splitlines() if line.strip()][-count:]
+
+def stop_reason(lines):
+    """The "Engine stopped: ..." reason in these log lines (its child processes may print after it)."""
+    for line in reversed(lines):
+        if line.startswith(EXIT_PREFIX):
+            return line[len(EXIT_PREFIX):]
+    return None
+
+def exit_error(path=None, within=10.0):
+    """Why the daemon just stopped, if it stopped on an error (None otherwise)."""
+    path = path or socket_path()
+    try:
+        if time.time() - os.path.getmtime(path + ".log") > within:
+            return None # An old crash
+    except OSError:
+        return None
+    return stop_reason(log_tail(path))
+
+def connect(path=None, spawn=True, timeout=30.0):
+    """An EngineClient, starting the daemon first if it isn't running (it loads the models).
+
+    Raises EngineError with the end of its log if the daemon exits before it listens.
+    """
+    path = path or socket_path()
+    try:
+        return EngineClient(path)
+    except OSError:
+        if not spawn:
+            raise
+    print("Starting the engine daemon...")
+    engine = os.path.join(os.path.dirname(os.path.abspath(__file__)), "engine.py")
+    with open(path + ".log", "a") as log: # Its prints, for debugging
+        log_start = log.tell()
+        process = subprocess.Popen([sys.executable, engine, "--socket", path], cwd=os.path.dirname(engine),
+                                   start_new_session=True, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + timeout
+    while True:
+        time.sleep(0.1)
+        try:
+            return EngineClient(path)
+        except OSError:
+            if process.poll() is not None:
+                tail = log_tail(path, log_start)
+                raise EngineError(stop_reason(tail) or
+                                  f"engine exited ({process.returncode}): {tail[-1] if tail else 'no output'}")
+            if time.time() > deadline:
+                raise
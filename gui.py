@@ -2,21 +2,45 @@ from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QGraphic
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QRect
 from PyQt6.QtGui import QFont, QColor, QPainter, QBrush, QPixmap, QPainterPath, QPen
 
+LOGO_BASE_SIZE = 100 # Base logo size
+LOGO_CENTER_Y = 160 # Logo lowered to not clip the animation
+RIPPLE_MAX_RADIUS = 140 # Largest ripple (60 + 80)
+
+# Animation timer interval (ms) per state, None = static (no timer at all)
+FRAME_INTERVALS = {
+    "LISTENING": 16, # ~60 FPS for the ripples
+    "PROCESSING": 33, # ~30 FPS, only the logo breathes
+    "SUCCESS": None,
+    "IDLE": None,
+}
+
 class ClaudeOverlay(QWidget):
     def __init__(self):
         super().__init__()
-        self.initUI()
         self.state = "IDLE" # IDLE, LISTENING, PROCESSING, SUCCESS
         
         # Animation parameters
+        # The timer only runs while the overlay is visible, at the rate of the current state
         self.anim_timer = QTimer(self)
         self.anim_timer.timeout.connect(self.animate)
-        self.anim_timer.start(16) # ~60 FPS
+        self.frames_painted = {} # state -> number of paintEvent calls, to check idle wakeups
+        self.animation_ticks = {} # state -> number of animate() wakeups
         
+        # Streamed answers are rendered at most once per frame
+        self.pending_response = None
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.timeout.connect(self.render_partial_response)
+
         self.pulse_phase = 0.0 # For breathing
         self.ripple_phase = 0.0 # For waves
         self.morph_factor = 0.0 # To deform the logo (if needed)
 
+        # Logo loaded ONCE, with one pre-scaled frame per breathing size
+        self.logo_frames = self.load_logo_frames()
+
+        self.initUI()
+
     def initUI(self):
         self.setObjectName("claude-overlay")
         self.setWindowTitle("Claude Overlay")
@@ -92,12 +116,69 @@ class ClaudeOverlay(QWidget):
         self.adjustSize() # The window adapts to the content
         self.center_on_screen() # Re-center since the size has changed
 
+    def load_logo_frames(self):
+        """Decodes logo.png once and pre-scales it for every size the breathing animation reaches."""
+        import os
+        logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo.png")
+        pixmap = QPixmap(logo_path)
+        if pixmap.isNull():
+            print(f"ERROR: Cannot load image from {logo_path}, drawing the fallback logo")
+            return None
+        frames = {}
+        # breath is in [0.95, 1.05] -> sizes 95..105 px
+        for size in range(int(LOGO_BASE_SIZE * 0.95), int(LOGO_BASE_SIZE * 1.05) + 1):
+            frames[size] = pixmap.scaled(
+                size, size,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+        return frames
+
+    def set_state(self, state):
+        self.state = state
+        if self.isVisible():
+            self.update(self.animation_rect(max(RIPPLE_MAX_RADIUS, self.logo_radius()))) # Erase what the previous state drew
+        self.schedule_animation()
+
+    def schedule_animation(self):
+        """Runs the animation timer at the rate of the current state, or stops it."""
+        interval = FRAME_INTERVALS.get(self.state) if self.isVisible() else None
+        if interval is None:
+            self.anim_timer.stop()
+        elif not self.anim_timer.isActive() or self.anim_timer.interval() != interval:
+            self.anim_timer.start(interval)
+
+    def logo_radius(self):
+        """Half the size of the largest logo paintEvent draws (the fallback drawing is bigger than the PNG)."""
+        if self.logo_frames:
+            largest = self.logo_frames[max(self.logo_frames)]
+            return max(largest.width(), largest.height()) / 2
+        return LOGO_BASE_SIZE * 1.05 * 0.8 # R = size * 0.8 at the top of the breath
+
+    def animation_rect(self, radius=None):
+        """Dirty region of the animation: the logo (and its ripples when listening), not the whole window."""
+        if radius is None:
+            radius = self.logo_radius()
+            if self.state == "LISTENING":
+                radius = max(radius, RIPPLE_MAX_RADIUS)
+        r = int(radius) + 2
+        return QRect(int(self.width() / 2 - r), LOGO_CENTER_Y - r, 2 * r, 2 * r)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.schedule_animation()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.anim_timer.stop() # No wakeups at all while hidden
+
     def paintEvent(self, event):
+        self.frames_painted[self.state] = self.frames_painted.get(self.state, 0) + 1
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         
         center_x = self.width() / 2
-        center_y = 160 # Logo lowered to not clip the animation
+        center_y = LOGO_CENTER_Y
         
         # 1. RIPPLE Animation (Waves)
         if self.state == "LISTENING":
@@ -115,28 +196,16 @@ class ClaudeOverlay(QWidget):
         # 2. Draw the Logo "PNG Image"
         import math
         breath = math.sin(self.pulse_phase) * 0.05 + 1.0
-        base_size = 100 # Base logo size
-        size = base_size * breath
+        size = LOGO_BASE_SIZE * breath
         
         painter.translate(center_x, center_y)
         
-        # Load the image
-        import os
-        logo_path = os.path.abspath("logo.png")
-        pixmap = QPixmap(logo_path)
-        
-        if not pixmap.isNull():
-            # Resize the image to match the desired size (with breathing effect)
-            scaled_pixmap = pixmap.scaled(
-                int(size), int(size),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            
+        if self.logo_frames:
+            # Pre-scaled frame closest to the current breathing size
+            scaled_pixmap = self.logo_frames[min(max(round(size), min(self.logo_frames)), max(self.logo_frames))]
             # Draw the image centered at (0,0) since we already translated
-            painter.drawPixmap(int(-size/2), int(-size/2), scaled_pixmap)
+            painter.drawPixmap(-scaled_pixmap.width() // 2, -scaled_pixmap.height() // 2, scaled_pixmap)
         else:
-            print(f"ERROR: Cannot load image from {logo_path}")
             # Fallback if the image is not found (Old drawing)
             claude_color = QColor(217, 119, 87)
             if self.state == "PROCESSING":
@@ -156,9 +225,12 @@ class ClaudeOverlay(QWidget):
             painter.drawPath(path)
 
     def animate(self):
-        self.pulse_phase += 0.1
-        self.ripple_phase += 1.5
-        self.update()
+        self.animation_ticks[self.state] = self.animation_ticks.get(self.state, 0) + 1
+        # Same animation speed whatever the frame rate (the phases were tuned for 16 ms)
+        step = self.anim_timer.interval() / 16
+        self.pulse_phase += 0.1 * step
+        self.ripple_phase += 1.5 * step
+        self.update(self.animation_rect())
 
     def show_listening(self):
         # If we just displayed a response (SUCCESS), we KEEP the text so the user can read it
@@ -166,20 +238,39 @@ class ClaudeOverlay(QWidget):
         if self.state != "SUCCESS":
             self.status_label.setText("Listening...")
             
-        self.state = "LISTENING"
+        self.set_state("LISTENING")
         self.show()
         self.status_label.show()
         self.update_layout_and_center()
 
     def show_processing(self, text):
-        self.state = "PROCESSING"
+        self.set_state("PROCESSING")
         self.show()
         self.status_label.setText(text)
         self.status_label.show()
         self.update_layout_and_center()
         
+    def show_partial_response(self, text):
+        # A fast stream emits many chunks per frame: keep only the latest text
+        # and let the timer apply it, instead of relayouting on every chunk
+        self.pending_response = text
+        if not self.render_timer.isActive():
+            self.render_timer.start(16)
+
+    def render_partial_response(self):
+        if self.pending_response is None:
+            return
+        text = self.pending_response
+        self.pending_response = None
+        self.status_label.setText(text)
+        self.status_label.show()
+        self.update_layout_and_center()
+
     def show_success(self, message):
-        self.state = "SUCCESS"
+        # The final text wins over any partial render still pending
+        self.render_timer.stop()
+        self.pending_response = None
+        self.set_state("SUCCESS")
         self.status_label.setText(message)
         self.status_label.show()
         self.update_layout_and_center()
@@ -190,14 +281,18 @@ class ClaudeOverlay(QWidget):
         if message == "STOP_OVERLAY":
             self.hide_overlay()
         else:
+            self.render_timer.stop()
+            self.pending_response = None
             self.status_label.setText(f"❌ {message}")
             self.status_label.show()
             self.update_layout_and_center()
             QTimer.singleShot(3000, self.hide_overlay)
 
     def hide_overlay(self):
+        self.render_timer.stop()
+        self.pending_response = None
         self.hide()
-        self.state = "IDLE"
+        self.set_state("IDLE")
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -0,0 +1,156 @@
+"""Conversation history store.
+
+The history is an append-only JSONL log (one line per message) instead of a JSON file rewritten
+on every turn. Only the last messages used by the prompt are kept in memory, writes happen in a
+background thread, and once the log gets too long its older lines move to the `.1` archive,
+which only keeps the newest `max_archive_entries` lines.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+class HistoryStore:
+    """Bounded in-memory window of the conversation, persisted to an append-only log.
+
+    Safe to use from several threads (the Claude threads append, the worker reads).
+    """
+
+    def __init__(self, path="history.jsonl", window=20, max_entries=2000, keep_entries=None, max_archive_entries=20000,
+                 legacy_path=None):
+        self.path = path
+        self.max_entries = max_entries # Compact the log past this many lines
+        self.keep_entries = keep_entries or max_entries // 2 # Lines left in the log after that
+        self.max_archive_entries = max_archive_entries # The oldest archived lines are dropped past this
+        self.lock = threading.Lock()
+        self.entries = deque(maxlen=window) # (role, message), what the prompt uses
+        self.line_count = 0
+        self.writes = queue.Queue()
+
+        self._load(legacy_path)
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def _load(self, legacy_path):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue # Truncated last line after a crash
+                        self.entries.append((entry["role"], entry["text"]))
+                        self.line_count += 1
+            except OSError as e:
+                print(f"Error loading history: {e}")
+        elif legacy_path and os.path.exists(legacy_path):
+            # One-time migration from the old history.json
+            try:
+                with open(legacy_path, "r") as f:
+                    legacy = json.load(f)
+                with open(self.path, "w") as f: # Every message, the window only limits the prompt
+                    for role, msg in legacy:
+                        f.write(json.dumps({"role": role, "text": msg}) + "\n")
+                self.entries.extend((role, msg) for role, msg in legacy)
+                self.line_count = len(legacy)
+                print(f"History migrated from {legacy_path} ({len(legacy)} messages)")
+            except Exception as e:
+                print(f"Error migrating history: {e}")
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def recent(self, count=None):
+        """Returns the last `count` messages (the whole window by default) as (role, message)."""
+        with self.lock:
+            entries = list(self.entries)
+        return entries if count is None else entries[-count:]
+
+    def append(self, *messages):
+        """Appends (role, message) pairs; the disk write happens in the background."""
+        now = time.time()
+        with self.lock:
+            self.entries.extend(messages)
+        self.writes.put([{"role": role, "text": msg, "ts": now} for role, msg in messages])
+
+    def append_turn(self, user_text, claude_text):
+        self.append(("User", user_text), ("Claude", claude_text))
+
+    def _write_loop(self):
+        while True:
+            batch = self.writes.get()
+            if batch is None:
+                self.writes.task_done()
+                return
+            # Drain whatever else is waiting so that one fsync covers it all
+            batches = [batch]
+            while True:
+                try:
+                    batch = self.writes.get_nowait()
+                except queue.Empty:
+                    break
+                if batch is None:
+                    self.writes.put(None) # Handle the stop after this write
+                    self.writes.task_done()
+                    break
+                batches.append(batch)
+            try:
+                with open(self.path, "a") as f:
+                    for batch in batches:
+                        for entry in batch:
+                            f.write(json.dumps(entry) + "\n")
+                            self.line_count += 1
+                    f.flush()
+                    os.fsync(f.fileno())
+                if self.line_count > self.max_entries:
+                    self._compact()
+            except Exception as e:
+                print(f"Error saving history: {e}")
+            for _ in batches:
+                self.writes.task_done()
+
+    def _compact(self):
+        """Moves all but the last `keep_entries` lines of the log to the `.1` archive (capped).
+
+        Runs on the writer thread and works on the lines already on disk (untouched, `ts`
+        included): messages still waiting in the queue are appended after it, once.
+        """
+        with open(self.path, "r") as f:
+            lines = [line for line in f if line.endswith("\n")] # Not a truncated last line
+        if len(lines) <= self.keep_entries:
+            self.line_count = len(lines)
+            return
+        old, kept = lines[:-self.keep_entries], lines[-self.keep_entries:]
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.writelines(kept)
+            f.flush()
+            os.fsync(f.fileno())
+        archive_path = self.path + ".1"
+        archived = []
+        if os.path.exists(archive_path):
+            with open(archive_path, "r") as f:
+                archived = [line for line in f if line.endswith("\n")]
+        archived = (archived + old)[-self.max_archive_entries:]
+        with open(archive_path + ".tmp", "w") as f:
+            f.writelines(archived)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(archive_path + ".tmp", archive_path) # Archive first: a crash can't lose the old lines
+        os.replace(temp_path, self.path)
+        self.line_count = len(kept)
+
+    def flush(self):
+        """Blocks until every pending message is on disk."""
+        self.writes.join()
+
+    def close(self):
+        if self.writer.is_alive():
+            self.writes.put(None)
+            self.writer.join()
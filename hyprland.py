@@ -0,0 +1,86 @@
+"""Hyprland integration through its UNIX control socket (what hyprctl does, without the fork).
+
+Hyprland answers one request per connection on `.socket.sock`: a connect() on a local socket
+costs microseconds where spawning hyprctl costs milliseconds. Several commands go in one round
+trip with the "[[BATCH]]" prefix (the startup window rules). Outside Hyprland, window rules and
+focusing are skipped (launches are the launcher's job, launcher.py).
+"""
+import os
+import socket
+
+def socket_path():
+    """Path of Hyprland's request socket, None when not running under Hyprland."""
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        return None
+    candidates = []
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        candidates.append(os.path.join(os.environ["XDG_RUNTIME_DIR"], "hypr", signature, ".socket.sock"))
+    candidates.append(os.path.join("/tmp/hypr", signature, ".socket.sock")) # Before Hyprland 0.40
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+class HyprlandError(Exception):
+    """Hyprland refused a command (or the socket is unreachable)."""
+
+class HyprlandIPC:
+    def __init__(self, path=None, timeout=2.0):
+        self.path = path or socket_path()
+        self.timeout = timeout
+
+    @property
+    def available(self):
+        return self.path is not None
+
+    def request(self, command):
+        """Sends one raw request ("dispatch exec firefox"), returns Hyprland's reply."""
+        if not self.available:
+            raise HyprlandError("Hyprland socket not found")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.sendall(command.encode())
+                chunks = []
+                while True: # Hyprland closes the connection after the reply
+                    data = sock.recv(8192)
+                    if not data:
+                        break
+                    chunks.append(data)
+        except OSError as e:
+            raise HyprlandError(f"Hyprland socket error: {e}")
+        return b"".join(chunks).decode(errors="replace")
+
+    def batch(self, commands):
+        """Several commands in one round trip. Raises HyprlandError if one of them failed."""
+        if any(";" in command for command in commands):
+            raise ValueError("';' separates batched commands")
+        reply = self.request("[[BATCH]]" + ";".join(commands))
+        errors = [line for line in reply.split("\n") if line.strip() and line.strip() != "ok"]
+        if errors:
+            raise HyprlandError("; ".join(errors))
+        return reply
+
+    def keyword(self, name, value):
+        return self._check(self.request(f"keyword {name} {value}"))
+
+    def dispatch(self, name, arg=""):
+        return self._check(self.request(f"dispatch {name} {arg}".rstrip()))
+
+    def _check(self, reply):
+        if reply.strip() != "ok":
+            raise HyprlandError(reply.strip() or "empty reply")
+        return reply
+
+def focus_pid(pid, ipc=None):
+    """Focuses the window of process `pid`, False if there's none (or no Hyprland)."""
+    ipc = ipc or HyprlandIPC()
+    if not ipc.available:
+        return False
+    try:
+        ipc.dispatch("focuswindow", f"pid:{pid}")
+        return True
+    except HyprlandError:
+        return False
@@ -0,0 +1,167 @@
+"""Fast-track intents: commands executed immediately, without Claude.
+
+The intent table (app launchers, URL shortcuts, project openers) comes from intents.json and is
+compiled into an Aho-Corasick automaton over words: one scan of the command finds every keyword,
+whatever the size of the table. Text is normalized first (case, accents, punctuation) so that
+Whisper's "Ouvre Firefox." matches the keyword "firefox".
+"""
+import json
+import re
+import unicodedata
+
+# Generic website: a word ending with one of these domains ("open lemonde.fr")
+DOMAIN_PATTERN = re.compile(r"\b((?:https?://)?[\w-]+(?:\.[\w-]+)*\.(?:com|fr|org|net|io|dev))\b")
+
+def normalize(text):
+    """Lowercase, no accents, punctuation turned into spaces: "Ouvre l'Éditeur !" -> "ouvre l editeur"."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+class Intent:
+    """One entry of the table.
+
+    kind: "app" (runs `exec`), "url" (opens `url` in the browser) or "project" (searches a folder
+    named after the words following the keyword).
+    """
+
+    def __init__(self, name, kind, keywords, exec=None, url=None, message=None, priority=0, needs_trigger=True):
+        self.name = name
+        self.kind = kind
+        self.keywords = keywords
+        self.exec = exec
+        self.url = url
+        self.message = message or f"{name} launched"
+        self.priority = priority
+        self.needs_trigger = needs_trigger # Only when the command also says "open"/"launch"...
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, {self.kind!r})"
+
+class IntentMatch:
+    def __init__(self, intent, keyword, rest):
+        self.intent = intent
+        self.keyword = keyword # Normalized keyword that matched
+        self.rest = rest # Normalized words after the keyword (the project name...)
+
+    def __repr__(self):
+        return f"IntentMatch({self.intent.name!r}, {self.keyword!r}, rest={self.rest!r})"
+
+# Default priority per kind: a site or a project is more specific than the app that opens it
+# ("open youtube in firefox" is YouTube, "open the project code" is not VS Code)
+KIND_PRIORITY = {"app": 0, "url": 1, "project": 2}
+
+class IntentMatcher:
+    """Aho-Corasick automaton over the words of every keyword (and trigger)."""
+
+    def __init__(self, intents, triggers=()):
+        self.intents = list(intents)
+        # Automaton: transitions (word -> node), failure links, outputs (keyword id, length in words)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.keywords = [] # id -> (normalized keyword, intent or None for a trigger, table order)
+
+        for word in triggers:
+            self._add(normalize(word), None, 0)
+        for order, intent in enumerate(self.intents):
+            for keyword in intent.keywords:
+                self._add(normalize(keyword), intent, order)
+        self._build_failure_links()
+
+    def _add(self, keyword, intent, order):
+        words = keyword.split()
+        if not words:
+            return
+        node = 0
+        for word in words:
+            if word not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][word] = len(self.goto) - 1
+            node = self.goto[node][word]
+        self.keywords.append((keyword, intent, order))
+        self.output[node].append((len(self.keywords) - 1, len(words)))
+
+    def _build_failure_links(self):
+        queue = list(self.goto[0].values())
+        for node in queue: # BFS, the list grows while we iterate
+            for word, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(word, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def scan(self, words):
+        """Yields (keyword id, index of the first word, index after the last word) in one pass."""
+        node = 0
+        for i, word in enumerate(words):
+            while node and word not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(word, 0)
+            for keyword_id, length in self.output[node]:
+                yield keyword_id, i + 1 - length, i + 1
+
+    def match(self, text):
+        """Returns the best IntentMatch for a command, or None."""
+        words = normalize(text).split()
+        has_trigger = False
+        best = None
+        best_score = None
+        for keyword_id, start, end in self.scan(words):
+            keyword, intent, order = self.keywords[keyword_id]
+            if intent is None:
+                has_trigger = True
+                continue
+            # Higher priority first, then the longest keyword, then table order
+            score = (intent.priority, end - start, -order)
+            if best_score is None or score > best_score:
+                best_score = score
+                best = IntentMatch(intent, keyword, " ".join(words[end:]))
+        if best and best.intent.needs_trigger and not has_trigger:
+            return None
+        if best is None and has_trigger:
+            # --- Generic website attempt ---
+            url = find_domain(text)
+            if url:
+                site = url.split("://", 1)[-1]
+                best = IntentMatch(Intent(site, "url", [], url=url, message=f"Site {site} opened"), site, "")
+        return best
+
+def find_domain(text):
+    """Returns the URL of a spoken website ("open lemonde.fr" -> "https://lemonde.fr"), or None."""
+    match = DOMAIN_PATTERN.search(text.lower())
+    if not match:
+        return None
+    url = match.group(1)
+    return url if url.startswith("http") else f"https://{url}"
+
+def load_intents(path):
+    """Reads the intent table from a JSON file: {"triggers": [...], "intents": [...]}."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        print(f"No intent table ({path}), fast track disabled")
+        return IntentMatcher([])
+    except ValueError as e:
+        print(f"Invalid intent table {path}: {e}")
+        return IntentMatcher([])
+
+    intents = []
+    for entry in config.get("intents", []):
+        kind = entry.get("kind", "url" if "url" in entry else "app")
+        intents.append(Intent(
+            entry["name"],
+            kind,
+            entry["keywords"],
+            exec=entry.get("exec"),
+            url=entry.get("url"),
+            message=entry.get("message"),
+            priority=entry.get("priority", KIND_PRIORITY.get(kind, 0)),
+            needs_trigger=entry.get("needs_trigger", True),
+        ))
+    return IntentMatcher(intents, config.get("triggers", []))
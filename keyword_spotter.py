@@ -0,0 +1,135 @@
+"""Keyword spotting with Vosk recognizers constrained to a small grammar.
+
+Instead of decoding everything with the full French vocabulary and looking for "claude" in the
+text, each spotter only knows its few phrases plus "[unk]" (anything else): the decoding graph is
+tiny (much less CPU), and words that merely sound close end up as [unk] instead of a false wake.
+A phrase only counts if Vosk's per-word confidence is high enough.
+
+The grammar needs a model with a dynamic graph (the "small" Vosk models), big models with a
+static HCLG graph ignore it and decode with their full vocabulary.
+
+A grammar spotter can only choose between its phrases and [unk], so a word close enough to
+"claude" still wakes it. WakeVerifier is the second stage: the ~1.5 s around a spotted wake word
+are decoded again with the full vocabulary, where "clause" or "close" win, before the overlay
+shows up and a conversation is recorded and transcribed.
+"""
+import json
+import time
+
+# Phrases spotted in each state (several spellings: the French model doesn't know English words
+# and Vosk just ignores phrases with words missing from its vocabulary)
+WAKE_PHRASES = ["claude", "ok claude"]
+STOP_PHRASES = ["stop", "merci", "arrête", "thanks", "close"]
+TRIGGER_PHRASES = ["fin claude", "envoyer", "terminé", "c'est tout", "end claude", "that's all", "send", "done"]
+
+def normalize_phrase(phrase):
+    return " ".join(phrase.lower().split())
+
+def match_words(words, phrases, min_confidence):
+    """First phrase found in the recognized words ([{"word", "conf"}...]), every word confident.
+
+    `phrases` is a list of normalized phrases, the longest is preferred ("ok claude" over "claude").
+    """
+    tokens = [w.get("word", "").lower() for w in words]
+    for phrase in sorted(phrases, key=lambda p: -len(p.split())):
+        parts = phrase.split()
+        n = len(parts)
+        for i in range(len(tokens) - n + 1):
+            if tokens[i:i + n] == parts:
+                confidence = min(w.get("conf", 1.0) for w in words[i:i + n])
+                if confidence >= min_confidence:
+                    return phrase
+    return None
+
+def phrase_confidence(words, phrases):
+    """Best confidence of one of the phrases in the recognized words, 0 if none is there.
+
+    A phrase is as confident as its weakest word: a sure "ok" doesn't hide an unsure "claude".
+    """
+    tokens = [w.get("word", "").lower() for w in words]
+    best = 0.0
+    for phrase in phrases:
+        parts = phrase.split()
+        n = len(parts)
+        for i in range(len(tokens) - n + 1):
+            if tokens[i:i + n] == parts:
+                best = max(best, min(w.get("conf", 1.0) for w in words[i:i + n]))
+    return best
+
+class KeywordSpotter:
+    """A Vosk recognizer restricted to `phrases` + [unk], fed chunk by chunk.
+
+    feed(data) returns the spotted phrase (or None). Partial results are checked too (Vosk gives
+    per-word confidences for them with SetPartialWords), so a wake word fires while the user keeps
+    talking instead of at the end of the sentence.
+    """
+
+    def __init__(self, model, phrases, min_confidence=0.7, sample_rate=16000, recognizer=None):
+        self.phrases = [normalize_phrase(p) for p in phrases]
+        self.min_confidence = min_confidence
+        if recognizer is None:
+            from vosk import KaldiRecognizer
+            grammar = json.dumps(sorted(set(self.phrases)) + ["[unk]"], ensure_ascii=False)
+            recognizer = KaldiRecognizer(model, sample_rate, grammar)
+        self.rec = recognizer
+        self.rec.SetWords(True)
+        self.partial_words = hasattr(self.rec, "SetPartialWords")
+        if self.partial_words:
+            self.rec.SetPartialWords(True) # vosk >= 0.3.45
+
+    def reset(self):
+        self.rec.Reset()
+
+    def feed(self, data):
+        if self.rec.AcceptWaveform(data):
+            result = json.loads(self.rec.Result())
+            return match_words(result.get("result", []), self.phrases, self.min_confidence)
+
+        partial = json.loads(self.rec.PartialResult())
+        if not partial.get("partial") or not self.partial_words:
+            return None # Old Vosk: no confidence on partials, wait for the final result
+        # The confidences of the same partial text still change as more audio comes in
+        phrase = match_words(partial.get("partial_result", []), self.phrases, self.min_confidence)
+        if phrase:
+            self.reset() # Don't report the same words again
+        return phrase
+
+class WakeVerifier:
+    """Second stage of the wake word: a full-vocabulary Vosk pass on the audio of the detection.
+
+    threshold: confidence the wake word needs in that pass, the operating point (higher: fewer
+    false wakes, more missed ones; python bench_keywords.py sweeps it on a corpus)
+    """
+
+    def __init__(self, model, phrases=WAKE_PHRASES, threshold=0.6, sample_rate=16000, recognizer=None):
+        self.phrases = [normalize_phrase(p) for p in phrases]
+        self.threshold = threshold
+        if recognizer is None:
+            from vosk import KaldiRecognizer
+            recognizer = KaldiRecognizer(model, sample_rate) # No grammar
+        self.rec = recognizer
+        self.rec.SetWords(True)
+        self.candidates = 0
+        self.accepted = 0
+        self.cpu_seconds = 0.0
+
+    @property
+    def rejected(self):
+        return self.candidates - self.accepted
+
+    def score(self, data):
+        """Confidence of the wake word in the audio (int16 bytes), 0 if it isn't recognized."""
+        self.rec.Reset()
+        self.rec.AcceptWaveform(data)
+        result = json.loads(self.rec.FinalResult())
+        return phrase_confidence(result.get("result", []), self.phrases)
+
+    def verify(self, data):
+        """(accepted, score) for a first-stage detection."""
+        start = time.thread_time()
+        score = self.score(data)
+        self.cpu_seconds += time.thread_time() - start
+        self.candidates += 1
+        accepted = score >= self.threshold
+        self.accepted += accepted
+        return accepted, score
@@ -0,0 +1,133 @@
+"""Launches applications and [EXEC: ...] commands off the audio thread.
+
+A single thread spawns the queued launches with posix_spawn (no fork of the whole Python
+process, no Popen bookkeeping), each child in its own session with /dev/null for stdio so it
+outlives us and doesn't get our signals. The children are then reaped as they exit (no zombies
+piling up over a long session), and launching an app that is still running focuses it instead
+of starting a second one. Apps and [EXEC: ...] commands all go this one way (not through
+Hyprland's exec, whose processes we couldn't track): the new window still opens on the active
+workspace. A simple command line is exec'd by the shell, so its pid is the app's own; a compound
+one (pipes, &&...) is never deduplicated. Only our own children are waited on: waitpid(-1)
+would steal the exit status of the Claude processes that subprocess is watching.
+"""
+import os
+import re
+import queue
+import threading
+import time
+
+# Anything that makes a command line more than one program: the shell can't exec it
+SHELL_SYNTAX = re.compile(r"[;&|<>`$()\n]")
+
+class LaunchDropped(Exception):
+    """Too many launches are waiting: this one wasn't queued."""
+
+class Child:
+    def __init__(self, pid, args, started):
+        self.pid = pid
+        self.args = args
+        self.started = started
+
+class Launcher:
+    """Queues launches for the launcher thread.
+
+    max_pending: launches waiting beyond this are dropped, LaunchDropped (an answer full of [EXEC: ...])
+    focus: function(pid) -> True if it brought that child's window to the front
+    on_spawn: function(name, seconds) called with the spawn latency of each launch
+    """
+
+    def __init__(self, max_pending=8, focus=None, on_spawn=None, reap_interval=1.0):
+        self.focus = focus
+        self.on_spawn = on_spawn
+        self.reap_interval = reap_interval
+        self.pending = queue.Queue(max_pending)
+        self.lock = threading.Lock()
+        self.children = {} # pid -> Child, still running
+        self.stats = {"spawned": 0, "focused": 0, "failed": 0, "dropped": 0, "reaped": 0}
+        self.queued = 0 # Launches not done yet
+        self.idle = threading.Event()
+        self.idle.set()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def launch(self, args, dedup=True):
+        """Starts `args` (argv list). With `dedup`, the same args still running are focused instead.
+
+        Raises LaunchDropped when too many launches are already waiting.
+        """
+        self._queue(list(args), False, dedup)
+
+    def run_shell(self, cmd, dedup=True):
+        """Starts a shell command line (an [EXEC: ...] from Claude), deduplicated by command line."""
+        if SHELL_SYNTAX.search(cmd):
+            self._queue(cmd, True, False) # The shell's pid owns no window: nothing to focus
+        else:
+            self._queue("exec " + cmd, True, dedup)
+
+    def running(self):
+        with self.lock:
+            return list(self.children.values())
+
+    def wait_idle(self, timeout=None):
+        """Blocks until the queued launches are done (tests)."""
+        return self.idle.wait(timeout)
+
+    def _queue(self, command, shell, dedup):
+        with self.lock:
+            try:
+                self.pending.put_nowait((command, shell, dedup, time.time()))
+            except queue.Full:
+                self.stats["dropped"] += 1
+                raise LaunchDropped(f"Too many launches pending, not started: {command}")
+            self.queued += 1
+            self.idle.clear()
+
+    def _loop(self):
+        while True:
+            try:
+                command, shell, dedup, queued = self.pending.get(timeout=self.reap_interval)
+            except queue.Empty:
+                self.reap()
+                continue
+            try:
+                self._launch(command, shell, dedup, queued)
+            except Exception as e:
+                print(f"Launch error ({command}): {e}")
+                self.stats["failed"] += 1
+            self.reap()
+            with self.lock:
+                self.queued -= 1
+                if not self.queued:
+                    self.idle.set()
+
+    def _launch(self, command, shell, dedup, queued):
+        args = ["/bin/sh", "-c", command] if shell else command
+        if dedup:
+            existing = next((c for c in self.running() if c.args == args), None)
+            if existing and self.focus and self.focus(existing.pid):
+                print(f"Already running, focused: {command}")
+                self.stats["focused"] += 1
+                return
+        name = command.split()[1 if command.startswith("exec ") else 0] if shell else os.path.basename(command[0])
+        pid = os.posix_spawnp(args[0], args, os.environ, setsid=True, file_actions=[
+            (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+            (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+            (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0),
+        ])
+        with self.lock:
+            self.children[pid] = Child(pid, args, time.time())
+        self.stats["spawned"] += 1
+        if self.on_spawn:
+            self.on_spawn(name, time.time() - queued) # Queued -> started, what the user waits for
+
+    def reap(self):
+        """Collects the exit status of the children that ended."""
+        for child in self.running():
+            try:
+                pid, _ = os.waitpid(child.pid, os.WNOHANG)
+            except ChildProcessError:
+                pid = child.pid # Already collected elsewhere
+            if pid:
+                with self.lock:
+                    self.children.pop(child.pid, None)
+                self.stats["reaped"] += 1
@@ -0,0 +1,295 @@
+"""LLM backends used by the AudioWorker.
+
+A backend keeps whatever it needs warm between requests and streams the answer back as text chunks.
+- ClaudeCliBackend: one long-lived `claude` CLI session (stream-json over stdin/stdout) + a hot spare
+- ClaudeOneShotBackend: the old behaviour, one `claude -p` process per request
+- StubBackend: local scripted answers, for offline tests and benchmarks
+"""
+import json
+import subprocess
+import threading
+
+from prompt_builder import CHARS_PER_TOKEN
+
+CLAUDE_COMMAND = ["claude", "-p", "--dangerously-skip-permissions"]
+# A warm session's context only grows: past this, the next request starts a fresh session with the
+# budgeted prompt (summary + recent turns). About twice the prompt budget (worker.PROMPT_BUDGET_TOKENS)
+SESSION_MAX_TOKENS = 6000
+
+class LLMCancelled(Exception):
+    """The request was cancelled (e.g. "stop" interruption)."""
+
+class LLMError(Exception):
+    """The backend failed to answer."""
+
+class LLMBackend:
+    """Interface shared by all backends."""
+
+    def start(self):
+        """Pre-spawns/warms up whatever the backend needs. Called once at startup."""
+
+    def stream(self, turn, full_prompt):
+        """Yields the answer in chunks.
+
+        `turn` is only the new user message, `full_prompt` also contains the system prompt
+        and the history: it is sent when the backend has no warm session that already knows them.
+        Raises LLMCancelled if cancel() was called during the request.
+        """
+        raise NotImplementedError
+
+    def note_turn(self, user_text, answer):
+        """A turn answered without the LLM (response cache): a warm session gets it with the next turn."""
+
+    def cancel(self):
+        """Aborts the in-flight request (if any)."""
+
+    def close(self):
+        """Releases every process/resource."""
+
+def catch_up(missed, turn):
+    """`turn` preceded by the turns a warm session didn't see."""
+    if not missed:
+        return turn
+    answered = "".join(f"User: {user}\nClaude: {answer}\n" for user, answer in missed)
+    return f"Answered meanwhile without you:\n{answered}\nUser: {turn}"
+
+class ClaudeCliBackend(LLMBackend):
+    """Keeps a `claude` CLI session warm and only sends the new turn.
+
+    The CLI runs with --input-format/--output-format stream-json, so one process answers
+    many requests and text deltas are yielded as soon as they arrive. A second process is
+    pre-spawned as a hot spare: when the active one is killed by a cancellation, the spare
+    takes over immediately (and gets the full prompt, since it has no history yet) while a
+    new spare starts in the background. The same happens when the session's context goes over
+    `max_session_tokens`, so the prompt budget and the rolling summary apply to it too.
+    """
+
+    def __init__(self, command=None, max_session_tokens=SESSION_MAX_TOKENS):
+        self.command = list(command or CLAUDE_COMMAND) + [
+            "--input-format", "stream-json",
+            "--output-format", "stream-json",
+            "--verbose",
+            "--include-partial-messages", # Token deltas instead of whole messages
+        ]
+        self.lock = threading.Lock() # One request at a time per session
+        self.pool_lock = threading.Lock()
+        self.active = None
+        self.active_warm = False # Has the active process already received the history?
+        self.session_chars = 0 # Sent to and received from the active process
+        self.max_session_tokens = max_session_tokens
+        self.missed = [] # (user, answer) answered from the cache since the last request
+        self.spare = None
+        self.cancelled = False
+
+    def _spawn(self):
+        return subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+
+    def _respawn_spare(self):
+        try:
+            spare = self._spawn()
+        except Exception as e:
+            print(f"Claude spare spawn error: {e}")
+            return
+        with self.pool_lock:
+            if self.spare is None:
+                self.spare = spare
+                return
+        spare.kill()
+
+    def _take_process(self):
+        """Returns a live process, promoting the hot spare if the active one died."""
+        with self.pool_lock:
+            if self.active is not None and self.active.poll() is None:
+                return self.active
+            self.active = self.spare or self._spawn()
+            self.active_warm = False
+            self.spare = None
+        threading.Thread(target=self._respawn_spare, daemon=True).start()
+        return self.active
+
+    def start(self):
+        self._take_process()
+
+    def note_turn(self, user_text, answer):
+        with self.pool_lock:
+            self.missed.append((user_text, answer))
+
+    def _recycle(self):
+        """Retires the active session: the spare takes over with the full (budgeted) prompt."""
+        with self.pool_lock:
+            process = self.active
+            self.active = None
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+
+    def stream(self, turn, full_prompt):
+        with self.lock:
+            self.cancelled = False
+            if self.active_warm and (self.session_chars + len(turn)) / CHARS_PER_TOKEN > self.max_session_tokens:
+                print(f"Claude session over {self.max_session_tokens} tokens, starting a fresh one")
+                self._recycle()
+            process = self._take_process()
+            with self.pool_lock:
+                missed, self.missed = self.missed, [] # A cold session gets them in full_prompt
+            if self.active_warm:
+                text = catch_up(missed, turn)
+            else:
+                text = full_prompt
+                self.session_chars = 0
+            self.session_chars += len(text)
+            message = {"type": "user", "message": {"role": "user", "content": [{"type": "text", "text": text}]}}
+            try:
+                process.stdin.write(json.dumps(message) + "\n")
+                process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                if self.cancelled:
+                    raise LLMCancelled()
+                raise LLMError(f"Claude session is gone: {e}")
+
+            finished = False
+            streamed = False # Text already received as deltas, ignore the full message
+            for line in process.stdout:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("type") == "stream_event":
+                    delta = event.get("event", {}).get("delta", {})
+                    if delta.get("type") == "text_delta" and delta.get("text"):
+                        streamed = True
+                        self.session_chars += len(delta["text"])
+                        yield delta["text"]
+                elif event.get("type") == "assistant" and not streamed:
+                    for block in event.get("message", {}).get("content", []):
+                        if block.get("type") == "text" and block.get("text"):
+                            self.session_chars += len(block["text"])
+                            yield block["text"]
+                elif event.get("type") == "result":
+                    if event.get("is_error"):
+                        raise LLMError(event.get("result") or event.get("subtype", "error"))
+                    finished = True
+                    break
+
+            if self.cancelled:
+                raise LLMCancelled()
+            if not finished:
+                raise LLMError(f"Claude terminated with an error: {process.poll()}")
+            self.active_warm = True
+
+    def cancel(self):
+        with self.pool_lock:
+            process = self.active
+            self.active = None
+        if process is not None and process.poll() is None:
+            self.cancelled = True
+            process.kill()
+
+    def close(self):
+        with self.pool_lock:
+            processes = [self.active, self.spare]
+            self.active = self.spare = None
+        for process in processes:
+            if process is not None and process.poll() is None:
+                process.kill()
+
+class ClaudeOneShotBackend(LLMBackend):
+    """One cold `claude -p` process per request (old behaviour).
+
+    The prompt goes through stdin: as a single argv element a long history could hit ARG_MAX.
+    """
+
+    def __init__(self, command=None):
+        self.command = list(command or CLAUDE_COMMAND)
+        self.process = None
+        self.cancelled = False
+
+    def stream(self, turn, full_prompt):
+        self.cancelled = False
+        self.process = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        try:
+            self.process.stdin.write(full_prompt)
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError) as e:
+            raise LLMError(f"Claude did not start: {e}")
+        # Read line by line (allows killing the process cleanly if needed)
+        for line in self.process.stdout:
+            yield line
+        self.process.wait()
+        if self.cancelled:
+            raise LLMCancelled()
+        if self.process.returncode != 0:
+            raise LLMError(f"Claude terminated with an error: {self.process.returncode}")
+
+    def cancel(self):
+        process = self.process
+        if process is not None and process.poll() is None:
+            self.cancelled = True
+            process.kill()
+
+class StubBackend(LLMBackend):
+    """Answers locally without any network: for offline tests and benchmarks.
+
+    `reply` is a string or a function(turn) -> string. The answer is streamed word by word,
+    waiting `first_token_delay` then `token_delay` seconds between chunks.
+    """
+
+    def __init__(self, reply=None, first_token_delay=0.0, token_delay=0.0):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.cancel_event = threading.Event()
+        self.requests = [] # (turn, prompt actually sent), handy for tests
+        self.warm = False # Has the stub "session" already received the history?
+        self.missed = []
+
+    def note_turn(self, user_text, answer):
+        self.missed.append((user_text, answer))
+
+    def stream(self, turn, full_prompt):
+        self.cancel_event.clear()
+        missed, self.missed = self.missed, []
+        self.requests.append((turn, catch_up(missed, turn) if self.warm else full_prompt))
+        self.warm = True
+        if callable(self.reply):
+            answer = self.reply(turn)
+        elif self.reply is not None:
+            answer = self.reply
+        else:
+            answer = f"You said: {turn}"
+
+        delay = self.first_token_delay
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            if self.cancel_event.wait(delay):
+                raise LLMCancelled()
+            delay = self.token_delay
+            yield word if i == len(words) - 1 else word + " "
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.warm = False # Like a killed CLI session, the next request starts cold
+
+def make_backend(name):
+    """Builds a backend from its configuration name: "cli", "oneshot" or "stub"."""
+    if name == "cli":
+        return ClaudeCliBackend()
+    if name == "oneshot":
+        return ClaudeOneShotBackend()
+    if name == "stub":
+        return StubBackend(first_token_delay=0.3, token_delay=0.05)
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -1,13 +1,72 @@
 import sys
-import subprocess
-import shutil
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtWidgets import QApplication
 from gui import ClaudeOverlay
-from worker import AudioWorker
+from hyprland import HyprlandIPC, HyprlandError
+import engine_client
+
+RECONNECT_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+RECONNECT_HEALTHY = 60.0 # A connection that lasted this long resets the backoff
+
+class EngineEvents(QThread):
+    """The engine daemon's events (engine.py) as the signals of AudioWorker, for the overlay.
+
+    Starts the daemon if needed and reconnects if it restarts: the models live there, not here.
+    A daemon that keeps failing (no model, no microphone) is restarted less and less often, and
+    why it failed is shown on the overlay.
+    """
+    signal_listening = pyqtSignal()
+    signal_recognized = pyqtSignal(str)
+    signal_processing = pyqtSignal(str)
+    signal_partial_response = pyqtSignal(str)
+    signal_finished = pyqtSignal(str)
+    signal_error = pyqtSignal(str)
+
+    def run(self):
+        signals = {"recognized": self.signal_recognized, "processing": self.signal_processing,
+                   "partial": self.signal_partial_response, "finished": self.signal_finished, "error": self.signal_error}
+        delay = RECONNECT_DELAY
+        while True:
+            connected = time.time()
+            error = None
+            shown = False # The daemon's own "Engine stopped: ..." event came through
+            try:
+                client = engine_client.connect()
+            except (OSError, engine_client.EngineError) as e:
+                error = f"Engine not started: {e}"
+            else:
+                try:
+                    for event in client.subscribe():
+                        if event["event"] == "listening":
+                            self.signal_listening.emit()
+                        elif event["event"] in signals:
+                            text = event.get("text") or ""
+                            signals[event["event"]].emit(text)
+                            shown = shown or text.startswith(engine_client.EXIT_PREFIX)
+                except (OSError, engine_client.EngineError) as e:
+                    print(f"Engine connection lost ({e})")
+                client.close()
+                stopped = engine_client.exit_error() # Also when it failed before we subscribed
+                if stopped and not shown:
+                    error = engine_client.EXIT_PREFIX + stopped
+                shown = shown or stopped is not None
+            if error:
+                print(error)
+                self.signal_error.emit(error)
+            # A daemon that keeps failing isn't restarted every second: each start reloads the models
+            if error or shown or time.time() - connected < RECONNECT_HEALTHY:
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            else:
+                delay = RECONNECT_DELAY
+            print(f"Reconnecting to the engine in {delay:.0f}s...")
+            time.sleep(delay)
 
 def configure_hyprland():
     """Dynamically injects rules to float the window under Hyprland."""
-    if shutil.which("hyprctl"):
+    ipc = HyprlandIPC()
+    if ipc.available:
         print("Hyprland detected: Injecting window rules...")
         rules = [
             "float,class:^(claude-overlay)$",
@@ -19,11 +78,11 @@ def configure_hyprland():
             # "move 100%-w-50 50%-h,class:^(claude-overlay)$", # Right + Vertically Centered (Disabled)
             "size 400 200,class:^(claude-overlay)$"
         ]
-        for rule in rules:
-            try:
-                subprocess.run(["hyprctl", "keyword", "windowrulev2", rule], check=False)
-            except Exception as e:
-                print(f"Hyprland error: {e}")
+        # All rules in one round trip on Hyprland's socket instead of one hyprctl per rule
+        try:
+            ipc.batch([f"keyword windowrulev2 {rule}" for rule in rules])
+        except HyprlandError as e:
+            print(f"Hyprland error: {e}")
 
 def main():
     # Configure surface format for transparency
@@ -44,13 +103,19 @@ def main():
     # Create the interface
     overlay = ClaudeOverlay()
     
-    # Create the audio worker (separate thread)
-    worker = AudioWorker()
+    # The engine (audio, ASR, Claude) runs in its own daemon, which keeps the models loaded
+    # across overlay restarts; --in-process runs it in this process like before
+    if "--in-process" in sys.argv:
+        from worker import AudioWorker
+        worker = AudioWorker()
+    else:
+        worker = EngineEvents()
     
     # Connect Worker -> GUI signals
     worker.signal_listening.connect(overlay.show_listening)
     worker.signal_recognized.connect(lambda text: overlay.show_processing(f"Heard: {text}"))
     worker.signal_processing.connect(lambda text: overlay.show_processing(f"Processing: {text}"))
+    worker.signal_partial_response.connect(overlay.show_partial_response)
     worker.signal_finished.connect(overlay.show_success)
     worker.signal_error.connect(overlay.handle_error)
     
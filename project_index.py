@@ -0,0 +1,237 @@
+"""In-memory index of the project folders, for "open the project ..." commands.
+
+The configured roots are crawled once in a background thread, then kept fresh by periodic
+rescans that only re-list the folders whose mtime changed. Lookups are fuzzy and ranked, served
+from memory through a trigram index, and the state is saved to disk so that a restart doesn't
+need a full crawl.
+"""
+import json
+import os
+import threading
+import time
+
+from intents import normalize
+
+# Folders never worth indexing (or descending into)
+SKIP_DIRS = {"node_modules", "__pycache__", "venv", "site-packages", "target", "build", "dist"}
+# Entries that make a folder look like a project (small ranking bonus)
+PROJECT_MARKERS = {".git", "pyproject.toml", "setup.py", "package.json", "Cargo.toml", "go.mod", "Makefile"}
+
+def compact(text):
+    """"Ok-Claude", "ok_claude" and "ok claude" all become "okclaude"."""
+    return normalize(text).replace(" ", "").replace("_", "")
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ProjectIndex:
+    """Folders under `roots` up to `max_depth`, with fuzzy lookup by name."""
+
+    def __init__(self, roots, max_depth=4, state_path="project_index.json", rescan_interval=300):
+        self.roots = [os.path.abspath(os.path.expanduser(r)) for r in roots]
+        self.max_depth = max_depth
+        self.state_path = state_path
+        self.rescan_interval = rescan_interval
+        self.lock = threading.Lock()
+        self.dirs = {} # path -> [mtime, depth, is_project]
+        self.names = {} # path -> compact folder name
+        self.gram_counts = {} # path -> number of trigrams in its name
+        self.by_trigram = {} # trigram -> set of paths
+        self.ready = threading.Event() # Set once a full crawl (or the saved state) is available
+        self.stop_event = threading.Event()
+        self.thread = None
+        self._load_state()
+
+    # --- Index maintenance ---
+
+    def _add(self, path, mtime, depth, is_project):
+        name = compact(os.path.basename(path))
+        self.dirs[path] = [mtime, depth, is_project]
+        self.names[path] = name
+        grams = trigrams(name)
+        self.gram_counts[path] = len(grams)
+        for gram in grams:
+            self.by_trigram.setdefault(gram, set()).add(path)
+
+    def _remove(self, path):
+        self.dirs.pop(path, None)
+        name = self.names.pop(path, None)
+        self.gram_counts.pop(path, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            paths = self.by_trigram.get(gram)
+            if paths:
+                paths.discard(path)
+                if not paths:
+                    del self.by_trigram[gram]
+
+    def _list(self, path):
+        """Returns (subfolders, is_project) for one folder."""
+        subdirs = []
+        is_project = False
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name in PROJECT_MARKERS:
+                        is_project = True
+                    if entry.name.startswith(".") or entry.name in SKIP_DIRS:
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return subdirs, is_project
+
+    def _crawl(self, path, depth):
+        """Indexes `path` and its subfolders (iterative, no recursion limit)."""
+        stack = [(path, depth)]
+        while stack and not self.stop_event.is_set():
+            path, depth = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            subdirs, is_project = self._list(path)
+            with self.lock:
+                if depth > 0: # The roots themselves are not results
+                    self._add(path, mtime, depth, is_project)
+                else:
+                    self.dirs[path] = [mtime, depth, is_project]
+            if depth < self.max_depth:
+                stack.extend((sub, depth + 1) for sub in subdirs)
+
+    def _rescan(self):
+        """Re-lists only the folders whose mtime changed. Returns True if something changed."""
+        changed = False
+        with self.lock:
+            known = list(self.dirs.items())
+        for path, (mtime, depth, _) in known:
+            if self.stop_event.is_set():
+                break
+            try:
+                current = os.stat(path).st_mtime
+            except OSError:
+                with self.lock:
+                    self._remove(path)
+                changed = True
+                continue
+            if current == mtime:
+                continue
+            changed = True
+            subdirs, is_project = self._list(path)
+            with self.lock:
+                self.dirs[path][0] = current
+                self.dirs[path][2] = is_project
+                new = [sub for sub in subdirs if sub not in self.dirs]
+            if depth < self.max_depth:
+                for sub in new:
+                    self._crawl(sub, depth + 1)
+        # Roots that didn't exist yet
+        for root in self.roots:
+            if root not in self.dirs and os.path.isdir(root):
+                self._crawl(root, 0)
+                changed = True
+        return changed
+
+    # --- Persistence ---
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("roots") != self.roots or state.get("max_depth") != self.max_depth:
+            return # Configuration changed: full crawl
+        for path, (mtime, depth, is_project) in state.get("dirs", {}).items():
+            if depth > 0:
+                self._add(path, mtime, depth, is_project)
+            else:
+                self.dirs[path] = [mtime, depth, is_project]
+        self.ready.set()
+        print(f"Project index loaded ({len(self.names)} folders)")
+
+    def save_state(self):
+        with self.lock:
+            state = {"roots": self.roots, "max_depth": self.max_depth, "dirs": dict(self.dirs)}
+        try:
+            temp_path = self.state_path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            print(f"Error saving project index: {e}")
+
+    # --- Background thread ---
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        start = time.time()
+        if self.ready.is_set():
+            changed = self._rescan()
+        else:
+            for root in self.roots:
+                self._crawl(root, 0)
+            changed = True
+        self.ready.set()
+        print(f"Project index ready ({len(self.names)} folders, {time.time() - start:.1f}s)")
+        if changed:
+            self.save_state()
+        while not self.stop_event.wait(self.rescan_interval):
+            if self._rescan():
+                self.save_state()
+
+    def stop(self):
+        self.stop_event.set()
+
+    # --- Lookups ---
+
+    def search(self, query, limit=5):
+        """Returns up to `limit` folder paths matching `query`, best first."""
+        query = compact(query)
+        if not query:
+            return []
+        grams = trigrams(query)
+        with self.lock:
+            postings = sorted((self.by_trigram.get(gram, ()) for gram in grams), key=len)
+            # A match shares at least half of the query trigrams, so it shows up in one of the
+            # rarest postings (pigeonhole): the most common trigrams are only used for counting
+            need = (len(postings) + 1) // 2
+            candidates = set().union(*postings[:len(postings) - need + 1])
+            scored = []
+            for path in candidates:
+                shared = sum(1 for paths in postings if path in paths)
+                if shared < need:
+                    continue
+                name = self.names[path]
+                if name == query:
+                    score = 3.0
+                elif name.startswith(query):
+                    score = 2.0 + len(query) / len(name)
+                elif query in name:
+                    score = 1.5 + len(query) / len(name)
+                else:
+                    # Dice coefficient on trigrams, tolerates transcription typos
+                    score = 2.0 * shared / (len(grams) + self.gram_counts[path])
+                    if score < 0.5:
+                        continue
+                _, depth, is_project = self.dirs[path]
+                if is_project:
+                    score += 0.2
+                score -= depth * 0.01 # Shallower first
+                scored.append((score, path))
+        scored.sort(reverse=True)
+        return [path for _, path in scored[:limit]]
+
+    def find(self, query):
+        """Best folder for `query`, or None."""
+        results = self.search(query, limit=1)
+        return results[0] if results else None
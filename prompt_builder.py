@@ -0,0 +1,125 @@
+"""Prompt assembly under a token budget.
+
+The prompt is the system prompt, a rolling summary of the older turns, the recent turns verbatim
+and the new command. The recent part is kept as ready-made text: a new message is appended, the
+oldest ones are cut off the front when the budget is exceeded, nothing is rebuilt per command.
+Messages pushed out of the recent window are folded into the summary by a background thread, so
+summarizing never delays a request (the prompt just uses the summary as it is at that moment).
+"""
+import threading
+import queue
+from collections import deque
+
+CHARS_PER_TOKEN = 4 # Rough estimate for French/English text, good enough for a budget
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate(text, max_tokens):
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " [...]"
+
+def first_sentence(text, max_chars=160):
+    """Extractive summary of one message: its first sentence, shortened."""
+    text = " ".join(text.split())
+    for end in (". ", "? ", "! ", "\n"):
+        index = text.find(end)
+        if 0 < index < max_chars:
+            return text[:index + 1]
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+def extractive_summarizer(summary, messages, max_tokens):
+    """Default summarizer (no LLM call): first sentence of each message, oldest lines dropped."""
+    lines = summary.splitlines() if summary else []
+    lines += [f"{role}: {first_sentence(text)}" for role, text in messages]
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+class PromptBuilder:
+    """Keeps the history part of the prompt ready to use and within `budget_tokens`.
+
+    budget_tokens: whole prompt (system + summary + recent turns + command)
+    summary_tokens: share of the budget for the rolling summary of older turns
+    message_tokens: a single message (a long Claude answer) is cut to this in the recent window
+    summarizer: function(summary, [(role, text)...], max_tokens) -> new summary
+    """
+
+    def __init__(self, system_prompt, budget_tokens=3000, summary_tokens=500, message_tokens=400,
+                 summarizer=extractive_summarizer):
+        self.system_prompt = system_prompt
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.message_tokens = message_tokens
+        self.summarizer = summarizer
+        self.lock = threading.Lock()
+        self.recent = deque() # (role, text, rendered line)
+        self.recent_text = "" # "".join of the rendered lines, maintained incrementally
+        self.summary = ""
+        self.folding = queue.Queue() # Messages waiting to be summarized
+        self.pending = 0 # Batches queued but not folded in yet
+        self.idle = threading.Event()
+        self.idle.set()
+        self.thread = threading.Thread(target=self._summarize_loop, daemon=True)
+        self.thread.start()
+
+    def add(self, *messages):
+        """Appends (role, text) messages, evicting the oldest ones to the summary if needed."""
+        with self.lock:
+            for role, text in messages:
+                line = f"{role}: {truncate(text, self.message_tokens)}\n"
+                self.recent.append((role, text, line))
+                self.recent_text += line
+            evicted = []
+            while len(self.recent) > 1 and estimate_tokens(self.recent_text) > self._recent_budget():
+                role, text, line = self.recent.popleft()
+                self.recent_text = self.recent_text[len(line):]
+                evicted.append((role, text))
+            if evicted:
+                self.pending += 1
+                self.idle.clear()
+                self.folding.put(evicted)
+
+    def add_turn(self, user_text, claude_text):
+        self.add(("User", user_text), ("Claude", claude_text))
+
+    def _recent_budget(self):
+        # What's left once the system prompt, the summary and a typical command are in
+        return self.budget_tokens - estimate_tokens(self.system_prompt) - self.summary_tokens - self.message_tokens
+
+    def build(self, command):
+        """The full prompt for `command` (used when the LLM session has no history yet)."""
+        with self.lock:
+            summary, recent_text = self.summary, self.recent_text
+        parts = [self.system_prompt, "\n\n"]
+        if summary:
+            parts += ["Summary of the earlier conversation:\n", summary, "\n\n"]
+        if recent_text:
+            parts += ["Conversation history:\n", recent_text, "\n"]
+        parts += ["User: ", command]
+        return "".join(parts)
+
+    def wait_idle(self, timeout=None):
+        """Blocks until the pending summaries are folded in (tests, shutdown)."""
+        return self.idle.wait(timeout)
+
+    def _summarize_loop(self):
+        while True:
+            messages = self.folding.get()
+            batches = 1
+            while not self.folding.empty(): # Fold everything waiting in one pass
+                messages += self.folding.get()
+                batches += 1
+            with self.lock:
+                summary = self.summary
+            try:
+                summary = self.summarizer(summary, messages, self.summary_tokens)
+            except Exception as e:
+                print(f"Summary error: {e}")
+            with self.lock:
+                self.summary = summary
+                self.pending -= batches
+                if not self.pending:
+                    self.idle.set()
@@ -0,0 +1,163 @@
+"""Cache of Claude's answers for repeated questions.
+
+"What's the command to restart pipewire?" gets the same answer every time: the second time it
+comes from here in a few milliseconds instead of a Claude round trip. Entries are keyed by the
+normalized command (plus the previous exchange for follow-up questions like "and tomorrow?"),
+evicted LRU-first past `max_entries` or after `ttl` seconds, and saved to a JSON file by a
+background thread (never on the thread that stores the answer).
+
+Not cached: time-sensitive questions (time, date, weather, news...: the answer changes), and
+answers containing [EXEC: ...] (replaying a command without Claude deciding again is unsafe).
+"""
+import hashlib
+import json
+import atexit
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from intents import normalize
+
+# Normalized words (no accents) that make an answer change with time
+TIME_SENSITIVE = re.compile(
+    r"\b(heure|heures|time|date|jour|jours|day|days|today|aujourd hui|demain|tomorrow|hier|yesterday|"
+    r"maintenant|now|ce soir|tonight|semaine|week|weekend|mois|month|annee|year|"
+    r"meteo|weather|quel temps|temps qu il fait|temps fait il|il fait|degres|temperature|pluie|pleut|rain|"
+    r"dehors|outside|actualite|actualites|news|derniere|dernieres|latest|actuel|actuelle|actuellement|"
+    r"current|currently|prix|price|cours)\b"
+)
+
+# Words that refer to the previous exchange: the key includes it
+FOLLOW_UP = re.compile(r"^(et|and|pourquoi|why|encore|again)\b|\b(ca|cela|celui|celle|that|this|it|le meme|the same)\b")
+
+class ResponseCache:
+    """LRU + TTL cache of answers, persisted to `path` (JSON)."""
+
+    def __init__(self, path="response_cache.json", max_entries=500, ttl=7 * 24 * 3600, max_answer_chars=4000):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_answer_chars = max_answer_chars # Don't keep essays
+        self.lock = threading.Lock()
+        self.entries = OrderedDict() # key -> {"answer", "created", "hits"}, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.saves = queue.Queue() # One item per change, the writer saves once for all that wait
+        self._load()
+        self.writer = None
+        if self.path:
+            self.writer = threading.Thread(target=self._write_loop, daemon=True)
+            self.writer.start()
+            atexit.register(self.close)
+
+    def key(self, command, previous_turn=()):
+        """Cache key of a command, None if it must not be cached.
+
+        previous_turn: the last (role, text) messages, only used for follow-up questions.
+        """
+        text = normalize(command)
+        if not text or TIME_SENSITIVE.search(text):
+            return None
+        if FOLLOW_UP.search(text):
+            context = "\n".join(f"{role}: {msg}" for role, msg in previous_turn)
+            text += "|" + hashlib.sha1(context.encode()).hexdigest()[:16]
+        return text
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry["created"] > self.ttl:
+                if entry is not None:
+                    del self.entries[key] # Expired
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            entry["hits"] += 1
+            self.hits += 1
+            return entry["answer"]
+
+    def put(self, key, answer):
+        """Stores an answer (returns False if it isn't cacheable)."""
+        if key is None or not answer or "[EXEC:" in answer or len(answer) > self.max_answer_chars:
+            return False
+        with self.lock:
+            self.entries[key] = {"answer": answer, "created": time.time(), "hits": 0}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        self._schedule_save()
+        return True
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        self._schedule_save()
+
+    def flush(self):
+        """Blocks until every change is on disk."""
+        if self.writer:
+            self.saves.join()
+
+    def close(self):
+        if self.writer and self.writer.is_alive():
+            self.saves.put(None)
+            self.writer.join()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading response cache: {e}")
+            return
+        now = time.time()
+        # Saved least recently used first, the order is the LRU order
+        for key, entry in entries.items():
+            if now - entry.get("created", 0) <= self.ttl:
+                self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _schedule_save(self):
+        if self.writer:
+            self.saves.put(True)
+
+    def _write_loop(self):
+        while True:
+            item = self.saves.get()
+            # Coalesce: a burst of answers costs one rewrite
+            items = [item]
+            while item is not None:
+                try:
+                    item = self.saves.get_nowait()
+                except queue.Empty:
+                    break
+                items.append(item)
+            if items != [None]: # Nothing changed
+                with self.lock:
+                    snapshot = dict(self.entries)
+                self._save(snapshot)
+            for _ in items:
+                self.saves.task_done()
+            if None in items:
+                return
+
+    def _save(self, entries):
+        try:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except (OSError, ValueError) as e:
+            print(f"Error saving response cache: {e}")
@@ -0,0 +1,187 @@
+"""LLM request scheduler: one executor thread, a bounded queue, cancellation tokens.
+
+Each request gets an ID and a CancelToken. Cancelling the token (explicitly, because a newer
+request superseded it, or because its deadline passed) runs the token's callbacks (e.g. killing
+the claude process) and makes token.check() raise, so a cancelled request can never emit its
+result afterwards. Requests run one at a time, in order: no two answers race for the overlay.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+class RequestCancelled(Exception):
+    """The request's token was cancelled (see token.reason)."""
+
+class CancelToken:
+    def __init__(self, deadline=None):
+        self.deadline = deadline # time.time() after which the request is cancelled
+        self.reason = None
+        self.event = threading.Event()
+        self.lock = threading.RLock()
+        self.callbacks = []
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.reason = reason
+            self.event.set()
+            # Under the lock: release() waits, a late callback can't hit the next request
+            for callback in self.callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Cancel callback error: {e}")
+            self.callbacks = []
+
+    def on_cancel(self, callback):
+        """Calls `callback` when the token is cancelled (right away if it already is)."""
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def release(self):
+        """The request is over: cancelling it from now on must not run the callbacks."""
+        with self.lock:
+            self.callbacks = []
+
+    def check(self):
+        """Raises RequestCancelled if the request must stop (call it before every side effect)."""
+        if self.deadline is not None and time.time() > self.deadline:
+            self.cancel("timeout")
+        if self.event.is_set():
+            raise RequestCancelled(self.reason)
+
+class Request:
+    def __init__(self, request_id, fn, token, name, background=False):
+        self.id = request_id
+        self.fn = fn
+        self.token = token
+        self.name = name
+        self.background = background # Speculative work: doesn't make the scheduler busy
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.state = "queued" # queued, running, done, failed, cancelled
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+class RequestScheduler:
+    """Runs fn(token) for each submitted request, one at a time.
+
+    max_queue: requests waiting beyond this drop the oldest one
+    """
+
+    def __init__(self, max_queue=4):
+        self.max_queue = max_queue
+        self.cond = threading.Condition()
+        self.queue = deque()
+        self.running = None
+        self.ids = itertools.count(1)
+        self.stats = {"completed": 0, "failed": 0, "cancelled": 0, "timeout": 0, "superseded": 0, "dropped": 0}
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.watchdog = threading.Thread(target=self._watch_deadlines, daemon=True)
+        self.watchdog.start()
+
+    @property
+    def busy(self):
+        """A (foreground) request is running or waiting (and not cancelled)."""
+        with self.cond:
+            requests = list(self.queue) + ([self.running] if self.running else [])
+            return any(not r.token.cancelled and not r.background for r in requests)
+
+    def submit(self, fn, timeout=None, supersede=True, name="request", background=False):
+        """Queues fn(token). With `supersede`, the older requests are cancelled (their results dropped)."""
+        token = CancelToken(time.time() + timeout if timeout else None)
+        request = Request(next(self.ids), fn, token, name, background)
+        with self.cond:
+            superseded = list(self.queue) + ([self.running] if self.running else []) if supersede else []
+            self.queue.append(request)
+            while len(self.queue) > self.max_queue:
+                dropped = self.queue.popleft()
+                self._cancel_queued(dropped, "dropped")
+            self.cond.notify_all()
+        for old in superseded:
+            old.token.cancel("superseded")
+        return request
+
+    def cancel(self, request, reason="cancelled"):
+        request.token.cancel(reason)
+
+    def cancel_all(self, reason="cancelled"):
+        with self.cond:
+            requests = list(self.queue) + ([self.running] if self.running else [])
+        for request in requests:
+            request.token.cancel(reason)
+
+    def close(self):
+        self.cancel_all("closed")
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def _cancel_queued(self, request, reason):
+        request.token.cancel(reason)
+        self._finish(request, "cancelled")
+
+    def _finish(self, request, state, error=None):
+        request.state = state
+        request.error = error
+        request.finished = time.time()
+        if state == "cancelled":
+            reason = request.token.reason
+            self.stats[reason if reason in self.stats else "cancelled"] += 1
+        else:
+            self.stats["completed" if state == "done" else "failed"] += 1
+        request.done.set()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                request = self.queue.popleft()
+                if request.token.cancelled: # Superseded while waiting
+                    self._finish(request, "cancelled")
+                    continue
+                self.running = request
+                request.state = "running"
+                request.started = time.time()
+            try:
+                request.fn(request.token)
+                state, error = ("cancelled", None) if request.token.cancelled else ("done", None)
+            except RequestCancelled:
+                state, error = "cancelled", None
+            except Exception as e:
+                print(f"Request {request.id} ({request.name}) error: {e}")
+                state, error = ("cancelled", None) if request.token.cancelled else ("failed", e)
+            request.token.release()
+            with self.cond:
+                self.running = None
+                self._finish(request, state, error)
+                self.cond.notify_all()
+
+    def _watch_deadlines(self):
+        # Enforces deadlines even when fn is blocked (waiting for the first token...)
+        while not self.closed:
+            time.sleep(0.1)
+            with self.cond:
+                requests = list(self.queue) + ([self.running] if self.running else [])
+            now = time.time()
+            for request in requests:
+                if request.token.deadline is not None and now > request.token.deadline:
+                    request.token.cancel("timeout")
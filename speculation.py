@@ -0,0 +1,94 @@
+"""Speculative Claude requests on the dictation buffer.
+
+In dictation mode the request only leaves after "send"/"end claude". When the buffer already
+looks like a complete request after a pause, the worker asks Claude right away, in the
+background: if the user then just says the trigger, the answer is (partly) there already. Until
+the speculation is committed, its side effects (signals, [EXEC: ...] commands, history) are held
+back; if the user says something else instead, it is discarded and nothing of it shows.
+"""
+import re
+import threading
+import time
+
+from intents import normalize
+
+# Punctuation Whisper puts at the end of a finished sentence
+SENTENCE_END = re.compile(r"[.?!]\W*$")
+
+def looks_complete(text, min_words=4):
+    """A dictation buffer worth speculating on: a few words ending like a sentence."""
+    return len(text.split()) >= min_words and bool(SENTENCE_END.search(text))
+
+def run_now(action, *args, replace=False):
+    """Side effects of a normal (non-speculative) request: applied immediately."""
+    action(*args)
+
+class Speculation:
+    """An answer computed ahead of the trigger. Side effects go through run()."""
+
+    def __init__(self, command):
+        self.command = command
+        self.key = normalize(command)
+        self.lock = threading.Lock()
+        self.held = [] # (action, args) waiting for commit(), in order
+        self.committed = False
+        self.completed = False # The whole answer arrived
+        self.request = None # scheduler.Request
+        self.response = ""
+        self.started = time.time()
+        self.finished = None
+
+    def matches(self, command):
+        return normalize(command) == self.key
+
+    def run(self, action, *args, replace=False):
+        """Applies a side effect if committed, otherwise holds it back.
+
+        replace: only the latest held call of this action matters (partial answer so far)
+        """
+        with self.lock: # Also keeps the replay and the live effects in order
+            if self.committed:
+                action(*args)
+                return
+            if replace:
+                self.held = [(a, b) for a, b in self.held if a != action]
+            self.held.append((action, args))
+
+    def commit(self):
+        """Replays the held side effects, the next ones are applied directly."""
+        with self.lock:
+            self.committed = True
+            held, self.held = self.held, []
+            for action, args in held:
+                action(*args)
+
+    def compute_seconds(self):
+        return (self.finished or time.time()) - self.started
+
+class SpeculationStats:
+    """Hit/miss counts and the Claude time spent on discarded answers."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.wasted_seconds = 0.0
+        self.wasted_chars = 0
+        self.saved_seconds = 0.0 # Claude time already done when the trigger came
+
+    def hit(self, speculation):
+        self.hits += 1
+        self.saved_seconds += speculation.compute_seconds()
+
+    def miss(self, speculation):
+        self.misses += 1
+        self.wasted_seconds += speculation.compute_seconds()
+        self.wasted_chars += len(speculation.response)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self):
+        return (f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%}), "
+                f"{self.saved_seconds:.1f}s saved, {self.wasted_seconds:.1f}s / {self.wasted_chars} chars wasted")
@@ -0,0 +1,108 @@
+import sys
+import json
+import textwrap
+
+import numpy as np
+import pytest
+
+import asr_backends
+from asr_backends import FasterWhisperBackend, load_backend, select_model
+
+# Stand-ins for the engines: bigger models are slower
+FAKE_WHISPER = textwrap.dedent("""
+    import time
+
+    COST = {"tiny": 0.01, "base": 0.03, "small": 0.2, "medium": 1.0}
+    loaded = []
+
+    class Model:
+        def __init__(self, name):
+            self.name = name
+
+        def transcribe(self, audio, **options):
+            time.sleep(COST[self.name] * len(audio) / 16000)
+            return {"text": f" {self.name} {options.get('language')}", "segments": []}
+
+    def load_model(name):
+        loaded.append(name)
+        return Model(name)
+""")
+
+FAKE_FASTER_WHISPER = textwrap.dedent("""
+    class Segment:
+        def __init__(self, start, end, text):
+            self.start, self.end, self.text = start, end, text
+
+    class WhisperModel:
+        def __init__(self, name, device="cpu", compute_type="default"):
+            self.compute_type = compute_type
+
+        def transcribe(self, audio, **options):
+            self.options = options
+            return iter([Segment(0.0, 1.0, " Ouvre"), Segment(1.0, 2.0, " Firefox.")]), None
+""")
+
+@pytest.fixture
+def fake_engines(tmp_path):
+    (tmp_path / "whisper.py").write_text(FAKE_WHISPER)
+    (tmp_path / "faster_whisper.py").write_text(FAKE_FASTER_WHISPER)
+    sys.path.insert(0, str(tmp_path))
+    yield tmp_path
+    sys.path.remove(str(tmp_path))
+    sys.modules.pop("whisper", None)
+    sys.modules.pop("faster_whisper", None)
+
+def test_faster_whisper_result_format(fake_engines):
+    backend = FasterWhisperBackend("base", "int8")
+    result = backend.transcribe(np.zeros(16000, dtype=np.float32), language="fr", fp16=False)
+    assert result["text"] == " Ouvre Firefox."
+    assert result["segments"][1] == {"start": 1.0, "end": 2.0, "text": " Firefox."}
+    assert backend.model.options == {"language": "fr"} # fp16 is a PyTorch-only option
+    assert backend.model.compute_type == "int8"
+
+def test_auto_picks_largest_model_within_budget(fake_engines):
+    cache = fake_engines / "asr_auto.json"
+    audio = np.zeros(16000, dtype=np.float32)
+    assert select_model("whisper", max_rtf=0.1, audio=audio, cache_path=str(cache)) == "base"
+    import whisper
+    assert whisper.loaded == ["tiny", "base", "small"] # Stops at the first one over budget
+    # Cached: no benchmark on the next start
+    whisper.loaded.clear()
+    assert select_model("whisper", max_rtf=0.1, audio=audio, cache_path=str(cache)) == "base"
+    assert whisper.loaded == []
+    assert list(json.loads(cache.read_text()).values())[0]["rtf"]["small"] > 0.1
+
+def test_unknown_engine_and_fallback(fake_engines, monkeypatch):
+    with pytest.raises(ValueError):
+        load_backend("kaldi")
+    monkeypatch.setitem(sys.modules, "faster_whisper", None) # Not installed
+    backend = load_backend("faster-whisper", "tiny")
+    assert backend.engine == "whisper"
+
+def test_auto_measures_on_the_speech_sample(fake_engines):
+    import wave
+    cache = fake_engines / "asr_auto.json"
+    assert select_model("whisper", max_rtf=0.1, cache_path=str(cache), sample_path=str(fake_engines / "none.wav")) == "base"
+    assert not cache.exists() # A guess, measured again once there is a sample
+    import whisper
+    assert whisper.loaded == []
+
+    sample = str(fake_engines / "sample.wav")
+    with wave.open(sample, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(b"\x00\x00" * 16000)
+    assert select_model("whisper", max_rtf=0.02, cache_path=str(cache), sample_path=sample) == "tiny"
+    assert whisper.loaded == ["tiny", "base"]
+
+def test_auto_measures_on_the_first_recorded_command(fake_engines, monkeypatch):
+    cache = fake_engines / "asr_auto.json"
+    monkeypatch.setattr(asr_backends, "AUTO_SAMPLE", str(fake_engines / "not_shipped.wav"))
+    monkeypatch.setattr(asr_backends, "AUTO_RECORDED", str(fake_engines / "asr_benchmark.wav"))
+    assert asr_backends.benchmark_sample() is None
+    assert select_model("whisper", max_rtf=0.02, cache_path=str(cache)) == "base" # First start: a guess
+    asr_backends.save_benchmark_sample(np.zeros(16000, dtype=np.int16), asr_backends.AUTO_RECORDED)
+    assert select_model("whisper", max_rtf=0.02, cache_path=str(cache)) == "tiny" # Next start: measured
+    import whisper
+    assert whisper.loaded == ["tiny", "base"]
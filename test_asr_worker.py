@@ -0,0 +1,80 @@
+import sys
+import textwrap
+import time
+
+import numpy as np
+import pytest
+
+from asr_worker import ASRClient, ASRCancelled, ASRError, PRIORITY_FINAL, PRIORITY_PARTIAL
+
+# Stand-in for the whisper package, imported by the worker process
+FAKE_WHISPER = textwrap.dedent("""
+    import os, time
+
+    class Model:
+        def transcribe(self, audio, **options):
+            seconds = len(audio) / 16000
+            if seconds == 3:
+                os._exit(1) # Crash on this one
+            if seconds == 5:
+                time.sleep(60) # Stuck on this one
+            if seconds == 2:
+                time.sleep(0.5)
+            return {"text": f"{seconds:g}s {options.get('language')} pid={os.getpid()}", "segments": []}
+
+    def load_model(name):
+        return Model()
+""")
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "whisper.py").write_text(FAKE_WHISPER)
+    sys.path.insert(0, str(tmp_path)) # Inherited by the spawned worker
+    client = ASRClient("fake", max_seconds=10)
+    client.start()
+    assert client.ready.wait(30)
+    yield client
+    client.close()
+    sys.path.remove(str(tmp_path))
+
+def seconds(n):
+    return np.zeros(int(n * 16000), dtype=np.float32)
+
+def test_transcribe_through_shared_memory(client):
+    result = client.transcribe(seconds(1), language="fr", timeout=10)
+    assert result["text"].startswith("1s fr")
+
+def test_priorities(client):
+    blocker = client.submit(seconds(2)) # Keeps the worker busy while we queue
+    partial = client.submit(seconds(0.5), priority=PRIORITY_PARTIAL)
+    final = client.submit(seconds(1), priority=PRIORITY_FINAL)
+    blocker.result(10)
+    final.result(10)
+    partial.result(10)
+    assert final.finished < partial.finished # Submitted last, served first
+
+def test_cancel_in_flight_drops_the_result_without_a_restart(client):
+    pid = client.transcribe(seconds(1), timeout=10)["text"].split("pid=")[1]
+    partial = client.submit(seconds(2), priority=PRIORITY_PARTIAL) # Takes 0.5 s
+    time.sleep(0.1)
+    client.cancel(partial)
+    with pytest.raises(ASRCancelled):
+        partial.result(0.1) # Right away, not when the worker is done with it
+    result = client.transcribe(seconds(1), timeout=10)
+    assert result["text"].endswith(f"pid={pid}") and client.restarts == 0 # Same process, model still loaded
+    assert partial.response is None
+
+def test_stuck_worker_is_restarted(client):
+    client.request_timeout = 1
+    stuck = client.submit(seconds(5))
+    with pytest.raises(ASRError, match="stuck"):
+        stuck.result(30)
+    assert client.restarts == 1
+    assert client.transcribe(seconds(1), timeout=30)["text"].startswith("1s")
+
+def test_crash_is_retried_then_reported(client):
+    crash = client.submit(seconds(3))
+    with pytest.raises(ASRError, match="crashed"):
+        crash.result(60)
+    assert client.restarts >= 1
+    assert client.transcribe(seconds(1), timeout=30)["text"].startswith("1s")
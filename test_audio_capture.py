@@ -0,0 +1,69 @@
+import numpy as np
+
+from audio_capture import AudioCapture, RingBuffer, RingReader
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeStream:
+    """PyAudio-like stream returning a counting signal, then end of stream.
+
+    With a clock, each read takes the time of its audio; at the reads in `overflow_at` we
+    were half a second late and the driver dropped that audio.
+    """
+
+    def __init__(self, total, overflow_at=(), clock=None):
+        self.total = total
+        self.sent = 0
+        self.reads = 0
+        self.overflow_at = set(overflow_at)
+        self.clock = clock
+
+    def read(self, n, exception_on_overflow=True):
+        self.reads += 1
+        if self.clock:
+            self.clock.now += n / 16000 + (0.5 if self.reads in self.overflow_at else 0)
+        n = min(n, self.total - self.sent)
+        data = (np.arange(self.sent, self.sent + n) % 30000).astype(np.int16).tobytes()
+        self.sent += n
+        return data
+
+def test_ring_wraparound_and_views():
+    ring = RingBuffer(10)
+    ring.write(np.arange(8, dtype=np.int16))
+    view = ring.read(2, 6)
+    assert view.base is ring.buffer # Zero-copy
+    ring.write(np.arange(8, 14, dtype=np.int16))
+    assert ring.oldest == 4
+    assert list(ring.read(0, 14)) == list(range(4, 14)) # Wraps, oldest samples are gone
+
+def test_reader_skips_overwritten_audio():
+    ring = RingBuffer(10)
+    reader = RingReader(ring, 0)
+    ring.write(np.arange(25, dtype=np.int16))
+    assert list(reader.read(3)) == [15, 16, 17]
+    assert reader.dropped == 15
+
+def test_capture_thread_and_preroll():
+    clock = FakeClock()
+    stream = FakeStream(16000, overflow_at=[3], clock=clock)
+    capture = AudioCapture(stream, chunk=1000, seconds=2, clock=clock)
+    reader = capture.reader()
+    capture.start()
+    audio = np.concatenate([reader.read(1000) for _ in range(15)])
+    assert len(audio) == 15000
+    assert list(audio[:3]) == [0, 1, 2]
+    assert capture.overruns == 1 and capture.lost_samples == 8000
+    capture.thread.join(2)
+    late = capture.reader(preroll=500)
+    assert late.position == 16000 - 500
+
+def test_reading_fast_from_a_file_is_not_an_overrun():
+    capture = AudioCapture(FakeStream(16000), chunk=1000, seconds=2) # Real clock, instant reads
+    capture.start()
+    capture.thread.join(2)
+    assert capture.overruns == 0 and capture.ring.position == 16000
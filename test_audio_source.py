@@ -0,0 +1,45 @@
+import time
+import wave
+
+import numpy as np
+
+from audio_source import FileSource, load_audio, SAMPLE_RATE
+
+def write_wav(path, samples, rate=SAMPLE_RATE, channels=1):
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+
+def test_load_audio_converts_to_16k_mono(tmp_path):
+    stereo = np.repeat(np.arange(8000, dtype=np.int16), 2) # 1s at 8 kHz, same on both channels
+    write_wav(tmp_path / "a.wav", stereo, rate=8000, channels=2)
+    audio = load_audio(str(tmp_path / "a.wav"))
+    assert len(audio) == SAMPLE_RATE
+    assert audio[0] == 0 and audio[-1] == 7999
+
+def test_script_segments_and_end_of_stream(tmp_path):
+    write_wav(tmp_path / "cmd.wav", np.full(8000, 1000))
+    source = FileSource([1.0, str(tmp_path / "cmd.wav"), 0.5], realtime=False, tail=0.5)
+    stream = source.open()
+    data = b""
+    while True:
+        chunk = stream.read(1000)
+        if not chunk:
+            break
+        data += chunk
+    audio = np.frombuffer(data, dtype=np.int16)
+    assert len(audio) == int(2.5 * SAMPLE_RATE)
+    [segment] = source.segments
+    assert (segment.start, segment.end) == (SAMPLE_RATE, SAMPLE_RATE + 8000)
+    assert np.all(audio[segment.start:segment.end] == 1000)
+    assert np.abs(audio[:segment.start]).max() < 1000 # Background noise, not zeros
+
+def test_realtime_pacing():
+    source = FileSource([0.5], speed=5.0, tail=0)
+    start = time.time()
+    while source.read(1600):
+        pass
+    assert 0.08 <= time.time() - start < 0.5 # 0.5s of audio at 5x
+    assert abs(source.wall_time(SAMPLE_RATE // 2) - source.start_time - 0.1) < 1e-6
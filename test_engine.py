@@ -0,0 +1,153 @@
+import socket
+import time
+
+import pytest
+
+from engine_client import EngineClient, EngineError, private_dir
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    import worker
+    from engine import EngineServer
+    from history import HistoryStore
+    from llm import StubBackend
+    from response_cache import ResponseCache
+    from tracing import Tracer
+
+    monkeypatch.setattr(worker, "tracer", Tracer(enabled=True))
+    monkeypatch.setattr(worker, "conversation_history", HistoryStore(str(tmp_path / "history.jsonl")))
+    monkeypatch.setattr(worker, "response_cache", ResponseCache(None))
+    audio_worker = worker.AudioWorker(audio_source=object(), llm=StubBackend("Tokyo, bien sûr.", token_delay=0.01), dry_run=True)
+    server = EngineServer(audio_worker, str(tmp_path / "engine.sock"))
+    server.start()
+    yield server
+    server.close()
+
+def events_until(events, name):
+    seen = []
+    for event in events:
+        seen.append(event)
+        if event["event"] == name:
+            return seen
+    raise AssertionError(name)
+
+def test_text_command_streams_events(engine):
+    subscriber = EngineClient(engine.path, timeout=5)
+    events = subscriber.subscribe()
+    client = EngineClient(engine.path, timeout=5)
+    reply = client.text("quelle est la capitale du Japon")
+    assert reply["message"] == "Processing..." and reply["id"]
+    seen = events_until(events, "finished")
+    names = [event["event"] if event["event"] != "stage" else event["name"] for event in seen]
+    assert names[0] == "command"
+    assert {event["id"] for event in seen} == {reply["id"]} # Every event says which command it's for
+    assert "processing" in names and "partial" in names and "first_token" in names
+    assert seen[-1]["text"] == "Tokyo, bien sûr."
+
+    deadline = time.time() + 5
+    while engine.audio_worker.is_processing_llm: # "finished" is sent just before the request ends
+        assert time.time() < deadline
+        time.sleep(0.01)
+    metrics = client.metrics()
+    assert metrics["scheduler"]["completed"] == 1
+    assert metrics["stages"]["llm_complete"]["count"] == 1
+    subscriber.close()
+    client.close()
+
+def test_late_events_of_a_superseded_command_keep_its_id(engine):
+    subscriber = EngineClient(engine.path, timeout=5)
+    events = subscriber.subscribe()
+    client = EngineClient(engine.path, timeout=5)
+    engine.audio_worker.llm.reply = lambda turn: " ".join(["mot"] * 40) if "histoire" in turn else "Tokyo."
+    first = client.text("raconte une longue histoire")["id"]
+    time.sleep(0.2) # Streaming
+    second = client.text("quelle est la capitale du Japon")["id"]
+    seen = []
+    for event in events:
+        seen.append(event)
+        if event["event"] == "finished" and event["id"] == second:
+            break
+    assert first != second
+    cancelled = [event["id"] for event in seen if event["event"] == "stage" and event["name"] == "llm_cancelled"]
+    assert cancelled == [first]
+    assert all(event["id"] in (first, second) for event in seen)
+    subscriber.close()
+    client.close()
+
+def test_errors_and_cancel(engine):
+    client = EngineClient(engine.path, timeout=5)
+    with pytest.raises(EngineError):
+        client.request("reboot")
+    with pytest.raises(EngineError):
+        client.text("   ")
+    assert client.cancel()["ok"]
+    client.sock.sendall(b"not json\n")
+    assert not client.receive()["ok"]
+    assert client.metrics()["ok"] # The connection survives bad requests
+    client.close()
+
+def test_refuses_to_start_twice_and_replaces_stale_socket(engine, tmp_path):
+    from engine import EngineServer
+    with pytest.raises(RuntimeError):
+        EngineServer(engine.audio_worker, engine.path).start()
+
+    stale = str(tmp_path / "stale.sock")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(stale) # Bound but nobody listening: like after a crash
+    sock.close()
+    server = EngineServer(engine.audio_worker, stale)
+    server.start()
+    EngineClient(stale, timeout=5).metrics()
+    server.close()
+
+def test_a_subscriber_that_stops_reading_is_dropped_without_blocking(engine):
+    stalled = EngineClient(engine.path, timeout=5)
+    stalled.subscribe() # And never reads again
+    import itertools
+    import threading
+    reader = EngineClient(engine.path, timeout=5)
+    events = reader.subscribe()
+    received = []
+    threading.Thread(target=lambda: received.extend(itertools.islice(events, 3000)), daemon=True).start()
+    start = time.time()
+    for i in range(3000): # Megabytes of partial answers: more than the socket buffers hold
+        engine.broadcast({"event": "partial", "text": "x" * 2000})
+        time.sleep(0.0001)
+    assert time.time() - start < 3 # The worker thread never waited for the stalled client
+    assert len(engine.subscribers) == 1
+    deadline = time.time() + 5
+    while len(received) < 3000: # The client that reads still gets everything
+        assert time.time() < deadline
+        time.sleep(0.01)
+    stalled.close()
+    reader.close()
+
+def test_connect_reports_why_the_daemon_exited(tmp_path, monkeypatch):
+    import subprocess
+    import sys
+    import engine_client
+
+    popen = subprocess.Popen
+    def failing_engine(args, **kwargs): # Exits at startup, like without a Vosk model
+        script = "import sys; print('Loading...'); print('Engine stopped: no model in models/fr'); print('Traceback of a child'); sys.exit(1)"
+        return popen([sys.executable, "-c", script], **kwargs)
+    monkeypatch.setattr(engine_client.subprocess, "Popen", failing_engine)
+    path = str(tmp_path / "engine.sock")
+    start = time.time()
+    with pytest.raises(EngineError, match="^no model in models/fr$"):
+        engine_client.connect(path, timeout=30)
+    assert time.time() - start < 10 # Not the whole timeout
+    assert engine_client.exit_error(path) == "no model in models/fr"
+    assert engine_client.exit_error(path, within=-1) is None # Too old
+
+def test_socket_fallback_directory_must_be_private(tmp_path):
+    import os
+    path = str(tmp_path / "claude-overlay-1000")
+    assert private_dir(path) == path and os.stat(path).st_mode & 0o777 == 0o700
+    assert private_dir(path) == path # Ours already
+    os.chmod(path, 0o777) # Someone else could have put a socket in it
+    with pytest.raises(PermissionError):
+        private_dir(path)
+    os.symlink(path, str(tmp_path / "link"))
+    with pytest.raises(PermissionError):
+        private_dir(str(tmp_path / "link"))
@@ -0,0 +1,70 @@
+import json
+import threading
+
+from history import HistoryStore
+
+def test_append_and_reload(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path, window=4)
+    for i in range(5):
+        store.append_turn(f"question {i}", f"answer {i}")
+    store.close()
+    assert store.recent() == [("User", "question 3"), ("Claude", "answer 3"), ("User", "question 4"), ("Claude", "answer 4")]
+
+    reloaded = HistoryStore(path, window=4)
+    assert reloaded.recent() == store.recent()
+    assert reloaded.recent(1) == [("Claude", "answer 4")]
+    reloaded.close()
+
+def read_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_compaction_moves_old_lines_to_the_archive(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path, window=4, max_entries=10, keep_entries=6)
+    for i in range(20):
+        store.append_turn(f"q{i}", f"a{i}")
+        if i % 3 == 0:
+            store.flush() # Compactions with and without messages still queued
+    store.close()
+    log, archive = read_log(path), read_log(path + ".1")
+    assert 6 <= len(log) <= 10
+    # Every message exactly once, in order, with its timestamp
+    assert [entry["text"] for entry in archive + log] == [text for i in range(20) for text in (f"q{i}", f"a{i}")]
+    assert all("ts" in entry for entry in archive + log)
+    assert HistoryStore(path, window=4).recent()[-1] == ("Claude", "a19")
+
+def test_archive_keeps_only_the_newest_lines(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path, window=4, max_entries=10, keep_entries=6, max_archive_entries=8)
+    for i in range(50):
+        store.append_turn(f"q{i}", f"a{i}")
+        store.flush()
+    store.close()
+    log, archive = read_log(path), read_log(path + ".1")
+    assert len(archive) == 8
+    texts = [entry["text"] for entry in archive + log]
+    assert texts == [text for i in range(50) for text in (f"q{i}", f"a{i}")][-len(texts):] # Newest, in order
+
+def test_concurrent_appends(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path, window=1000)
+    threads = [threading.Thread(target=lambda n=n: [store.append_turn(f"q{n}-{i}", "a") for i in range(50)]) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.close()
+    assert len(store) == 400
+    assert len(HistoryStore(path, window=1000)) == 400
+
+def test_legacy_migration(tmp_path, monkeypatch):
+    legacy = tmp_path / "history.json"
+    legacy.write_text(json.dumps([["User", "hello"], ["Claude", "hi"], ["User", "again"]]))
+    monkeypatch.chdir(tmp_path)
+    assert len(HistoryStore(str(tmp_path / "other.jsonl"))) == 0 # Only when asked (worker.py does)
+    store = HistoryStore(str(tmp_path / "history.jsonl"), window=2, legacy_path=str(legacy))
+    assert store.recent() == [("Claude", "hi"), ("User", "again")]
+    store.close()
+    assert len(read_log(tmp_path / "history.jsonl")) == 3 # Older than the window but not lost
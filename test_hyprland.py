@@ -0,0 +1,66 @@
+import os
+import socket
+import threading
+
+import pytest
+
+import hyprland
+from hyprland import HyprlandIPC, HyprlandError
+
+class FakeHyprland:
+    """Answers like Hyprland's request socket: one request per connection, "ok" per command."""
+
+    def __init__(self, path, fail_on=None):
+        self.requests = []
+        self.fail_on = fail_on
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with conn:
+                request = conn.recv(65536).decode()
+                self.requests.append(request)
+                commands = request[len("[[BATCH]]"):].split(";") if request.startswith("[[BATCH]]") else [request]
+                replies = ["invalid rule" if self.fail_on and self.fail_on in c else "ok" for c in commands]
+                conn.sendall("\n\n".join(replies).encode())
+
+    def close(self):
+        self.server.close()
+
+@pytest.fixture
+def fake(tmp_path):
+    server = FakeHyprland(str(tmp_path / ".socket.sock"), fail_on="bogus")
+    yield server
+    server.close()
+
+def test_batch_is_one_round_trip(fake, tmp_path):
+    ipc = HyprlandIPC(str(tmp_path / ".socket.sock"))
+    ipc.batch(["keyword windowrulev2 float,class:^(x)$", "keyword windowrulev2 pin,class:^(x)$"])
+    assert fake.requests == ["[[BATCH]]keyword windowrulev2 float,class:^(x)$;keyword windowrulev2 pin,class:^(x)$"]
+    with pytest.raises(HyprlandError):
+        ipc.batch(["keyword windowrulev2 bogus"])
+
+def test_socket_discovery(tmp_path, monkeypatch):
+    monkeypatch.setenv("HYPRLAND_INSTANCE_SIGNATURE", "abc")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert hyprland.socket_path() is None
+    os.makedirs(tmp_path / "hypr" / "abc")
+    (tmp_path / "hypr" / "abc" / ".socket.sock").touch()
+    assert hyprland.socket_path() == str(tmp_path / "hypr" / "abc" / ".socket.sock")
+    monkeypatch.delenv("HYPRLAND_INSTANCE_SIGNATURE")
+    assert hyprland.socket_path() is None
+
+def test_focus_pid(fake, tmp_path):
+    ipc = HyprlandIPC(str(tmp_path / ".socket.sock"))
+    assert hyprland.focus_pid(1234, ipc)
+    assert fake.requests == ["dispatch focuswindow pid:1234"]
+    fake.fail_on = "4321" # "No such window"
+    assert not hyprland.focus_pid(4321, ipc)
+    assert not hyprland.focus_pid(1234, HyprlandIPC(str(tmp_path / "missing.sock")))
@@ -0,0 +1,28 @@
+from intents import Intent, IntentMatcher, load_intents, normalize
+
+def test_normalize():
+    assert normalize("Ouvre l'Éditeur, VS Code !") == "ouvre l editeur vs code"
+
+def test_table_matches():
+    matcher = load_intents("intents.json")
+    assert matcher.match("Ouvre Firefox.").intent.name == "Firefox"
+    assert matcher.match("Lance VS Code !").intent.name == "VS Code"
+    assert matcher.match("open youtube in firefox").intent.name == "YouTube"
+    project = matcher.match("Open the project Ok-Claude.")
+    assert project.intent.kind == "project" and project.rest == "ok claude"
+    assert matcher.match("open the folder music").intent.kind == "project"
+    assert matcher.match("Ouvre lemonde.fr").intent.url == "https://lemonde.fr"
+
+def test_needs_trigger():
+    matcher = load_intents("intents.json")
+    assert matcher.match("firefox est lent aujourd'hui") is None
+    assert matcher.match("Quelle heure est-il ?") is None
+
+def test_overlapping_keywords():
+    intents = [
+        Intent("Short", "app", ["code"], exec=["a"]),
+        Intent("Long", "app", ["studio code insiders"], exec=["b"]),
+    ]
+    matcher = IntentMatcher(intents, ["open"])
+    assert matcher.match("open studio code insiders").intent.name == "Long"
+    assert matcher.match("open the code").intent.name == "Short"
@@ -0,0 +1,72 @@
+import json
+
+from keyword_spotter import KeywordSpotter, WakeVerifier, match_words, WAKE_PHRASES
+
+def words(*pairs):
+    return [{"word": word, "conf": conf} for word, conf in pairs]
+
+class FakeRecognizer:
+    """Plays back scripted Vosk results: ("partial", words) or ("final", words) per chunk."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.resets = 0
+
+    def SetWords(self, enabled):
+        pass
+
+    def SetPartialWords(self, enabled):
+        pass
+
+    def Reset(self):
+        self.resets += 1
+
+    def AcceptWaveform(self, data):
+        self.current = self.script.pop(0)
+        return self.current[0] == "final"
+
+    def Result(self):
+        return json.dumps({"result": self.current[1], "text": " ".join(w["word"] for w in self.current[1])})
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(w["word"] for w in self.current[1]), "partial_result": self.current[1]})
+
+def test_match_words_prefers_longest_confident_phrase():
+    assert match_words(words(("ok", 0.9), ("claude", 0.95)), ["claude", "ok claude"], 0.7) == "ok claude"
+    assert match_words(words(("[unk]", 1.0), ("claude", 0.5)), ["claude"], 0.7) is None # Not confident
+    assert match_words(words(("clause", 0.99)), ["claude"], 0.7) is None
+
+def test_spotter_fires_on_confident_partial_once():
+    rec = FakeRecognizer([
+        ("partial", words(("[unk]", 1.0))),
+        ("partial", words(("[unk]", 1.0), ("claude", 0.4))), # Still unsure
+        ("partial", words(("[unk]", 1.0), ("claude", 0.9))),
+        ("partial", words(("[unk]", 1.0))), # New utterance after the reset
+    ])
+    spotter = KeywordSpotter(None, WAKE_PHRASES, 0.7, recognizer=rec)
+    assert [spotter.feed(b"") for _ in range(3)] == [None, None, "claude"]
+    assert rec.resets == 1
+    assert spotter.feed(b"") is None # After the reset, not repeated
+
+def test_spotter_checks_final_results():
+    rec = FakeRecognizer([("final", words(("envoyer", 0.85)))])
+    spotter = KeywordSpotter(None, ["Envoyer"], 0.7, recognizer=rec)
+    assert spotter.feed(b"") == "envoyer"
+
+def test_verifier_rescores_with_the_full_vocabulary():
+    class FullVocabulary(FakeRecognizer):
+        def FinalResult(self):
+            return self.Result()
+    rec = FullVocabulary([
+        ("final", words(("ok", 0.9), ("claude", 0.8))),
+        ("final", words(("ok", 1.0), ("claude", 0.5))),
+        ("final", words(("la", 1.0), ("clause", 0.9))), # The grammar spotter heard "claude"
+        ("final", words(("claude", 0.5))),
+    ])
+    verifier = WakeVerifier(None, threshold=0.6, recognizer=rec)
+    assert verifier.verify(b"") == (True, 0.8)
+    assert verifier.verify(b"") == (False, 0.5) # A sure "ok" doesn't make an unsure "claude" a wake
+    assert verifier.verify(b"") == (False, 0.0)
+    assert verifier.verify(b"") == (False, 0.5)
+    assert (verifier.candidates, verifier.rejected) == (4, 3)
+    assert rec.resets == 4
@@ -0,0 +1,83 @@
+import os
+import time
+
+from launcher import Launcher, LaunchDropped
+
+def wait_until(condition):
+    deadline = time.time() + 5
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+def test_spawns_and_reaps(tmp_path):
+    spawns = []
+    launcher = Launcher(on_spawn=lambda name, seconds: spawns.append(name), reap_interval=0.05)
+    target = tmp_path / "ran"
+    launcher.run_shell(f"touch {target}")
+    launcher.launch(["true"])
+    assert launcher.wait_idle(5)
+    wait_until(lambda: target.exists())
+    wait_until(lambda: not launcher.running()) # Both exited and were waited on
+    assert launcher.stats["spawned"] == 2 and launcher.stats["reaped"] == 2
+    assert spawns == ["touch", "true"]
+
+def test_children_are_detached(tmp_path):
+    launcher = Launcher(reap_interval=0.05)
+    launcher.launch(["sleep", "5"])
+    assert launcher.wait_idle(5)
+    child, = launcher.running()
+    assert os.getsid(child.pid) == child.pid # Own session
+    os.kill(child.pid, 9)
+    wait_until(lambda: not launcher.running())
+
+def test_running_app_is_focused_instead_of_spawned_again():
+    focused = []
+    launcher = Launcher(focus=lambda pid: focused.append(pid) or True)
+    launcher.launch(["sleep", "5"])
+    launcher.launch(["sleep", "5"])
+    launcher.launch(["sleep", "5"], dedup=False)
+    assert launcher.wait_idle(5)
+    children = launcher.running()
+    assert len(children) == 2 and focused == [children[0].pid]
+    assert launcher.stats["focused"] == 1
+    for child in children:
+        os.kill(child.pid, 9)
+
+def test_shell_commands_are_tracked_and_deduplicated():
+    focused = []
+    launcher = Launcher(focus=lambda pid: focused.append(pid) or True)
+    launcher.run_shell("sleep 5") # An [EXEC: ...] asked twice
+    launcher.run_shell("sleep 5")
+    launcher.run_shell("sleep 6 && true") # Compound: the shell stays, never focused
+    launcher.run_shell("sleep 6 && true")
+    launcher.launch(["/nonexistent/app"])
+    assert launcher.wait_idle(5)
+    children = launcher.running()
+    simple = next(child for child in children if child.args == ["/bin/sh", "-c", "exec sleep 5"])
+    assert focused == [simple.pid] and len(children) == 3
+    with open(f"/proc/{simple.pid}/comm") as f:
+        assert f.read().strip() == "sleep" # The app's own pid, the one that owns its window
+    assert launcher.stats["spawned"] == 3 and launcher.stats["failed"] == 1
+    for child in children:
+        os.kill(child.pid, 9)
+
+def test_pending_launches_are_capped():
+    launcher = Launcher(max_pending=2, on_spawn=lambda name, seconds: time.sleep(0.2))
+    dropped = 0
+    for n in range(5):
+        try:
+            launcher.run_shell(f"echo {n}")
+        except LaunchDropped:
+            dropped += 1
+    assert launcher.wait_idle(5)
+    assert dropped >= 2 and launcher.stats["dropped"] == dropped
+    assert launcher.stats["spawned"] + dropped == 5
+
+def test_many_running_apps_do_not_block_new_launches():
+    launcher = Launcher()
+    for n in range(20):
+        launcher.launch(["sleep", str(5 + n)])
+        assert launcher.wait_idle(5)
+    assert len(launcher.running()) == 20 and launcher.stats["dropped"] == 0
+    for child in launcher.running():
+        os.kill(child.pid, 9)
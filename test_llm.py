@@ -0,0 +1,78 @@
+import sys
+import threading
+import textwrap
+
+import pytest
+
+from llm import ClaudeCliBackend, ClaudeOneShotBackend, StubBackend, LLMCancelled
+
+# Minimal stand-in for `claude -p --input-format stream-json --output-format stream-json`:
+# answers each user message with its text and the pid, or hangs on "hang".
+FAKE_CLAUDE = textwrap.dedent("""
+    import json, os, sys, time
+    for line in sys.stdin:
+        text = json.loads(line)["message"]["content"][0]["text"]
+        if text == "hang":
+            time.sleep(60)
+        print(json.dumps({"type": "assistant", "message": {"content": [{"type": "text", "text": f"{os.getpid()}:{text}"}]}}), flush=True)
+        print(json.dumps({"type": "result", "is_error": False, "result": text}), flush=True)
+""")
+
+@pytest.fixture
+def cli_backend(tmp_path):
+    script = tmp_path / "fake_claude.py"
+    script.write_text(FAKE_CLAUDE)
+    backend = ClaudeCliBackend(command=[sys.executable, str(script)])
+    backend.start()
+    yield backend
+    backend.close()
+
+def test_cli_session_stays_warm(cli_backend):
+    first = "".join(cli_backend.stream("hello", "SYSTEM + HISTORY\nUser: hello"))
+    second = "".join(cli_backend.stream("again", "SYSTEM + HISTORY\nUser: again"))
+    pid, text = first.split(":", 1)
+    assert text == "SYSTEM + HISTORY\nUser: hello" # Cold session gets everything
+    assert second == f"{pid}:again" # Same process, only the new turn
+
+def test_cli_cancel_promotes_spare(cli_backend):
+    "".join(cli_backend.stream("hello", "full hello"))
+    first_pid = cli_backend.active.pid
+    timer = threading.Timer(0.5, cli_backend.cancel)
+    timer.start()
+    with pytest.raises(LLMCancelled):
+        "".join(cli_backend.stream("hang", "full hang"))
+    answer = "".join(cli_backend.stream("next", "full next"))
+    pid, text = answer.split(":", 1)
+    assert int(pid) != first_pid
+    assert text == "full next" # The spare has no history yet
+
+def test_stub_streams_and_cancels():
+    backend = StubBackend(reply="one two three", token_delay=0.2)
+    chunks = backend.stream("hi", "full hi")
+    assert next(chunks) == "one "
+    backend.cancel()
+    with pytest.raises(LLMCancelled):
+        list(chunks)
+    assert "".join(StubBackend().stream("hi", "full hi")) == "You said: hi"
+
+def test_oneshot_prompt_goes_through_stdin():
+    backend = ClaudeOneShotBackend(command=[sys.executable, "-c", "import sys; print(len(sys.stdin.read()))"])
+    prompt = "x" * 3_000_000 # Over the Linux limit for a single argv element (128 KiB)
+    assert "".join(backend.stream("x", prompt)).strip() == str(len(prompt))
+
+def test_cli_session_is_recycled_over_its_token_budget(cli_backend):
+    cli_backend.max_session_tokens = 10 # 40 chars
+    first = "".join(cli_backend.stream("hello", "full hello"))
+    warm = "".join(cli_backend.stream("again", "full again"))
+    pid = first.split(":", 1)[0]
+    assert warm == f"{pid}:again"
+    answer = "".join(cli_backend.stream("once more " * 3, "budgeted prompt"))
+    new_pid, text = answer.split(":", 1)
+    assert new_pid != pid and text == "budgeted prompt" # Fresh session, summary + recent turns
+
+def test_cli_warm_session_catches_up_on_cached_turns(cli_backend):
+    "".join(cli_backend.stream("hello", "full hello"))
+    cli_backend.note_turn("weather?", "Sunny.")
+    answer = "".join(cli_backend.stream("and tomorrow?", "full prompt"))
+    assert answer.split(":", 1)[1] == "Answered meanwhile without you:\nUser: weather?\nClaude: Sunny.\n\nUser: and tomorrow?"
+    assert "".join(cli_backend.stream("ok", "full ok")).endswith(":ok") # Sent once
@@ -0,0 +1,79 @@
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PyQt6.QtCore import QRectF
+from PyQt6.QtWidgets import QApplication
+
+import gui
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+@pytest.fixture
+def overlay(app):
+    overlay = gui.ClaudeOverlay()
+    yield overlay
+    overlay.hide()
+    overlay.deleteLater()
+
+def run_events(app, seconds):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.002)
+
+def test_logo_is_scaled_once_not_per_frame(overlay, app, monkeypatch):
+    assert sorted(overlay.logo_frames) == list(range(95, 106)) # One frame per breathing size
+    monkeypatch.setattr(gui, "QPixmap", None) # Any decoding or scaling while painting would fail
+    overlay.show_listening()
+    run_events(app, 0.1)
+    overlay.repaint()
+    assert overlay.frames_painted["LISTENING"] > 0
+
+def test_no_wakeups_when_hidden_idle_or_done(overlay, app):
+    overlay.set_state("LISTENING") # Hidden: no timer
+    run_events(app, 0.2)
+    assert not overlay.anim_timer.isActive() and overlay.animation_ticks == {}
+
+    overlay.show()
+    overlay.set_state("IDLE")
+    run_events(app, 0.2)
+    overlay.show_success("Done")
+    run_events(app, 0.1) # The repaint of the new text
+    painted = dict(overlay.frames_painted)
+    run_events(app, 0.3)
+    assert overlay.animation_ticks == {}
+    assert overlay.frames_painted == painted # A static overlay isn't repainted either
+
+    overlay.show_listening()
+    run_events(app, 0.1)
+    overlay.hide()
+    ticks = dict(overlay.animation_ticks)
+    run_events(app, 0.2)
+    assert overlay.animation_ticks == ticks
+
+def test_frame_rate_per_state(overlay, app):
+    overlay.show_listening()
+    run_events(app, 0.5)
+    listening = overlay.animation_ticks.get("LISTENING", 0)
+    assert 15 <= listening <= 35 # 16 ms timer: ~31 in 0.5 s
+    overlay.show_processing("Processing: test")
+    run_events(app, 0.5)
+    assert 7 <= overlay.animation_ticks.get("PROCESSING", 0) <= 17 # 33 ms timer: ~15
+
+def test_dirty_rect_covers_the_fallback_logo(app, monkeypatch):
+    from PyQt6.QtGui import QPixmap
+    monkeypatch.setattr(gui, "QPixmap", lambda path: QPixmap()) # logo.png missing: the fallback is drawn
+    overlay = gui.ClaudeOverlay()
+    overlay.show_processing("Processing: test")
+    rect = QRectF(overlay.animation_rect())
+    size = gui.LOGO_BASE_SIZE * 1.05 # Top of the breath
+    center_x, center_y = overlay.width() / 2, gui.LOGO_CENTER_Y
+    logo = QRectF(center_x - size * 0.8, center_y - size * 0.8, size * 1.6, size * 1.6)
+    assert rect.contains(logo)
+    overlay.hide()
+    overlay.deleteLater()
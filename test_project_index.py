@@ -0,0 +1,42 @@
+import os
+import time
+
+from project_index import ProjectIndex
+
+def make_tree(root):
+    for path in ["code/Ok-Claude/src", "code/other_project", "Documents/claude notes", "code/node_modules/claude", ".cache/ok-claude"]:
+        os.makedirs(root / path)
+    (root / "code" / "Ok-Claude" / ".git").mkdir()
+
+def test_fuzzy_ranked_lookup(tmp_path):
+    make_tree(tmp_path)
+    index = ProjectIndex([str(tmp_path)], state_path=str(tmp_path / "index.json"))
+    index._crawl(index.roots[0], 0)
+    assert index.find("ok claude") == str(tmp_path / "code" / "Ok-Claude")
+    assert index.find("okclod") == str(tmp_path / "code" / "Ok-Claude") # Transcription typo
+    assert index.find("other project") == str(tmp_path / "code" / "other_project")
+    assert index.find("nothing like this") is None
+    # Hidden folders and node_modules are not indexed
+    assert not any(".cache" in p or "node_modules" in p for p in index.search("claude", limit=10))
+
+def test_state_survives_restart_and_rescan(tmp_path):
+    make_tree(tmp_path)
+    state = str(tmp_path / "index.json")
+    index = ProjectIndex([str(tmp_path)], state_path=state)
+    index.start()
+    assert index.ready.wait(5)
+    index.stop()
+    deadline = time.time() + 5
+    while not os.path.exists(state) and time.time() < deadline:
+        time.sleep(0.01)
+
+    restarted = ProjectIndex([str(tmp_path)], state_path=state)
+    assert restarted.ready.is_set() # No crawl needed
+    assert restarted.find("ok claude") == str(tmp_path / "code" / "Ok-Claude")
+
+    time.sleep(0.01) # Coarse mtime resolution on some filesystems
+    os.makedirs(tmp_path / "code" / "brand-new")
+    os.rmdir(tmp_path / "code" / "other_project")
+    assert restarted._rescan()
+    assert restarted.find("brand new") == str(tmp_path / "code" / "brand-new")
+    assert restarted.find("other project") is None
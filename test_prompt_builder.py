@@ -0,0 +1,46 @@
+from prompt_builder import PromptBuilder, estimate_tokens, extractive_summarizer
+
+SYSTEM = "You are Claude."
+
+def test_budget_is_enforced_and_old_turns_are_summarized():
+    builder = PromptBuilder(SYSTEM, budget_tokens=400, summary_tokens=80, message_tokens=60)
+    for i in range(20):
+        builder.add_turn(f"Question {i}? With some details.", f"Answer {i}. " + "blah " * 100)
+    assert builder.wait_idle(5)
+    prompt = builder.build("Et maintenant ?")
+    assert estimate_tokens(prompt) <= 400
+    assert prompt.startswith(SYSTEM)
+    assert prompt.endswith("User: Et maintenant ?")
+    assert "Answer 19." in prompt # The last turn is verbatim...
+    assert "blah " * 100 not in prompt # ...but cut to message_tokens
+    assert "Summary of the earlier conversation:" in prompt
+    assert "User: Question 0?" not in prompt.split("Conversation history:")[1]
+
+def test_recent_text_is_incremental():
+    builder = PromptBuilder(SYSTEM, budget_tokens=10_000)
+    builder.add(("User", "Bonjour"), ("Claude", "Salut !"))
+    assert builder.recent_text == "User: Bonjour\nClaude: Salut !\n"
+    builder.add_turn("Ça va ?", "Oui.")
+    assert builder.recent_text.endswith("User: Ça va ?\nClaude: Oui.\n")
+    assert builder.build("Merci") == SYSTEM + "\n\nConversation history:\n" + builder.recent_text + "\nUser: Merci"
+
+def test_summary_happens_off_the_request_path():
+    import threading
+    release = threading.Event()
+    def slow_summarizer(summary, messages, max_tokens):
+        release.wait(5)
+        return extractive_summarizer(summary, messages, max_tokens)
+    builder = PromptBuilder(SYSTEM, budget_tokens=200, summary_tokens=40, message_tokens=40, summarizer=slow_summarizer)
+    for i in range(10):
+        builder.add_turn(f"Question {i}.", f"Answer {i}. " + "x " * 50)
+    # build() doesn't wait for the summarizer, it uses the summary as it is
+    assert "Summary" not in builder.build("?")
+    release.set()
+    assert builder.wait_idle(5)
+    assert "Summary of the earlier conversation:" in builder.build("?")
+
+def test_extractive_summarizer_respects_budget():
+    summary = extractive_summarizer("", [("User", "Première question. Suite."), ("Claude", "Réponse courte.")], 100)
+    assert summary == "User: Première question.\nClaude: Réponse courte."
+    long = extractive_summarizer(summary, [("User", f"Question {i}.") for i in range(100)], 20)
+    assert estimate_tokens(long) <= 20 and long.endswith("Question 99.")
@@ -0,0 +1,62 @@
+import time
+
+from response_cache import ResponseCache
+
+def test_hit_after_put_with_normalized_key(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.json"))
+    key = cache.key("Quelle est la commande pour redémarrer PipeWire ?")
+    assert cache.get(key) is None
+    assert cache.put(key, "systemctl --user restart pipewire")
+    assert cache.get(cache.key("quelle est la commande pour redemarrer pipewire")) == "systemctl --user restart pipewire"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_time_sensitive_and_exec_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.json"))
+    assert cache.key("Quelle heure est-il à Tokyo ?") is None
+    assert cache.key("What's the weather like?") is None
+    for question in ["Quel temps fait-il à Paris ?", "What day is it?", "What year is it?", "Il fait combien dehors ?",
+                     "Combien de degrés à Lyon ?", "On est quelle date ?", "C'est quoi la météo demain ?",
+                     "Qu'est-ce qui sort cette semaine au cinéma ?"]:
+        assert cache.key(question) is None, question
+    key = cache.key("ouvre le lecteur de musique")
+    assert not cache.put(key, "Voilà [EXEC: spotify]")
+    assert cache.get(key) is None
+
+def test_follow_up_questions_depend_on_the_previous_turn(tmp_path):
+    cache = ResponseCache(None)
+    first = cache.key("Et pourquoi ?", [("User", "Le ciel est bleu ?"), ("Claude", "Oui.")])
+    second = cache.key("Et pourquoi ?", [("User", "La mer est salée ?"), ("Claude", "Oui.")])
+    assert first != second
+    assert cache.key("C'est quoi Linux ?", [("User", "a")]) == cache.key("C'est quoi Linux ?", [("User", "b")])
+
+def test_lru_ttl_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(path, max_entries=2, ttl=60)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a") # "b" is now the least recently used
+    cache.put("c", "C")
+    assert cache.get("b") is None and len(cache) == 2
+
+    cache.flush() # Saved in the background
+    reloaded = ResponseCache(path, max_entries=2, ttl=60)
+    assert reloaded.get("a") == "A" and reloaded.get("c") == "C"
+
+    cache.entries["a"]["created"] = time.time() - 61 # Expired
+    assert cache.get("a") is None and len(cache) == 1
+
+def test_put_does_not_write_on_the_caller_thread(tmp_path, monkeypatch):
+    import threading
+
+    cache = ResponseCache(str(tmp_path / "cache.json"))
+    writers = []
+    save = cache._save
+    def recording_save(entries):
+        writers.append(threading.current_thread())
+        save(entries)
+    monkeypatch.setattr(cache, "_save", recording_save)
+    for i in range(20):
+        cache.put(f"question {i}", f"answer {i}")
+    cache.flush()
+    assert writers and threading.current_thread() not in writers
+    assert len(ResponseCache(str(tmp_path / "cache.json"))) == 20
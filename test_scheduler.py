@@ -0,0 +1,126 @@
+import threading
+import time
+
+from scheduler import RequestScheduler, RequestCancelled, CancelToken
+
+def test_requests_run_one_at_a_time_in_order():
+    scheduler = RequestScheduler()
+    running = []
+    order = []
+    def job(n):
+        def run(token):
+            running.append(n)
+            assert len(running) == 1 # Never two at once
+            time.sleep(0.02)
+            order.append(n)
+            running.remove(n)
+        return run
+    requests = [scheduler.submit(job(n), supersede=False) for n in range(3)]
+    assert all(request.wait(2) for request in requests)
+    assert order == [0, 1, 2]
+    assert [request.state for request in requests] == ["done"] * 3
+    assert not scheduler.busy
+
+def test_newer_request_supersedes_and_its_result_only_comes_out():
+    scheduler = RequestScheduler()
+    results = []
+    started = threading.Event()
+    def slow(token):
+        started.set()
+        while True: # A stream checking its token between chunks
+            token.check()
+            time.sleep(0.01)
+    first = scheduler.submit(slow)
+    started.wait(2)
+    killed = []
+    first.token.on_cancel(lambda: killed.append(True))
+    second = scheduler.submit(lambda token: results.append("second"))
+    assert second.wait(2) and first.wait(2)
+    assert first.state == "cancelled" and first.token.reason == "superseded"
+    assert killed == [True]
+    assert results == ["second"]
+    assert scheduler.stats["superseded"] == 1
+
+def test_bounded_queue_drops_the_oldest():
+    scheduler = RequestScheduler(max_queue=2)
+    gate = threading.Event()
+    blocker = scheduler.submit(lambda token: gate.wait(2), supersede=False)
+    queued = [scheduler.submit(lambda token: None, supersede=False) for _ in range(3)]
+    assert queued[0].wait(1) and queued[0].token.reason == "dropped"
+    gate.set()
+    assert all(request.wait(2) for request in [blocker] + queued)
+    assert [request.state for request in queued] == ["cancelled", "done", "done"]
+
+def test_deadline_is_enforced_on_a_blocked_request():
+    scheduler = RequestScheduler()
+    unblock = threading.Event()
+    request = scheduler.submit(lambda token: unblock.wait(5), timeout=0.2)
+    request.token.on_cancel(unblock.set) # Like llm.cancel() killing the process
+    start = time.time()
+    assert request.wait(2)
+    assert time.time() - start < 1
+    assert request.state == "cancelled" and request.token.reason == "timeout"
+    assert scheduler.stats["timeout"] == 1
+
+def test_released_token_does_not_run_callbacks():
+    token = CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append(1))
+    token.release()
+    token.cancel()
+    assert calls == [] and token.cancelled
+    try:
+        token.check()
+        assert False
+    except RequestCancelled as e:
+        assert str(e) == "cancelled"
+
+def test_worker_drops_the_interrupted_answer(tmp_path, monkeypatch):
+    import worker
+    from history import HistoryStore
+    from llm import StubBackend
+    from response_cache import ResponseCache
+
+    history = HistoryStore(str(tmp_path / "history.jsonl"))
+    monkeypatch.setattr(worker, "conversation_history", history)
+    monkeypatch.setattr(worker, "response_cache", ResponseCache(None))
+    audio_worker = worker.AudioWorker(audio_source=object(), llm=StubBackend(token_delay=0.05), dry_run=True)
+    events = []
+    audio_worker.on_event = lambda name, timestamp, info: events.append((name, info.get("reason")))
+
+    audio_worker.process_command("raconte une longue histoire sur les chats")
+    assert audio_worker.is_processing_llm
+    time.sleep(0.1)
+    audio_worker.scheduler.cancel_all("interrupted")
+    audio_worker.process_command("quelle est la capitale du Japon")
+    deadline = time.time() + 5
+    while audio_worker.is_processing_llm:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    # The interrupted answer never reaches the history, only the second one does
+    assert ("llm_cancelled", "interrupted") in events and events.count(("llm_done", None)) == 1
+    assert [text for role, text in history.recent()] == ["quelle est la capitale du Japon", "You said: quelle est la capitale du Japon"]
+
+def test_request_superseded_after_its_last_token_never_completes(tmp_path, monkeypatch):
+    import worker
+    from PyQt6.QtCore import Qt
+    from history import HistoryStore
+    from llm import StubBackend
+    from response_cache import ResponseCache
+
+    history = HistoryStore(str(tmp_path / "history.jsonl"))
+    monkeypatch.setattr(worker, "conversation_history", history)
+    monkeypatch.setattr(worker, "response_cache", ResponseCache(None))
+    audio_worker = worker.AudioWorker(audio_source=object(), llm=StubBackend(), dry_run=True)
+    finished = []
+    audio_worker.signal_finished.connect(finished.append, type=Qt.ConnectionType.DirectConnection)
+    token = CancelToken()
+    record = worker.tracer.record
+    def record_then_supersede(name, *args, **kwargs): # Between the stream's end and the completion
+        record(name, *args, **kwargs)
+        if name == "llm_complete":
+            token.cancel("superseded")
+    monkeypatch.setattr(worker.tracer, "record", record_then_supersede)
+    audio_worker.run_claude_async(token, "full prompt", "quelle heure est-il")
+    history.flush()
+    assert finished == [] and history.recent() == []
@@ -0,0 +1,102 @@
+import time
+
+from speculation import Speculation, SpeculationStats, looks_complete
+
+def test_looks_complete():
+    assert looks_complete("Quelle est la capitale du Japon ?")
+    assert looks_complete("Écris un mail à Paul pour demain.")
+    assert not looks_complete("Quelle est la capitale") # No sentence end
+    assert not looks_complete("Bonjour.") # Too short
+
+def test_side_effects_are_held_until_commit():
+    speculation = Speculation("Quelle est la capitale du Japon ?")
+    effects = []
+    partial = effects.append
+    speculation.run(partial, "To")
+    speculation.run(partial, "Tokyo", replace=True) # Only the latest partial is replayed
+    speculation.run(effects.append, "EXEC firefox")
+    assert effects == []
+    speculation.commit()
+    assert effects == ["Tokyo", "EXEC firefox"]
+    speculation.run(effects.append, "done")
+    assert effects[-1] == "done"
+    assert speculation.matches("quelle est la capitale du japon")
+
+def test_stats():
+    stats = SpeculationStats()
+    speculation = Speculation("a b c d.")
+    speculation.started, speculation.finished = 10.0, 12.0
+    speculation.response = "abc"
+    stats.hit(speculation)
+    stats.miss(speculation)
+    assert stats.hit_rate == 0.5
+    assert (stats.saved_seconds, stats.wasted_seconds, stats.wasted_chars) == (2.0, 2.0, 3)
+
+def make_worker(tmp_path, monkeypatch, llm):
+    import worker
+    from history import HistoryStore
+    from response_cache import ResponseCache
+
+    history = HistoryStore(str(tmp_path / "history.jsonl"))
+    monkeypatch.setattr(worker, "conversation_history", history)
+    monkeypatch.setattr(worker, "response_cache", ResponseCache(None))
+    audio_worker = worker.AudioWorker(audio_source=object(), llm=llm, dry_run=True)
+    executed = []
+    audio_worker.dispatch_exec = executed.append
+    return audio_worker, history, executed
+
+def wait_until(condition):
+    deadline = time.time() + 5
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+def test_worker_commits_a_matching_speculation(tmp_path, monkeypatch):
+    from llm import StubBackend
+
+    llm = StubBackend("Voilà [EXEC: firefox https://maps.example]")
+    audio_worker, history, executed = make_worker(tmp_path, monkeypatch, llm)
+    speculation = audio_worker.speculate("Montre-moi la carte de Tokyo.")
+    assert not audio_worker.is_processing_llm # Speculating doesn't block dictation
+    wait_until(lambda: speculation.completed)
+    time.sleep(0.05)
+    assert executed == [] and history.recent() == [] # Held back
+
+    assert audio_worker.process_command("Montre-moi la carte de Tokyo", speculation) == ("Processing...", False)
+    assert executed == ["firefox https://maps.example"]
+    assert [text for role, text in history.recent()] == ["Montre-moi la carte de Tokyo", "Voilà [EXEC: firefox https://maps.example]"]
+    assert len(llm.requests) == 1 # No second Claude call
+    assert audio_worker.speculation_stats.hits == 1
+
+def test_worker_discards_a_stale_speculation(tmp_path, monkeypatch):
+    from llm import StubBackend
+
+    llm = StubBackend(lambda turn: f"[EXEC: echo {len(turn)}]", token_delay=0.01)
+    audio_worker, history, executed = make_worker(tmp_path, monkeypatch, llm)
+    speculation = audio_worker.speculate("Ouvre le fichier de notes.")
+    wait_until(lambda: speculation.completed)
+
+    audio_worker.process_command("Ouvre le fichier de notes de réunion", speculation)
+    wait_until(lambda: not audio_worker.is_processing_llm and len(history.recent()) == 2)
+    assert executed == ["echo 36"] # Only the real command's side effects
+    assert history.recent()[0][1] == "Ouvre le fichier de notes de réunion"
+    assert llm.requests[1][1] != llm.requests[1][0] # The stale turn was forgotten: full prompt again
+    stats = audio_worker.speculation_stats
+    assert (stats.hits, stats.misses) == (0, 1) and stats.wasted_chars > 0
+
+def test_speculation_never_supersedes_a_real_request(tmp_path, monkeypatch):
+    from llm import StubBackend
+
+    llm = StubBackend(token_delay=0.02)
+    audio_worker, history, executed = make_worker(tmp_path, monkeypatch, llm)
+    audio_worker.submit_text("raconte une histoire sur les chats") # Typed while someone dictates
+    speculation = audio_worker.speculate("Quelle est la capitale du Japon ?")
+    wait_until(lambda: len(history.recent()) == 2)
+    assert history.recent()[0][1] == "raconte une histoire sur les chats" # Answered, not cancelled
+    wait_until(lambda: speculation.completed) # Then the speculation ran
+
+    other = audio_worker.speculate("Quelle est la capitale du Pérou ?")
+    audio_worker.submit_text("quelle heure est-il") # A real request supersedes the speculation
+    wait_until(lambda: other.request.done.is_set())
+    assert other.request.token.reason == "superseded"
+    wait_until(lambda: len(history.recent()) == 4) # Not written to the real history after the test
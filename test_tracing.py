@@ -0,0 +1,68 @@
+import json
+import time
+
+import tracing
+from tracing import Tracer, make_tracer
+
+def test_disabled_tracer_is_a_no_op(tmp_path):
+    tracer = make_tracer("")
+    assert tracer.begin() is None
+    assert tracer.span("vad") is tracing.NULL_SPAN
+    with tracer.span("vad"):
+        pass
+    tracer.record("vad", 1.0)
+    tracer.finish(None)
+    assert tracer.histograms == {}
+
+def test_spans_trace_and_metrics(tmp_path):
+    tracer = make_tracer(str(tmp_path))
+    interaction = tracer.begin()
+    with tracer.span("transcription", interaction, streaming=True):
+        time.sleep(0.01)
+    for seconds in (0.1, 0.2, 0.3, 2.0):
+        tracer.record("llm_first_token", seconds, interaction)
+    tracer.finish(interaction)
+
+    lines = [json.loads(line) for line in open(tmp_path / "trace.jsonl")]
+    assert all(line["interaction"] == interaction for line in lines)
+    assert lines[0]["name"] == "transcription" and lines[0]["streaming"] is True
+    assert lines[0]["seconds"] >= 0.01
+    assert lines[-1]["name"] == "interaction_end"
+
+    metrics = (tmp_path / "metrics.prom").read_text()
+    assert 'claude_overlay_stage_seconds_bucket{stage="llm_first_token",le="0.25"} 2' in metrics
+    assert 'claude_overlay_stage_seconds_count{stage="llm_first_token"} 4' in metrics
+    assert tracer.percentiles("llm_first_token") == [0.3, 2.0]
+
+def test_failed_span_is_recorded(tmp_path):
+    tracer = Tracer(enabled=True)
+    try:
+        with tracer.span("exec_dispatch"):
+            raise OSError("no hyprctl")
+    except OSError:
+        pass
+    assert tracer.histograms["exec_dispatch"].count == 1
+
+def test_worker_llm_stages(tmp_path, monkeypatch):
+    import worker
+    from history import HistoryStore
+    from llm import StubBackend
+    from response_cache import ResponseCache
+
+    tracer = Tracer(enabled=True, trace_path=str(tmp_path / "trace.jsonl"))
+    monkeypatch.setattr(worker, "tracer", tracer)
+    monkeypatch.setattr(worker, "conversation_history", HistoryStore(str(tmp_path / "history.jsonl")))
+    monkeypatch.setattr(worker, "response_cache", ResponseCache(None))
+    audio_worker = worker.AudioWorker(audio_source=object(), llm=StubBackend("Sure [EXEC: true] done"), dry_run=True)
+    audio_worker.interaction = tracer.begin()
+
+    assert audio_worker.process_command("quelle est la capitale du Japon") == ("Processing...", False)
+    deadline = time.time() + 5
+    while tracer.last_export == 0: # finish() exports the metrics at the end of the LLM thread
+        assert time.time() < deadline
+        time.sleep(0.01)
+    for stage in ("fast_track", "prompt_build", "llm_first_token", "exec_dispatch", "llm_complete"):
+        assert tracer.histograms[stage].count == 1, stage
+    tracer.close()
+    names = [json.loads(line)["name"] for line in open(tmp_path / "trace.jsonl")]
+    assert names[-1] == "interaction_end"
@@ -0,0 +1,54 @@
+import numpy as np
+
+from vad import EnergyVAD, make_vad, SAMPLE_RATE
+
+def noise(seconds, level=100, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.normal(0, level, int(seconds * SAMPLE_RATE))).astype(np.int16)
+
+def voice(seconds, level=6000):
+    # Voiced speech: low fundamental + harmonics, low zero-crossing rate
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    wave = np.sin(2 * np.pi * 150 * t) + 0.5 * np.sin(2 * np.pi * 300 * t) + 0.25 * np.sin(2 * np.pi * 450 * t)
+    return (wave * level / 1.75).astype(np.int16)
+
+def feed_chunks(vad, audio, chunk=1000):
+    """Feeds like the worker does, returns the time (s) at which the end was detected."""
+    for i in range(0, len(audio), chunk):
+        if vad.feed(audio[i:i + chunk]):
+            return (i + chunk) / SAMPLE_RATE
+    return None
+
+def test_end_of_speech_after_hangover():
+    audio = np.concatenate((noise(1), voice(1) + noise(1, seed=1), noise(0.3, seed=2),
+                            voice(0.8) + noise(0.8, seed=3), noise(3, seed=4)))
+    vad = EnergyVAD(hangover_ms=1200)
+    end = feed_chunks(vad, audio)
+    assert vad.heard_speech
+    assert 1.5 <= vad.speech_frames * vad.frame_seconds <= 2.1 # 1.8s of voice, give or take the onset
+    # Speech stops at 3.1s: the 0.3s pause between words didn't end the utterance
+    assert end is not None and 4.2 <= end <= 4.5
+
+def test_noise_only_never_starts():
+    vad = EnergyVAD()
+    assert feed_chunks(vad, noise(5, level=300)) is None
+    assert not vad.heard_speech
+
+def test_click_is_not_speech():
+    audio = noise(2)
+    audio[SAMPLE_RATE:SAMPLE_RATE + 160] = 20000 # 10 ms click
+    vad = EnergyVAD()
+    feed_chunks(vad, audio)
+    assert not vad.heard_speech and vad.speech_frames == 0
+
+def test_reset_keeps_noise_floor():
+    vad = EnergyVAD()
+    feed_chunks(vad, noise(1, level=1000))
+    floor = vad.noise_floor_db
+    assert -35 < floor < -30 # Learned from the background noise
+    vad.reset()
+    assert not vad.in_speech and vad.noise_floor_db == floor
+
+def test_make_vad_falls_back_to_energy():
+    assert isinstance(make_vad("energy"), EnergyVAD)
+    assert isinstance(make_vad("webrtc"), EnergyVAD) # Subclass, or the fallback without webrtcvad
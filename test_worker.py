@@ -0,0 +1,311 @@
+import time
+
+import numpy as np
+import pytest
+
+import worker
+from asr_worker import ASRError
+
+class FakeModel:
+    """Records what Whisper would be given."""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def transcribe(self, audio, **options):
+        self.calls.append((audio, options))
+        if self.error:
+            raise self.error
+        return {"text": "bonjour", "segments": []}
+
+def wait_until(condition):
+    deadline = time.time() + 5
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+def test_frames_to_float32_scales_chunks_and_arrays():
+    samples = np.array([0, 16384, -32768, 32767], dtype=np.int16)
+    from_chunks = worker.frames_to_float32([samples[:2].tobytes(), samples[2:].tobytes()])
+    from_array = worker.frames_to_float32(samples)
+    assert from_chunks.dtype == np.float32
+    assert from_chunks.tolist() == from_array.tolist() == [0.0, 0.5, -1.0, 32767 / 32768]
+    assert samples[1] == 16384 # The ring buffer slice isn't scaled in place
+
+def test_transcribe_frames_in_memory():
+    model = FakeModel()
+    assert worker.transcribe_frames(model, [b"\x00\x40" * 10], priority=1)["text"] == "bonjour"
+    audio, options = model.calls[0]
+    assert isinstance(audio, np.ndarray) and len(audio) == 10
+    assert options == {"fp16": False, "language": "fr", "priority": 1}
+
+def test_transcribe_frames_falls_back_to_wav_only_on_decoding_errors():
+    model = FakeModel()
+    worker.transcribe_frames(model, [b"\x00\x40\x00"], priority=1) # Not whole int16 samples
+    path, options = model.calls[0]
+    assert isinstance(path, str) and path.endswith(".wav")
+    assert options["priority"] == 1 # Options survive the fallback
+
+    crashed = FakeModel(ASRError("ASR worker crashed on this request"))
+    with pytest.raises(ASRError):
+        worker.transcribe_frames(crashed, [b"\x00\x40" * 10])
+    assert len(crashed.calls) == 1 # Not retried through the WAV file
+
+def test_trigger_only_ends_the_dictation_as_its_last_words():
+    assert not worker.ends_with_trigger("Je veux envoyer un mail à Paul")
+    assert worker.clean_command("Je veux envoyer un mail à Paul, envoyer.") == "Je veux envoyer un mail à Paul"
+    assert worker.clean_command("Ouvre le terminal. C’est tout !") == "Ouvre le terminal" # French, curly apostrophe
+    assert worker.clean_command("Open the notes, end Claude.") == "Open the notes"
+    assert worker.clean_command("Is the build done yet?") == "Is the build done yet"
+    assert worker.ends_with_trigger("Résume ce fichier. Terminé.")
+
+def test_whisper_stop_check_uses_the_spotter_stop_words():
+    for phrase in worker.STOP_PHRASES:
+        assert worker.is_stop_command(f"Bon, {phrase.capitalize()} !")
+    assert worker.is_stop_command("Arrête.")
+    assert not worker.is_stop_command("Quel est le prix du stockage ?") # Whole words only
+
+class ScriptedModel:
+    """Returns scripted Whisper segments, one list per pass, then `tail` over the whole window."""
+
+    def __init__(self, *passes, tail="fin"):
+        self.passes = list(passes)
+        self.tail = tail
+        self.windows = []
+
+    def transcribe(self, audio, **options):
+        self.windows.append(len(audio))
+        if not self.passes:
+            return {"text": self.tail, "segments": [{"start": 0.0, "end": len(audio) / 16000, "text": self.tail}]}
+        segments = [{"start": start, "end": end, "text": text} for start, end, text in self.passes.pop(0)]
+        return {"text": " ".join(seg["text"] for seg in segments), "segments": segments}
+
+def one_second():
+    return b"\x00\x01" * 16000
+
+def test_local_agreement_commits_segments_two_passes_agree_on(monkeypatch):
+    monkeypatch.setattr(worker, "STREAMING_INTERVAL", 0.01)
+    model = ScriptedModel([(0.0, 1.0, " Ouvre"), (1.0, 2.0, " le fi")],
+                          [(0.0, 1.0, " Ouvre"), (1.0, 2.0, " le fichier"), (2.0, 3.0, " de")], tail="le fichier de")
+    partials = []
+    transcriber = worker.StreamingTranscriber(model, on_partial=partials.append)
+    transcriber.feed(one_second() * 2)
+    wait_until(lambda: partials and transcriber.pass_done.is_set())
+    assert partials == ["Ouvre le fi"] # The last segment may be cut, nothing committed yet
+    transcriber.feed(one_second())
+    wait_until(lambda: len(partials) == 2 and transcriber.pass_done.is_set())
+    assert partials[-1] == "Ouvre le fichier de"
+    assert transcriber.finalize() == "Ouvre le fichier de"
+    assert model.windows == [32000, 48000, 32000] # "Ouvre" (both passes agree) isn't decoded again
+
+def test_pass_started_before_a_reset_is_dropped(monkeypatch):
+    import threading
+    monkeypatch.setattr(worker, "STREAMING_INTERVAL", 0.01)
+    gate = threading.Event()
+    class SlowModel(ScriptedModel):
+        def transcribe(self, audio, **options):
+            result = super().transcribe(audio, **options)
+            gate.wait(5)
+            return result
+    model = SlowModel([(0.0, 1.0, "ancien")])
+    partials = []
+    transcriber = worker.StreamingTranscriber(model, on_partial=partials.append)
+    transcriber.feed(one_second())
+    wait_until(lambda: model.windows) # Pass in flight
+    transcriber.reset() # Interrupted: a new utterance starts
+    gate.set()
+    wait_until(lambda: transcriber.pass_done.is_set())
+    assert partials == [] and transcriber.text() == ""
+    transcriber.cancel()
+
+def test_long_window_is_committed_anyway(monkeypatch):
+    monkeypatch.setattr(worker, "STREAMING_INTERVAL", 0.01)
+    monkeypatch.setattr(worker, "STREAMING_MAX_WINDOW", 2.0)
+    model = ScriptedModel([(0.0, 1.5, "un"), (1.5, 3.0, "deux")], tail="deux")
+    partials = []
+    transcriber = worker.StreamingTranscriber(model, on_partial=partials.append)
+    transcriber.feed(one_second() * 3)
+    wait_until(lambda: partials and transcriber.pass_done.is_set())
+    assert transcriber.finalize() == "un deux"
+    assert model.windows == [48000, 24000] # "un" committed after a single pass
+
+def test_no_pass_without_new_speech(monkeypatch):
+    monkeypatch.setattr(worker, "STREAMING_INTERVAL", 0.01)
+    model = ScriptedModel([(0.0, 1.0, "bonjour")])
+    partials = []
+    transcriber = worker.StreamingTranscriber(model, on_partial=partials.append)
+    transcriber.feed(one_second() * 2, speech=False) # Pre-roll and silence
+    time.sleep(0.1)
+    assert model.windows == []
+    transcriber.feed(one_second(), speech=True)
+    wait_until(lambda: partials)
+    time.sleep(0.1)
+    assert len(model.windows) == 1 and partials == ["bonjour"] # Not again on the same speech
+    transcriber.cancel()
+
+def test_finalize_decodes_only_the_tail(monkeypatch):
+    monkeypatch.setattr(worker, "STREAMING_INTERVAL", 0.01)
+    model = ScriptedModel([(0.0, 1.0, "ouvre"), (1.0, 2.0, "le")], [(0.0, 1.0, "ouvre"), (1.0, 2.0, "le")], tail="le terminal")
+    transcriber = worker.StreamingTranscriber(model)
+    transcriber.feed(one_second(), speech=True)
+    wait_until(lambda: len(model.windows) == 1 and transcriber.pass_done.is_set())
+    transcriber.feed(one_second(), speech=True)
+    wait_until(lambda: transcriber.committed_text == ["ouvre"] and transcriber.pass_done.is_set())
+    transcriber.feed(one_second(), speech=False) # No pass on the silence
+    assert transcriber.finalize() == "ouvre le terminal"
+    assert len(model.windows) == 3
+    assert model.windows[-1] == 32000 # Committed audio isn't decoded again
+
+def test_finalize_reuses_a_pass_covering_all_the_speech(monkeypatch):
+    monkeypatch.setattr(worker, "STREAMING_INTERVAL", 0.01)
+    monkeypatch.setattr(worker, "STREAMING_MIN_AUDIO", 1.5) # Speech and silence in the same pass
+    model = ScriptedModel([(0.0, 1.0, "quelle heure"), (1.0, 1.5, "est-il")])
+    transcriber = worker.StreamingTranscriber(model)
+    transcriber.feed(one_second(), speech=True)
+    transcriber.feed(one_second(), speech=False) # Then the silence that ends the sentence
+    wait_until(lambda: model.windows and transcriber.pass_done.is_set())
+    assert transcriber.finalize() == "quelle heure est-il"
+    assert len(model.windows) == 1 # No final decode
+
+def make_worker(tmp_path, monkeypatch, llm):
+    from history import HistoryStore
+    from response_cache import ResponseCache
+
+    monkeypatch.setattr(worker, "conversation_history", HistoryStore(str(tmp_path / "history.jsonl")))
+    monkeypatch.setattr(worker, "response_cache", ResponseCache(None))
+    return worker.AudioWorker(audio_source=object(), llm=llm, dry_run=True)
+
+def test_answer_is_streamed_with_throttled_partials(tmp_path, monkeypatch):
+    from PyQt6.QtCore import Qt
+    from llm import StubBackend
+
+    answer = " ".join(f"mot{i}" for i in range(200))
+    audio_worker = make_worker(tmp_path, monkeypatch, StubBackend(answer, token_delay=0.001))
+    partials, finished = [], []
+    direct = Qt.ConnectionType.DirectConnection # No event loop in the tests
+    audio_worker.signal_partial_response.connect(partials.append, type=direct)
+    audio_worker.signal_finished.connect(finished.append, type=direct)
+    audio_worker.process_command("récite une longue liste")
+    wait_until(lambda: finished)
+    assert finished == [answer]
+    assert partials[0].strip() == "mot0" # The first token shows up right away
+    assert 1 < len(partials) < 100 # Not one signal (and one copy of the answer) per chunk
+    assert all(answer.startswith(partial) for partial in partials)
+
+def test_exec_is_dispatched_when_its_bracket_closes(tmp_path, monkeypatch):
+    from PyQt6.QtCore import Qt
+    from llm import StubBackend
+
+    answer = "J'ouvre Firefox. [EXEC: firefox] " + " ".join(["bla"] * 30)
+    audio_worker = make_worker(tmp_path, monkeypatch, StubBackend(answer, token_delay=0.01))
+    executed, finished = [], []
+    audio_worker.dispatch_exec = lambda cmd: executed.append((cmd, time.time()))
+    audio_worker.signal_finished.connect(lambda text: finished.append(time.time()), type=Qt.ConnectionType.DirectConnection)
+    audio_worker.process_command("j'ai besoin d'un navigateur")
+    wait_until(lambda: finished)
+    assert [cmd for cmd, _ in executed] == ["firefox"] # Once, not again at the end
+    assert finished[0] - executed[0][1] > 0.2 # Long before the rest of the answer
+
+def test_usable_while_whisper_loads_in_the_background(tmp_path, monkeypatch):
+    import threading
+    from llm import StubBackend
+
+    monkeypatch.setattr(worker, "ASR_OUT_OF_PROCESS", False)
+    loaded = threading.Event()
+    def load_backend(*args):
+        loaded.wait(5) # torch & co. take seconds to import
+        return ScriptedModel(tail="quelle heure est-il")
+    monkeypatch.setattr(worker, "load_backend", load_backend)
+    audio_worker = make_worker(tmp_path, monkeypatch, StubBackend())
+    start = time.time()
+    audio_worker.ensure_whisper()
+    assert time.time() - start < 0.5 and not audio_worker.whisper_ready.is_set()
+    audio_worker.submit_text("bonjour") # Answered without Whisper
+    wait_until(lambda: len(worker.conversation_history) == 2)
+    heard = []
+    recording = threading.Thread(target=lambda: heard.append(audio_worker.submit_audio(one_second(), timeout=5)))
+    recording.start() # Waits for the model instead of failing
+    time.sleep(0.1)
+    assert heard == []
+    loaded.set()
+    recording.join(5)
+    assert heard == ["quelle heure est-il"]
+    wait_until(lambda: len(worker.conversation_history) == 4)
+
+def test_whisper_load_failure_is_reported_and_retried(tmp_path, monkeypatch):
+    from llm import StubBackend
+
+    monkeypatch.setattr(worker, "ASR_OUT_OF_PROCESS", False)
+    attempts = []
+    def load_backend(*args):
+        attempts.append(args)
+        raise OSError("model file missing")
+    monkeypatch.setattr(worker, "load_backend", load_backend)
+    audio_worker = make_worker(tmp_path, monkeypatch, StubBackend())
+    audio_worker.ensure_whisper()
+    wait_until(lambda: audio_worker.whisper_failed)
+    with pytest.raises(RuntimeError, match="model file missing"):
+        audio_worker.submit_audio(b"\x00\x00" * 1600, timeout=5) # Fails fast, doesn't wait the timeout
+    assert len(attempts) == 2 # submit_audio tried again
+
+def test_whisper_worker_that_never_gets_ready_times_out(tmp_path, monkeypatch):
+    import threading
+    from llm import StubBackend
+
+    class StuckClient:
+        def __init__(self, *args, **kwargs):
+            self.ready = threading.Event()
+            self.closed = False
+        def start(self):
+            pass
+        def close(self):
+            self.closed = True
+    monkeypatch.setattr(worker, "ASRClient", StuckClient)
+    monkeypatch.setattr(worker, "WHISPER_LOAD_TIMEOUT", 0.2)
+    audio_worker = make_worker(tmp_path, monkeypatch, StubBackend())
+    audio_worker.load_whisper()
+    assert audio_worker.whisper_failed == "not loaded after 0.2 s"
+    assert not audio_worker.whisper_ready.is_set() and not audio_worker.whisper_loading
+
+def test_dropped_launch_is_reported_not_announced(tmp_path, monkeypatch):
+    from PyQt6.QtCore import Qt
+    from launcher import LaunchDropped
+    from llm import StubBackend
+
+    class FullLauncher:
+        def launch(self, args):
+            raise LaunchDropped(f"Too many launches pending, not started: {args}")
+        run_shell = launch
+    monkeypatch.setattr(worker, "launcher", FullLauncher())
+    audio_worker = make_worker(tmp_path, monkeypatch, StubBackend())
+    audio_worker.dry_run = False
+    errors, finished = [], []
+    direct = Qt.ConnectionType.DirectConnection
+    audio_worker.signal_error.connect(errors.append, type=direct)
+    audio_worker.signal_finished.connect(finished.append, type=direct)
+    message, keep_open = audio_worker.process_command("ouvre firefox")
+    assert message.startswith("Too many launches pending") and errors == [message]
+    audio_worker.dispatch_exec("firefox https://example.com")
+    assert len(errors) == 2 and finished == []
+
+def test_warm_session_gets_the_turns_answered_from_the_cache(tmp_path, monkeypatch):
+    from PyQt6.QtCore import Qt
+    from llm import StubBackend
+
+    llm = StubBackend("Il est 15 h à Tokyo.")
+    audio_worker = make_worker(tmp_path, monkeypatch, llm)
+    finished = []
+    audio_worker.signal_finished.connect(finished.append, type=Qt.ConnectionType.DirectConnection)
+    audio_worker.process_command("quelle heure est-il à Tokyo")
+    wait_until(lambda: len(worker.conversation_history) == 2) # Warm LLM turn
+    cached = ["Il fait 20 degrés à Tokyo."]
+    monkeypatch.setattr(worker.response_cache, "get", lambda key: cached.pop() if cached else None)
+    audio_worker.process_command("quel temps fait-il à Tokyo")
+    assert finished[-1] == "Il fait 20 degrés à Tokyo." and len(llm.requests) == 1
+    audio_worker.process_command("et à Osaka")
+    wait_until(lambda: len(worker.conversation_history) == 6)
+    turn, sent = llm.requests[-1]
+    assert turn == "et à Osaka"
+    assert "User: quel temps fait-il à Tokyo\nClaude: Il fait 20 degrés à Tokyo." in sent
+    assert sent.endswith("User: et à Osaka")
@@ -0,0 +1,195 @@
+"""Per-stage latency tracing.
+
+Every interaction (wake word -> answer) gets an ID, and each stage of the pipeline (wake word,
+capture, VAD, transcription, fast track, prompt, LLM first token / complete, EXEC dispatch)
+records a span under it. Durations feed rolling histograms, exported as a Prometheus text file
+(for node_exporter's textfile collector, or just `cat`), and every span/event is appended to a
+JSONL trace file.
+
+When tracing is disabled, span() returns a shared no-op context and record()/event() return
+immediately: the instrumentation can stay in the hot paths.
+"""
+import atexit
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Histogram buckets (seconds), from a fast-track lookup to a long Claude answer
+BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+NULL_SPAN = contextlib.nullcontext()
+
+class StageHistogram:
+    """Cumulative Prometheus histogram + the last `window` durations for percentiles."""
+
+    def __init__(self, window=500):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+class Span:
+    def __init__(self, tracer, name, interaction, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.interaction = interaction
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record(self.name, time.perf_counter() - self.start, self.interaction, **self.attrs)
+        return False
+
+class Tracer:
+    """Spans and events tied to interaction IDs, with histograms per stage.
+
+    trace_path: JSONL file, one line per span/event (None = not written)
+    metrics_path: Prometheus text file, rewritten at most every `metrics_interval` seconds
+    """
+
+    def __init__(self, enabled=False, trace_path=None, metrics_path=None, window=500, metrics_interval=5.0):
+        self.enabled = enabled
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self.window = window
+        self.metrics_interval = metrics_interval
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.ids = itertools.count(1)
+        self.session = time.strftime("%Y%m%d-%H%M%S") # IDs are unique across restarts
+        self.trace_file = None
+        self.last_export = 0.0
+        if enabled:
+            atexit.register(self.close)
+
+    def begin(self):
+        """New interaction ID (None when disabled)."""
+        if not self.enabled:
+            return None
+        return f"{self.session}-{next(self.ids)}"
+
+    def span(self, name, interaction=None, **attrs):
+        """with tracer.span("transcription", interaction): ..."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, interaction, attrs)
+
+    def record(self, name, seconds, interaction=None, **attrs):
+        """A span whose duration was measured elsewhere (e.g. on the audio clock)."""
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = StageHistogram(self.window)
+            histogram.observe(seconds)
+            self._write({"type": "span", "name": name, "interaction": interaction,
+                         "time": time.time(), "seconds": round(seconds, 6), **attrs})
+
+    def event(self, name, interaction=None, **attrs):
+        """A point in time (wake word heard, command validated...) in the trace file."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self._write({"type": "event", "name": name, "interaction": interaction, "time": time.time(), **attrs})
+
+    def finish(self, interaction):
+        """End of an interaction: flushes the trace and refreshes the metrics file."""
+        if not self.enabled:
+            return
+        self.event("interaction_end", interaction)
+        with self.lock:
+            if self.trace_file:
+                self.trace_file.flush()
+            if time.time() - self.last_export >= self.metrics_interval:
+                self._export()
+
+    def percentiles(self, name, quantiles=(0.5, 0.95)):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            return [histogram.quantile(q) if histogram else None for q in quantiles]
+
+    def close(self):
+        with self.lock:
+            if self.histograms:
+                self._export()
+            if self.trace_file:
+                self.trace_file.close()
+                self.trace_file = None
+
+    def _write(self, record):
+        if not self.trace_path:
+            return
+        try:
+            if self.trace_file is None:
+                os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+                self.trace_file = open(self.trace_path, "a")
+            self.trace_file.write(json.dumps(record) + "\n") # Buffered, flushed per interaction
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Trace write error: {e}")
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP claude_overlay_stage_seconds Duration of each pipeline stage.",
+            "# TYPE claude_overlay_stage_seconds histogram",
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            for bound, count in zip(BUCKETS, histogram.counts):
+                lines.append(f'claude_overlay_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'claude_overlay_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'claude_overlay_stage_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+            lines.append(f'claude_overlay_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+        lines += [
+            f"# HELP claude_overlay_stage_recent_seconds Percentiles over the last {self.window} spans of each stage.",
+            "# TYPE claude_overlay_stage_recent_seconds summary",
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            for q in (0.5, 0.95, 0.99):
+                value = histogram.quantile(q)
+                if value is not None:
+                    lines.append(f'claude_overlay_stage_recent_seconds{{stage="{name}",quantile="{q}"}} {value:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def _export(self):
+        self.last_export = time.time()
+        if not self.metrics_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.metrics_path) or ".", exist_ok=True)
+            # Atomic replace: a scraper never sees half a file
+            tmp_path = self.metrics_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.metrics_path)
+        except OSError as e:
+            print(f"Metrics export error: {e}")
+
+def make_tracer(directory):
+    """Tracer writing trace.jsonl and metrics.prom into `directory` (disabled if empty)."""
+    if not directory:
+        return Tracer(enabled=False)
+    return Tracer(enabled=True, trace_path=os.path.join(directory, "trace.jsonl"),
+                  metrics_path=os.path.join(directory, "metrics.prom"))
@@ -0,0 +1,118 @@
+"""Voice activity detection (speech / silence per 10-30 ms frame).
+
+EnergyVAD works on whole chunks at once with NumPy: frame energy and zero-crossing rate against
+an adaptive noise floor (minimum energy over the last seconds), with an onset delay (a click is
+not speech) and a hangover (short pauses between words don't end the utterance). It costs a tiny
+fraction of a Vosk/Kaldi decoding pass, so end-of-speech doesn't depend on the recognizer's
+partial results anymore.
+
+WebRTCVAD uses the optional `webrtcvad` package (Google's GMM model) for the per-frame decision,
+with the same onset/hangover logic on top.
+"""
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+class EnergyVAD:
+    """Frame energy + zero-crossing rate VAD with an adaptive noise floor.
+
+    frame_ms: decision granularity (10-30 ms)
+    threshold_db: how far above the noise floor a frame must be to count as speech
+    onset_ms: speech needed before an utterance starts
+    hangover_ms: silence needed after speech to declare the end of the utterance
+    floor_window_ms: the noise floor is the quietest frame of this window (there is always
+    a pause between words in a few seconds of speech, steady background noise is absorbed).
+    Until then the floor is learned from the first frames, so feed some background audio
+    (e.g. while waiting for the wake word) before the first utterance.
+    """
+
+    def __init__(self, frame_ms=20, threshold_db=9.0, onset_ms=60, hangover_ms=1200,
+                 floor_window_ms=3000, initial_floor_db=None, max_zcr=0.35):
+        self.frame = int(SAMPLE_RATE * frame_ms / 1000)
+        self.frame_seconds = self.frame / SAMPLE_RATE
+        self.threshold_db = threshold_db
+        self.onset_frames = max(1, int(onset_ms / frame_ms))
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.max_zcr = max_zcr # Above this, a frame is hiss/fricative noise unless it's loud
+        # Energy (dB) of the last frames, for the noise floor
+        if initial_floor_db is None:
+            initial_floor_db = np.inf # Unknown: the first frames set it
+        self.history = np.full(max(1, int(floor_window_ms / frame_ms)), initial_floor_db, dtype=np.float32)
+        self.noise_floor_db = float(initial_floor_db)
+        self.reset()
+
+    def reset(self):
+        """Forgets the current utterance (the noise floor is kept)."""
+        self.leftover = np.zeros(0, dtype=np.int16)
+        self.in_speech = False
+        self.heard_speech = False # Did this utterance contain speech at all?
+        self.speech_frames = 0 # Speech frames of this utterance (grows while someone talks)
+        self.speech_run = 0 # Consecutive speech frames (onset)
+        self.silence_run = 0 # Consecutive silent frames (hangover)
+        self.ended = False
+
+    @property
+    def silence_duration(self):
+        """Seconds of silence since the last speech frame."""
+        return self.silence_run * self.frame_seconds
+
+    def _frames(self, samples):
+        samples = np.concatenate((self.leftover, samples)) if len(self.leftover) else samples
+        count = len(samples) // self.frame
+        self.leftover = samples[count * self.frame:].copy()
+        return samples[:count * self.frame].reshape(count, self.frame)
+
+    def classify(self, frames):
+        """Speech flag for every frame (2D int16 array, one frame per row)."""
+        x = frames.astype(np.float32)
+        energy_db = 10.0 * np.log10(np.mean(x * x, axis=1) / (32768.0 ** 2) + 1e-10)
+        zcr = np.mean(np.abs(np.diff(np.signbit(x).astype(np.int8), axis=1)), axis=1)
+
+        self.history = np.concatenate((self.history, energy_db))[-len(self.history):]
+        floor = self.noise_floor_db = float(self.history.min())
+        loud = energy_db > floor + self.threshold_db
+        # High ZCR + moderate energy = hiss or fan noise, very loud frames are speech anyway
+        return loud & ((zcr < self.max_zcr) | (energy_db > floor + 2 * self.threshold_db))
+
+    def feed(self, samples):
+        """Processes int16 samples, returns True once the end of the utterance is reached."""
+        frames = self._frames(np.asarray(samples, dtype=np.int16))
+        if not len(frames):
+            return self.ended
+        for is_speech in self.classify(frames):
+            if is_speech:
+                self.speech_run += 1
+                self.silence_run = 0
+                if self.speech_run >= self.onset_frames:
+                    self.in_speech = True
+                    self.heard_speech = True
+                    self.speech_frames += 1
+            else:
+                self.speech_run = 0
+                self.silence_run += 1
+                if self.in_speech and self.silence_run >= self.hangover_frames:
+                    self.in_speech = False
+                    self.ended = True
+        return self.ended
+
+class WebRTCVAD(EnergyVAD):
+    """Same onset/hangover logic, per-frame decision by the webrtcvad package."""
+
+    def __init__(self, aggressiveness=2, frame_ms=20, **kwargs):
+        import webrtcvad # Optional dependency
+        if frame_ms not in (10, 20, 30):
+            raise ValueError("webrtcvad only supports 10, 20 or 30 ms frames")
+        self.model = webrtcvad.Vad(aggressiveness)
+        super().__init__(frame_ms=frame_ms, **kwargs)
+
+    def classify(self, frames):
+        return np.array([self.model.is_speech(frame.tobytes(), SAMPLE_RATE) for frame in frames], dtype=bool)
+
+def make_vad(kind="energy", **kwargs):
+    """"energy" or "webrtc" (falls back to energy if webrtcvad isn't installed)."""
+    if kind == "webrtc":
+        try:
+            return WebRTCVAD(**kwargs)
+        except ImportError:
+            print("webrtcvad is not installed, using the energy VAD")
+    return EnergyVAD(**kwargs)
@@ -1,5 +1,6 @@
 from PyQt6.QtCore import QThread, pyqtSignal
 import threading # Added for asynchronous LLM calls
+import contextlib
 import speech_recognition as sr
 import subprocess
 import time
@@ -7,276 +8,829 @@ import time
 # Conversation history
 import json
 import os
+import re
 
-HISTORY_FILE = "history.json"
+from llm import make_backend, LLMCancelled, LLMError
+from history import HistoryStore
+from intents import load_intents
+from project_index import ProjectIndex
+from audio_capture import AudioCapture, SAMPLE_RATE
+from asr_worker import ASRClient, ASRCancelled, PRIORITY_PARTIAL
+from asr_backends import load_backend, benchmark_sample, save_benchmark_sample, AUTO_RECORD_SECONDS
+from vad import make_vad
+from audio_source import MicrophoneSource
+from tracing import make_tracer
+from prompt_builder import PromptBuilder
+from response_cache import ResponseCache
+import hyprland
+from keyword_spotter import KeywordSpotter, WakeVerifier, WAKE_PHRASES, STOP_PHRASES, TRIGGER_PHRASES
+from scheduler import RequestScheduler, RequestCancelled
+from launcher import Launcher, LaunchDropped
+from speculation import Speculation, SpeculationStats, looks_complete, run_now
 
-def load_history():
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "r") as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+HISTORY_FILE = "history.jsonl"
+HISTORY_WINDOW = 20 # Messages sent with each prompt
+
+# ASR engine (asr_backends.py): "faster-whisper" (CTranslate2, int8 on CPU, falls back to
+# openai-whisper if not installed) or "whisper" (openai-whisper, PyTorch fp32)
+ASR_ENGINE = os.environ.get("CLAUDE_OVERLAY_ASR_ENGINE", "faster-whisper")
+ASR_COMPUTE_TYPE = os.environ.get("CLAUDE_OVERLAY_ASR_COMPUTE", "int8")
+# tiny / base / small / medium, or "auto": the largest model transcribing faster than
+# ASR_MAX_RTF x real time on this machine (benchmarked at first start, cached in asr_auto.json)
+WHISPER_MODEL = os.environ.get("CLAUDE_OVERLAY_ASR_MODEL", "base")
+ASR_MAX_RTF = 0.3
+# Whisper runs in a separate process (asr_worker.py): no GIL/CPU stalls, survives crashes
+ASR_OUT_OF_PROCESS = True
+# Given up after this long (the "auto" benchmark included): utterances waiting for it are dropped
+WHISPER_LOAD_TIMEOUT = 300
+
+# Microphone ring buffer (seconds) and audio kept from before the wake word was detected,
+# so that the first syllables of "Claude, open..." aren't lost
+AUDIO_BUFFER_SECONDS = 60
+PREROLL_SECONDS = 0.5
+
+# End of speech detection (vad.py): "energy" (NumPy, no dependency) or "webrtc" (webrtcvad package),
+# and the silence that ends a sentence
+VAD_KIND = "energy"
+VAD_HANGOVER_MS = 1200
+
+# Vosk keyword spotters (keyword_spotter.py): minimum word confidence for a phrase to count
+KEYWORD_CONFIDENCE = 0.7
+# Second stage: a wake word is confirmed by a full-vocabulary pass on its last seconds of audio
+# before the overlay shows up (0 disables it; higher = fewer false wakes, more missed ones)
+WAKE_VERIFY_THRESHOLD = float(os.environ.get("CLAUDE_OVERLAY_WAKE_THRESHOLD", "0.6"))
+WAKE_VERIFY_SECONDS = 1.5
+# Vosk's partial result often fires before the end of "claude": the verifier waits this much more
+WAKE_VERIFY_POSTROLL = 0.2
+
+# Whisper hears the wake word too when the pre-roll is included
+WAKE_WORD_PREFIX = re.compile(r"^\W*(?:ok\W+)?claude\b\W*", re.IGNORECASE)
+
+# Regex to capture [EXEC: command]
+EXEC_PATTERN = re.compile(r"\[EXEC:\s*(.*?)\]")
+
+# Fast track table (apps, websites, projects), see intents.json
+INTENTS_FILE = "intents.json"
+BROWSER = "firefox"
+intent_matcher = load_intents(INTENTS_FILE)
+
+# Folders searched by "open the project ..." (colon-separated in CLAUDE_OVERLAY_PROJECT_ROOTS)
+PROJECT_ROOTS = os.environ.get("CLAUDE_OVERLAY_PROJECT_ROOTS", "~").split(":")
+project_index = ProjectIndex(PROJECT_ROOTS, max_depth=4, state_path="project_index.json")
+
+# Hyprland's control socket (exec dispatches), commands are spawned directly without Hyprland
+hyprland_ipc = hyprland.HyprlandIPC()
+
+# "cli" (warm claude session), "oneshot" (one claude -p per request) or "stub" (offline)
+LLM_BACKEND = os.environ.get("CLAUDE_OVERLAY_LLM", "cli")
+
+# Claude requests run one at a time (scheduler.py), a newer command supersedes the older ones
+LLM_TIMEOUT = 120 # Seconds before a request is abandoned
+LLM_MAX_QUEUE = 4
+
+# Partial answers are sent to the overlay at most this often (the whole text each time)
+PARTIAL_EMIT_INTERVAL = 0.05
+
+# Dictation mode: ask Claude as soon as the buffer looks complete, before "send" (speculation.py)
+SPECULATIVE_PREFETCH = os.environ.get("CLAUDE_OVERLAY_SPECULATE", "0") == "1"
+SPECULATION_MIN_WORDS = 4
+
+# A trigger ends the dictation only as its last words ("envoyer un mail à Paul" isn't one).
+# Same phrases as the trigger spotter; Whisper adds punctuation and may use a curly apostrophe
+TRIGGER_AT_END = re.compile(
+    r"\b(?:" + "|".join(r"\W+".join(re.escape(word).replace("'", "['’]") for word in phrase.split())
+                        for phrase in sorted(TRIGGER_PHRASES, key=len, reverse=True)) + r")\W*$",
+    re.IGNORECASE)
+# The spotter hears "envoyer" mid-sentence too: it ends the capture only if this much silence follows
+TRIGGER_SILENCE_MS = 400
+TRIGGER_TAIL_MS = 300 # Speech still allowed after the spot (the end of the word itself)
+
+def ends_with_trigger(text):
+    return TRIGGER_AT_END.search(text) is not None
+
+def clean_command(text):
+    """The dictation buffer without its final trigger and punctuation."""
+    return TRIGGER_AT_END.sub("", text).strip().rstrip(".,!?")
+
+# What Whisper heard ends the conversation if it says one of the interrupt spotter's stop words
+STOP_IN_COMMAND = re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in STOP_PHRASES) + r")\b", re.IGNORECASE)
 
-def save_history(history):
+def is_stop_command(text):
+    return STOP_IN_COMMAND.search(text) is not None
+
+# Per-stage latency traces (trace.jsonl) and Prometheus metrics (metrics.prom) are written
+# to this folder when CLAUDE_OVERLAY_TRACE is set, disabled otherwise
+TRACE_DIR = os.environ.get("CLAUDE_OVERLAY_TRACE", "")
+tracer = make_tracer(TRACE_DIR)
+
+# Apps and [EXEC: ...] commands are spawned (and reaped) by the launcher thread; an app or command
+# line we started that is still running gets focused (through Hyprland) instead of started again
+launcher = Launcher(
+    max_pending=8,
+    focus=lambda pid: hyprland.focus_pid(pid, hyprland_ipc),
+    on_spawn=lambda name, seconds: tracer.record("launch", seconds, command=name))
+
+# Append-only log, only the last HISTORY_WINDOW messages are kept in memory for the prompt
+conversation_history = HistoryStore(HISTORY_FILE, window=HISTORY_WINDOW, legacy_path="history.json") # Migrated once
+
+SYSTEM_PROMPT = (
+    "You are Claude, a voice assistant on Linux. "
+    "Respond concisely. "
+    "You have access to the conversation history above. "
+    "If the user asks you to open an application or website that you can't do directly, "
+    "respond with the EXACT format: [EXEC: linux_command]. "
+    "Example: To open Firefox, write [EXEC: firefox]. "
+    "Example: To open a site, write [EXEC: firefox https://site.com]."
+)
+
+# Whole prompt budget (tokens): older turns are folded into a rolling summary in the background
+PROMPT_BUDGET_TOKENS = 3000
+PROMPT_SUMMARY_TOKENS = 500
+prompt_builder = PromptBuilder(SYSTEM_PROMPT, budget_tokens=PROMPT_BUDGET_TOKENS, summary_tokens=PROMPT_SUMMARY_TOKENS)
+prompt_builder.add(*conversation_history.recent())
+
+# Answers to repeated questions (no time-sensitive questions, no [EXEC: ...] answers)
+RESPONSE_CACHE_FILE = "response_cache.json"
+response_cache = ResponseCache(RESPONSE_CACHE_FILE, max_entries=500, ttl=7 * 24 * 3600)
+
+# Whisper works on 16 kHz mono float32 audio in [-1, 1]
+WHISPER_SAMPLE_RATE = 16000
+
+def pcm_bytes(audio_frames):
+    """Raw int16 PCM from a list of chunks or a NumPy array."""
+    if hasattr(audio_frames, "tobytes"):
+        return audio_frames.tobytes()
+    return b''.join(audio_frames)
+
+def frames_to_float32(audio_frames):
+    """Converts captured int16 PCM (chunks or NumPy array) to the float32 array Whisper expects (no file, no ffmpeg)."""
+    import numpy as np
+    if isinstance(audio_frames, np.ndarray):
+        pcm = audio_frames # Ring buffer slice, already int16
+    else:
+        # np.frombuffer is a zero-copy view on the joined PCM bytes
+        pcm = np.frombuffer(b''.join(audio_frames), dtype=np.int16)
+    audio = pcm.astype(np.float32)
+    audio *= 1.0 / 32768.0 # In place, avoids a second temporary array
+    return audio
+
+def transcribe_frames_via_wav(whisper_model, audio_frames, **options):
+    """Old path: writes a temporary WAV and lets Whisper decode it through ffmpeg."""
+    import tempfile
+    import wave
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_wav:
+        temp_wav_path = temp_wav.name
+    try:
+        wf = wave.open(temp_wav_path, 'wb')
+        wf.setnchannels(1)
+        wf.setsampwidth(2) # paInt16
+        wf.setframerate(WHISPER_SAMPLE_RATE)
+        wf.writeframes(pcm_bytes(audio_frames))
+        wf.close()
+        # Note: fp16=False to avoid CPU warning
+        return whisper_model.transcribe(temp_wav_path, fp16=False, language='fr', **options)
+    finally:
+        if os.path.exists(temp_wav_path):
+            os.remove(temp_wav_path)
+
+def transcribe_frames(whisper_model, audio_frames, **options):
+    """Transcribes int16 frames in memory, the temporary WAV is only a fallback.
+
+    Only a buffer NumPy can't read as int16 samples goes through the WAV file (and ffmpeg):
+    Whisper errors, cancellations and ASR worker crashes are raised, not transcribed twice.
+    """
     try:
-        with open(HISTORY_FILE, "w") as f:
-            json.dump(history, f)
-    except Exception as e:
-        print(f"Error saving history: {e}")
+        audio = frames_to_float32(audio_frames)
+    except (ValueError, TypeError) as e: # Odd number of bytes, chunks that aren't bytes...
+        print(f"In-memory decoding failed ({e}), falling back to WAV file")
+        return transcribe_frames_via_wav(whisper_model, audio_frames, **options)
+    return whisper_model.transcribe(audio, fp16=False, language='fr', **options) # French language for transcription
+
+# Streaming transcription (partial results while the user is still speaking)
+STREAMING_TRANSCRIPTION = True
+STREAMING_INTERVAL = 1.0 # Seconds between two background passes
+STREAMING_MIN_AUDIO = 1.0 # Don't bother Whisper with less audio than this
+STREAMING_MAX_WINDOW = 12.0 # Force a commit when the uncommitted window grows past this
+STREAMING_FINAL_MARGIN = 0.3 # Silence a pass must include after the last speech to be final
+
+# One in-process Whisper model, several threads: never run two transcriptions at once
+whisper_lock = threading.Lock()
+
+def transcription_lock(whisper_model):
+    """The ASR worker process queues requests itself (by priority), no lock needed."""
+    return contextlib.nullcontext() if isinstance(whisper_model, ASRClient) else whisper_lock
+
+def partial_options(whisper_model):
+    """Background passes go after the final transcriptions in the ASR worker queue."""
+    return {"priority": PRIORITY_PARTIAL} if isinstance(whisper_model, ASRClient) else {}
 
-conversation_history = load_history()
+class StreamingTranscriber:
+    """Transcribes a sliding window of the utterance in the background while the user speaks.
+
+    Whisper segments that two consecutive passes agree on are committed and their audio
+    leaves the window, so at end-of-speech only the uncommitted tail is decoded. A pass only
+    runs when the VAD heard new speech since the previous one (on silence Whisper makes
+    things up), and when the last pass already covers all the speech nothing is decoded.
+    """
+
+    def __init__(self, whisper_model, on_partial=None):
+        self.whisper_model = whisper_model
+        self.on_partial = on_partial
+        self.lock = threading.Lock()
+        self.pcm = bytearray()
+        self.committed_bytes = 0 # Audio already covered by committed_text
+        self.committed_text = []
+        self.previous_segments = [] # Uncommitted segment texts from the last pass
+        self.pending_text = ""
+        self.speech_end = 0 # End (bytes) of the last chunk with speech in it
+        self.pass_speech = 0 # speech_end when the last pass started
+        self.pass_end = 0 # ... and the end of its window
+        self.decoded_speech = self.decoded_end = 0 # Same for the last pass whose result was applied
+        self.pass_done = threading.Event()
+        self.pass_done.set()
+        self.generation = 0 # Bumped by reset() so stale passes are dropped
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def feed(self, data, speech=True):
+        """Adds audio, `speech` tells whether the VAD heard speech in it."""
+        with self.lock:
+            self.pcm += data
+            if speech:
+                self.speech_end = len(self.pcm)
+
+    def reset(self):
+        """Forgets the current utterance (used after an interruption)."""
+        with self.lock:
+            self.pcm = bytearray()
+            self.committed_bytes = 0
+            self.committed_text = []
+            self.previous_segments = []
+            self.pending_text = ""
+            self.speech_end = self.pass_speech = self.pass_end = 0
+            self.decoded_speech = self.decoded_end = 0
+            self.generation += 1
+
+    def text(self):
+        with self.lock:
+            return " ".join(self.committed_text + [self.pending_text]).strip()
+
+    def _loop(self):
+        min_bytes = int(STREAMING_MIN_AUDIO * WHISPER_SAMPLE_RATE) * 2
+        while not self.stop_event.wait(STREAMING_INTERVAL):
+            with self.lock:
+                if self.speech_end <= self.pass_speech or len(self.pcm) - self.committed_bytes < min_bytes:
+                    continue # Nothing new was said (or too little audio)
+                window = bytes(self.pcm[self.committed_bytes:])
+                offset = self.committed_bytes
+                generation = self.generation
+                self.pass_speech, self.pass_end = self.speech_end, len(self.pcm)
+                self.pass_done.clear()
+            try:
+                with transcription_lock(self.whisper_model):
+                    result = transcribe_frames(self.whisper_model, [window], **partial_options(self.whisper_model))
+                self._update(result.get("segments", []), offset, len(window), generation)
+            except ASRCancelled:
+                pass
+            except Exception as e:
+                print(f"Streaming transcription error: {e}")
+            finally:
+                self.pass_done.set()
+
+    def _update(self, segments, offset, window_bytes, generation):
+        texts = [seg["text"].strip() for seg in segments]
+        with self.lock:
+            if generation != self.generation:
+                return
+            # Local agreement: a segment is stable once two passes in a row produce it.
+            # The last segment may be cut mid-word, so it is never committed here.
+            stable = 0
+            while stable < len(texts) - 1 and stable < len(self.previous_segments) and texts[stable] == self.previous_segments[stable]:
+                stable += 1
+            if window_bytes > STREAMING_MAX_WINDOW * WHISPER_SAMPLE_RATE * 2:
+                stable = max(len(texts) - 1, 0)
+            if stable:
+                self.committed_text.extend(t for t in texts[:stable] if t)
+                end_sample = int(segments[stable - 1]["end"] * WHISPER_SAMPLE_RATE)
+                self.committed_bytes = offset + min(end_sample * 2, window_bytes)
+            self.previous_segments = texts[stable:]
+            self.pending_text = " ".join(t for t in self.previous_segments if t)
+            self.decoded_speech, self.decoded_end = self.pass_speech, offset + window_bytes
+        if self.on_partial:
+            self.on_partial(self.text())
+
+    def _covers_all_speech(self, speech, end):
+        """A pass that saw all the speech and some silence after it is as good as a final decode."""
+        return speech == self.speech_end and end - speech >= int(STREAMING_FINAL_MARGIN * WHISPER_SAMPLE_RATE) * 2
+
+    def cancel(self):
+        """Stops background passes without decoding the tail."""
+        self.stop_event.set()
+        with self.lock:
+            self.generation += 1
+        if isinstance(self.whisper_model, ASRClient):
+            self.whisper_model.cancel_all(PRIORITY_PARTIAL) # The pass in flight is dropped when it returns
+
+    def finalize(self):
+        """Stops background passes and decodes only the uncommitted tail.
+
+        A pass still in flight is only waited for if it covers all the speech (its result is
+        then the transcription), otherwise it is dropped and the tail decoded right away.
+        """
+        self.stop_event.set()
+        with self.lock:
+            wait = not self.pass_done.is_set() and self._covers_all_speech(self.pass_speech, self.pass_end)
+        if wait:
+            self.pass_done.wait()
+        with self.lock:
+            if self.speech_end and self._covers_all_speech(self.decoded_speech, self.decoded_end):
+                return " ".join(self.committed_text + [self.pending_text]).strip()
+            self.generation += 1 # Drop whatever pass is still running
+            tail = bytes(self.pcm[self.committed_bytes:])
+            committed = list(self.committed_text)
+        if isinstance(self.whisper_model, ASRClient):
+            self.whisper_model.cancel_all(PRIORITY_PARTIAL)
+        tail_text = ""
+        if len(tail) >= int(0.2 * WHISPER_SAMPLE_RATE) * 2:
+            with transcription_lock(self.whisper_model):
+                tail_text = transcribe_frames(self.whisper_model, [tail])["text"].strip()
+        return " ".join(committed + [tail_text]).strip()
 
 class AudioWorker(QThread):
     # ... (signaux) ...
     signal_listening = pyqtSignal()
     signal_recognized = pyqtSignal(str)
     signal_processing = pyqtSignal(str)
+    signal_partial_response = pyqtSignal(str) # Answer so far, while Claude is still generating
     signal_finished = pyqtSignal(str)
     signal_error = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, audio_source=None, llm=None, dry_run=False):
         super().__init__()
-        self.current_llm_process = None # To store the current Claude process
-        self.is_processing_llm = False
+        # Microphone by default, recorded files for offline replays (audio_source.py)
+        self.audio_source = audio_source or MicrophoneSource()
+        self.llm = llm or make_backend(LLM_BACKEND) # Kept warm between requests
+        self.dry_run = dry_run # Print the commands instead of launching them (benchmarks)
+        self.on_event = None # Optional callback(name, timestamp, info) for the pipeline stages
+        self.interaction = None # Tracing ID of the current wake word -> answer interaction
+        self.emitting = threading.local() # Interaction of what this thread emits (Claude and engine threads)
+        self.scheduler = RequestScheduler(max_queue=LLM_MAX_QUEUE)
+        self.speculation_stats = SpeculationStats()
+        # Whisper is loaded in the background, the wake word works before it's ready
+        self.whisper_model = None
+        self.whisper_ready = threading.Event()
+        self.whisper_failed = None # Why Whisper couldn't be loaded (the next wake word retries)
+        # "auto" with nothing to measure on: the first long enough command becomes the sample
+        self.record_asr_sample = WHISPER_MODEL == "auto" and benchmark_sample() is None
+        self.whisper_loading = False
+        self.whisper_loading_lock = threading.Lock()
+        self.startup_start = time.time()
+        self.startup_phases = [] # (phase, seconds)
+
+    @property
+    def is_processing_llm(self):
+        return self.scheduler.busy
+
+    def current_interaction(self):
+        """Interaction the signal being emitted on this thread belongs to (engine events are tagged with it)."""
+        return getattr(self.emitting, "interaction", None) or self.interaction
+
+    def mark(self, name, interaction=None, **info):
+        """Reports a pipeline stage (wake word, end of speech, first token...) to on_event and the trace."""
+        interaction = interaction or self.current_interaction()
+        tracer.event(name, interaction, **info)
+        if self.on_event:
+            self.on_event(name, time.time(), dict(info, interaction=interaction))
+
+    def record_phase(self, name, start):
+        duration = time.time() - start
+        self.startup_phases.append((name, duration))
+        print(f"[Startup] {name}: {duration*1000:.0f} ms (t+{time.time() - self.startup_start:.2f}s)")
+
+    def ensure_whisper(self):
+        """Starts loading Whisper in the background, once (a text-only engine only does it on demand)."""
+        with self.whisper_loading_lock:
+            if self.whisper_loading:
+                return
+            self.whisper_loading = True
+            self.whisper_failed = None
+        threading.Thread(target=self.load_whisper, daemon=True).start()
+
+    def whisper_load_failed(self, error):
+        print(f"Whisper model error: {error}")
+        self.signal_error.emit(f"Whisper model error: {error}")
+        with self.whisper_loading_lock:
+            self.whisper_failed = str(error) or type(error).__name__
+            self.whisper_loading = False
+
+    def wait_whisper(self, timeout):
+        """Waits for Whisper to be loaded, raises RuntimeError if it isn't (or can't be)."""
+        deadline = time.time() + timeout
+        while not self.whisper_ready.wait(0.1):
+            if self.whisper_failed:
+                raise RuntimeError(f"Whisper could not be loaded: {self.whisper_failed}")
+            if time.time() > deadline:
+                raise RuntimeError("Whisper is not loaded")
+
+    def load_whisper(self):
+        """Imports and loads Whisper (torch...) in parallel with the Vosk/audio startup."""
+        if ASR_OUT_OF_PROCESS:
+            # The model lives in its own process, restarted if it dies
+            start = time.time()
+            errors = []
+            def on_error(error):
+                errors.append(error)
+                if self.whisper_ready.is_set(): # Died later and can't be restarted
+                    self.signal_error.emit(f"Whisper model error: {error}")
+            client = ASRClient(WHISPER_MODEL, max_seconds=AUDIO_BUFFER_SECONDS, on_error=on_error,
+                               engine=ASR_ENGINE, compute_type=ASR_COMPUTE_TYPE, max_rtf=ASR_MAX_RTF)
+            client.start()
+            while not client.ready.wait(0.5):
+                # The client gave up starting the worker, or the model takes forever to load
+                if errors or time.time() - start > WHISPER_LOAD_TIMEOUT:
+                    client.close()
+                    self.whisper_load_failed(errors[0] if errors else f"not loaded after {WHISPER_LOAD_TIMEOUT} s")
+                    return
+            self.record_phase("whisper worker process", start)
+            self.whisper_model = client
+            self.whisper_ready.set()
+            print(f"Whisper ready ({time.time() - self.startup_start:.2f}s after start)")
+            return
+        try:
+            start = time.time()
+            # 'base' is a good speed/accuracy compromise, 'small' is better but slower,
+            # 'tiny' is very fast but less accurate ("auto" picks for this machine)
+            model = load_backend(ASR_ENGINE, WHISPER_MODEL, ASR_COMPUTE_TYPE, ASR_MAX_RTF)
+            self.record_phase("whisper model", start)
+        except Exception as e:
+            self.whisper_load_failed(e)
+            return
+        self.whisper_model = model
+        self.whisper_ready.set()
+        print(f"Whisper ready ({time.time() - self.startup_start:.2f}s after start)")
 
     def run(self):
         print("Worker thread started")
+        self.start_engine()
         self.listen_and_process()
 
-    def run_claude_async(self, full_prompt, command_part):
-        """Runs Claude in a separate thread to avoid blocking listening."""
-        global conversation_history # Ensure global access
-        self.is_processing_llm = True
+    def start_engine(self):
+        """Everything but the microphone: project index, Claude session (text-only engines stop here)."""
+        self.startup_start = time.time()
+        project_index.start() # Crawls (or refreshes) the project folders in the background
+        # Spawn the Claude session now, it warms up while the models load
         try:
-            self.current_llm_process = subprocess.Popen(
-                ["claude", "-p", "--dangerously-skip-permissions", full_prompt], 
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                stdin=subprocess.DEVNULL,
-                text=True,
-                bufsize=1
-            )
-            
+            self.llm.start()
+        except Exception as e:
+            print(f"LLM backend warm-up error: {e}")
+
+    def run_claude_async(self, token, full_prompt, command_part, interaction=None, cache_key=None, queued_at=None,
+                         speculation=None):
+        """Runs Claude on the scheduler's thread (listening goes on).
+
+        Every side effect (signals, commands, history) is preceded by token.check(): once the
+        request is cancelled, superseded or past its deadline, nothing of its answer comes out.
+        A speculative request holds its side effects back until it is committed (speculation.py).
+        """
+        effect = speculation.run if speculation else run_now
+        emit_partial = self.signal_partial_response.emit # Same object each time: held partials replace each other
+        self.emitting.interaction = interaction # A superseded answer's late events keep their own ID
+        try:
+            if queued_at is not None:
+                tracer.record("llm_queue", time.time() - queued_at, interaction)
+            token.check()
+            token.on_cancel(self.llm.cancel) # Kills the process, the hot spare takes over
             response = ""
-            # Read line by line (allows killing the process cleanly if needed)
-            for line in self.current_llm_process.stdout:
-                print(line, end='')
-                response += line
-                
-            self.current_llm_process.wait()
-            
-            if self.current_llm_process.returncode == 0:
-                clean_response = response.strip()
-                
+            last_partial = 0.0
+            exec_pos = 0 # Everything before this offset has been scanned for [EXEC: ...]
+            start_time = time.time()
+            self.mark("llm_start", interaction, speculative=speculation is not None)
+            # Streamed chunk by chunk (the backend can be cancelled at any time)
+            for chunk in self.llm.stream(command_part, full_prompt):
+                token.check()
+                if not response:
+                    print(f"[First token after {(time.time() - start_time)*1000:.0f} ms]")
+                    tracer.record("llm_first_token", time.time() - start_time, interaction)
+                    effect(self.mark, "first_token", interaction)
+                print(chunk, end='')
+                response += chunk
+                if speculation:
+                    speculation.response = response
+                # Throttled here, not in the GUI: every emit queues a copy of the whole answer
+                if time.time() - last_partial >= PARTIAL_EMIT_INTERVAL:
+                    effect(emit_partial, response, replace=True)
+                    last_partial = time.time()
+
                 # --- LLM COMMAND PARSING AND EXECUTION ---
-                if "[EXEC:" in clean_response:
-                    import re
-                    # Regex to capture [EXEC: command]
-                    commands = re.findall(r"\[EXEC:\s*(.*?)\]", clean_response)
-                    for cmd in commands:
-                        print(f"Executing LLM command: {cmd}")
-                        # Use hyprctl dispatch exec to ensure opening on the active workspace
-                        try:
-                            subprocess.Popen(["hyprctl", "dispatch", "exec", cmd])
-                        except Exception as e:
-                            print(f"LLM execution error: {e}")
-                    
-                    # Clean the response for display (optional, we can leave the explanatory text)
-                    # clean_response = re.sub(r"\[EXEC:.*?\]", "", clean_response).strip()
+                # Dispatched as soon as the closing bracket arrives, not after the full answer
+                for match in EXEC_PATTERN.finditer(response, exec_pos):
+                    effect(self.traced_exec, match.group(1), interaction)
+                    exec_pos = match.end()
+            print()
+            token.check()
 
-                conversation_history.append(("User", command_part))
-                conversation_history.append(("Claude", clean_response))
-                save_history(conversation_history)
-                self.signal_finished.emit(clean_response)
-            else:
-                # If killed or error
-                print("Claude process terminated with code", self.current_llm_process.returncode)
-                # If it was terminated by user, we already emitted "Cancelled."
-                if self.current_llm_process.returncode != -9: # -9 is SIGKILL
-                    self.signal_error.emit(f"Claude terminated with an error: {self.current_llm_process.returncode}")
+            clean_response = response.strip()
+            # Clean the response for display (optional, we can leave the explanatory text)
+            # clean_response = EXEC_PATTERN.sub("", clean_response).strip()
+            tracer.record("llm_complete", time.time() - start_time, interaction, chars=len(clean_response))
+            if speculation:
+                speculation.completed = True
+                speculation.finished = time.time()
 
+            def complete():
+                conversation_history.append_turn(command_part, clean_response) # Written in the background
+                prompt_builder.add_turn(command_part, clean_response)
+                self.mark("llm_done", interaction)
+                self.signal_finished.emit(clean_response)
+                response_cache.put(cache_key, clean_response) # After the answer is out, saved in the background
+            token.check() # Superseded since the last chunk: not a word of it comes out
+            effect(complete)
 
+        except (LLMCancelled, RequestCancelled):
+            # Cancelled by the user (we already emitted "Cancelled."), superseded or too slow
+            reason = token.reason or "cancelled"
+            print(f"Claude request {reason}")
+            self.mark("llm_cancelled", interaction, reason=reason)
+            if reason == "timeout":
+                effect(self.signal_error.emit, f"Claude did not answer within {LLM_TIMEOUT} s")
+        except LLMError as e:
+            print(f"Claude error: {e}")
+            if not token.cancelled: # A killed process errors out too, that's not news
+                effect(self.signal_error.emit, str(e))
         except Exception as e:
             print(f"Claude thread error: {e}")
-            self.signal_error.emit(str(e))
+            if not token.cancelled:
+                effect(self.signal_error.emit, str(e))
         finally:
-            self.is_processing_llm = False
-            self.current_llm_process = None
+            if speculation and speculation.finished is None:
+                speculation.finished = time.time()
+            effect(tracer.finish, interaction) # A discarded speculation leaves the interaction to the listening loop
+            self.emitting.interaction = None
+
+    def traced_exec(self, cmd, interaction=None):
+        with tracer.span("exec_dispatch", interaction):
+            self.dispatch_exec(cmd)
+
+    def speculate(self, command):
+        """Starts Claude on a dictation buffer that looks finished, before the trigger."""
+        command = clean_command(command)
+        cache_key = response_cache.key(command, conversation_history.recent(2))
+        if intent_matcher.match(command) or response_cache.get(cache_key):
+            return None # Fast track or cache: nothing to gain
+        speculation = Speculation(command)
+        full_prompt = prompt_builder.build(command)
+        interaction, queued_at = self.interaction, time.time()
+        print(f"[Speculating]: {command}")
+        # Never cancels a real request (a typed command...), queues behind it; any real submit supersedes it
+        speculation.request = self.scheduler.submit(
+            lambda token: self.run_claude_async(token, full_prompt, command, interaction, cache_key, queued_at, speculation),
+            timeout=LLM_TIMEOUT, supersede=False, name="speculation", background=True)
+        return speculation
+
+    def discard_speculation(self, speculation):
+        """The user said something else: cancels the speculative answer and counts the waste."""
+        speculation.request.token.cancel("discarded")
+        speculation.request.wait(2)
+        if speculation.completed:
+            self.llm.cancel() # The warm session heard that turn: start the next request cold
+        self.speculation_stats.miss(speculation)
+        tracer.record("speculation_wasted", speculation.compute_seconds(), self.interaction, chars=len(speculation.response))
+        self.mark("speculation_miss")
+        print(f"[Speculation discarded] {self.speculation_stats.summary()}")
+
+    def launch(self, args):
+        """Starts an application (or only prints it in dry-run mode)."""
+        if self.dry_run:
+            print(f"[Dry run] {' '.join(args)}")
+            return
+        launcher.launch(args) # Queued: returns right away (LaunchDropped if the queue is full)
+
+    def dispatch_exec(self, cmd):
+        print(f"Executing LLM command: {cmd}")
+        if self.dry_run:
+            print(f"[Dry run] {cmd}")
+            return
+        try:
+            launcher.run_shell(cmd) # Tracked like the apps: asked twice, focused the second time
+        except LaunchDropped as e:
+            print(e)
+            self.signal_error.emit(str(e))
+
+    def run_intent(self, match):
+        """Executes a fast-track intent, returns the message to display (None = let Claude handle it)."""
+        intent = match.intent
+        try:
+            if intent.kind == "app":
+                self.launch(intent.exec)
+                return intent.message
+            if intent.kind == "url":
+                self.launch([BROWSER, intent.url])
+                return intent.message
 
-    def process_command(self, command_part):
-        global conversation_history
+            # --- Project Search (Fast Track) ---
+            if intent.kind == "project":
+                keyword = match.rest # Everything after "project" or "folder"
+                if not keyword:
+                    return None
+                if project_index.ready.is_set():
+                    # In-memory fuzzy lookup, the index is kept fresh in the background
+                    path = project_index.find(keyword)
+                else:
+                    # First crawl still running: search the disk like before
+                    self.signal_processing.emit(f"Searching for '{keyword}'...")
+                    pattern = "*" + keyword.replace(" ", "*") + "*"
+                    find_cmd = ["find"] + project_index.roots + ["-maxdepth", str(project_index.max_depth), "-type", "d", "-iname", pattern, "-print", "-quit"]
+                    result = subprocess.run(find_cmd, capture_output=True, text=True)
+                    path = result.stdout.strip()
+                if path:
+                    self.launch(["code", path])
+                    return f"Project {keyword} opened"
+                # If not found, let Claude handle it
+        except LaunchDropped:
+            raise
+        except Exception as e:
+            print(f"Fast track error ({intent.name}): {e}")
+        return None
+
+    def process_command(self, command_part, speculation=None, interaction=None):
+        interaction = interaction or self.interaction
         self.signal_processing.emit(command_part)
         
-        # --- FAST TRACK (Immediate Execution without LLM) ---
-        cmd_lower = command_part.lower()
+        # --- SPECULATION (Claude already asked while waiting for the trigger) ---
+        if speculation:
+            if speculation.matches(command_part) and not speculation.request.token.cancelled:
+                self.speculation_stats.hit(speculation)
+                self.mark("speculation_hit", interaction)
+                print(f"[Speculation hit] {self.speculation_stats.summary()}")
+                speculation.request.background = False # Now a normal request (interruptible...)
+                speculation.commit() # Shows what already arrived, runs the held [EXEC: ...]
+                return "Processing...", False
+            self.discard_speculation(speculation)
         
-        # ... (Fast Track code unchanged) ...
+        # --- FAST TRACK (Immediate Execution without LLM) ---
         # For opening actions, we close the window after (keep_open=False)
-        if "open" in cmd_lower or "launch" in cmd_lower:
-            if "firefox" in cmd_lower:
-                subprocess.Popen(["firefox"])
-                self.signal_finished.emit("Firefox launched")
-                return "Firefox launched", False
-            elif "code" in cmd_lower or "vs code" in cmd_lower:
-                subprocess.Popen(["code"])
-                self.signal_finished.emit("VS Code launched")
-                return "VS Code launched", False
-            elif "terminal" in cmd_lower or "console" in cmd_lower:
-                subprocess.Popen(["kitty"]) 
-                self.signal_finished.emit("Terminal launched")
-                return "Terminal launched", False
-            elif "files" in cmd_lower or "nautilus" in cmd_lower or "folder" in cmd_lower:
-                subprocess.Popen(["nautilus"])
-                self.signal_finished.emit("Files launched")
-                return "Files launched", False
-            
-            # --- Common Websites (Fast Track) ---
-            elif "youtube" in cmd_lower:
-                subprocess.Popen(["firefox", "https://youtube.com"])
-                self.signal_finished.emit("YouTube opened")
-                return "YouTube opened", False
-            elif "google" in cmd_lower:
-                subprocess.Popen(["firefox", "https://google.com"])
-                self.signal_finished.emit("Google opened")
-                return "Google opened", False
-            elif "github" in cmd_lower:
-                subprocess.Popen(["firefox", "https://github.com"])
-                self.signal_finished.emit("GitHub opened")
-                return "GitHub opened", False
-            elif "chatgpt" in cmd_lower or "openai" in cmd_lower:
-                subprocess.Popen(["firefox", "https://chat.openai.com"])
-                self.signal_finished.emit("ChatGPT opened")
-                return "ChatGPT opened", False
-            elif "amazon" in cmd_lower:
-                subprocess.Popen(["firefox", "https://amazon.fr"])
-                self.signal_finished.emit("Amazon opened")
-                return "Amazon opened", False
-            elif "wikipedia" in cmd_lower:
-                subprocess.Popen(["firefox", "https://fr.wikipedia.org"])
-                self.signal_finished.emit("Wikipedia opened")
-                return "Wikipedia opened", False
-            
-            # --- Generic website attempt ---
-            elif ".com" in cmd_lower or ".fr" in cmd_lower or ".org" in cmd_lower or ".net" in cmd_lower:
-                words = cmd_lower.split()
-                for w in words:
-                    if "." in w and len(w) > 4:
-                        url = w if w.startswith("http") else f"https://{w}"
-                        subprocess.Popen(["firefox", url])
-                        self.signal_finished.emit(f"Site {w} opened")
-                        return f"Site {w} opened", False
-
-            # --- Project Search (Fast Track) ---
-            elif "open the project" in cmd_lower or "open the folder" in cmd_lower:
-                # Extract the name (everything after "project" or "folder")
-                keyword = ""
-                if "project" in cmd_lower:
-                    keyword = cmd_lower.split("project")[-1].strip()
-                elif "folder" in cmd_lower:
-                    keyword = cmd_lower.split("folder")[-1].strip()
-                
-                if keyword:
-                    self.signal_processing.emit(f"Searching for '{keyword}'...")
-                    # Search in the home directory (max depth 4 for speed)
-                    # We search for a FOLDER that contains the keyword
-                    find_cmd = ["find", "/home/yusua", "-maxdepth", "4", "-type", "d", "-iname", f"*{keyword}*", "-print", "-quit"]
-                    try:
-                        result = subprocess.run(find_cmd, capture_output=True, text=True)
-                        path = result.stdout.strip()
-                        if path:
-                            subprocess.Popen(["code", path])
-                            self.signal_finished.emit(f"Project {keyword} opened")
-                            return f"Project {keyword} opened", False
-                        else:
-                            # If not found, let Claude handle it or state it
-                            pass 
-                    except Exception as e:
-                        print(f"Find error: {e}")
+        with tracer.span("fast_track", interaction):
+            match = intent_matcher.match(command_part)
+            try:
+                message = self.run_intent(match) if match else None
+            except LaunchDropped as e: # Not "X launched" for an app that won't start
+                print(e)
+                self.signal_error.emit(str(e))
+                return str(e), False
+        if message:
+            self.mark("intent", interaction, intent=match.intent.name)
+            self.signal_finished.emit(message)
+            return message, False
         # -------------------------------------------------
         
-        # Build prompt with history
-        history_text = ""
-        if conversation_history:
-            history_text = "Conversation history:\n"
-            for role, msg in conversation_history[-20:]: 
-                history_text += f"{role}: {msg}\n"
-            history_text += "\n"
+        # --- RESPONSE CACHE (same question as before: no Claude round trip) ---
+        with tracer.span("response_cache", interaction):
+            cache_key = response_cache.key(command_part, conversation_history.recent(2))
+            cached = response_cache.get(cache_key)
+        if cached:
+            print(f"[Cache hit]: {cached}")
+            self.mark("cache_hit", interaction)
+            conversation_history.append_turn(command_part, cached)
+            prompt_builder.add_turn(command_part, cached)
+            self.llm.note_turn(command_part, cached) # So that "and in Osaka?" still has its context
+            self.signal_finished.emit(cached)
+            tracer.finish(interaction)
+            return "Processing...", False # Same exit as a (very fast) Claude answer
         
-        system_prompt = (
-            "You are Claude, a voice assistant on Linux. "
-            "Respond concisely. "
-            "You have access to the conversation history above. "
-            "If the user asks you to open an application or website that you can't do directly, "
-            "respond with the EXACT format: [EXEC: linux_command]. "
-            "Example: To open Firefox, write [EXEC: firefox]. "
-            "Example: To open a site, write [EXEC: firefox https://site.com]."
-        )
-        
-        full_prompt = f"{system_prompt}\n\n{history_text}User: {command_part}"
+        prompt_start = time.perf_counter()
+        # System prompt + summary of older turns + recent history, within the token budget
+        full_prompt = prompt_builder.build(command_part)
+        tracer.record("prompt_build", time.perf_counter() - prompt_start, interaction, chars=len(full_prompt))
         print(f"[PROMPT]: {full_prompt}")
         
-        # ASYNCHRONOUS launch
-        t = threading.Thread(target=self.run_claude_async, args=(full_prompt, command_part))
-        t.start()
+        # ASYNCHRONOUS launch: queued on the scheduler's executor
+        queued_at = time.time()
+        self.scheduler.submit(
+            lambda token: self.run_claude_async(token, full_prompt, command_part, interaction, cache_key, queued_at),
+            timeout=LLM_TIMEOUT, name=command_part[:40])
         
         return "Processing...", False # Exit the listening loop
 
+    def submit_text(self, text):
+        """A typed or scripted command (engine API): no wake word, no ASR.
+
+        Returns (message, interaction ID): the events of its answer carry that ID.
+        """
+        interaction = tracer.begin()
+        self.emitting.interaction = interaction
+        try:
+            self.mark("command", interaction, text=text)
+            response_text, keep_open = self.process_command(text, interaction=interaction)
+        finally:
+            self.emitting.interaction = None
+        if response_text != "Processing...":
+            tracer.finish(interaction) # Fast track: nobody else ends it
+        return response_text, interaction
+
+    def submit_audio(self, pcm, timeout=60):
+        """A recorded command (16 kHz mono int16 bytes, engine API): transcribed, then like submit_text."""
+        self.ensure_whisper()
+        self.wait_whisper(timeout)
+        with transcription_lock(self.whisper_model):
+            result = transcribe_frames(self.whisper_model, [pcm])
+        text = clean_command(WAKE_WORD_PREFIX.sub("", result["text"].strip()))
+        if text:
+            self.signal_recognized.emit(text)
+            self.submit_text(text)
+        return text
+
+    def cancel_llm(self, reason="interrupted"):
+        """Stops the Claude answer in progress (and the queued ones)."""
+        self.scheduler.cancel_all(reason) # Kills the process, the hot spare takes over
+        self.signal_finished.emit("Cancelled.")
+
     def listen_and_process(self):
+        # Whisper (and torch) take seconds to import and load: in the background
+        self.ensure_whisper()
+
         # Initialize Vosk for the keyword (LOCAL and FAST)
-        from vosk import Model, KaldiRecognizer
-        import json
-        import pyaudio
-        import whisper
-        import soundfile as sf
+        start = time.time()
+        from vosk import Model
         import numpy as np
-        import tempfile
-        import os
-        import wave
+        self.record_phase("vosk import", start)
         
         print("Loading Vosk model (Wake Word)...")
+        start = time.time()
         try:
             model = Model("models/fr")
-            rec = KaldiRecognizer(model, 16000)
+            # Small grammars instead of the full vocabulary, each one only runs when needed
+            wake_spotter = KeywordSpotter(model, WAKE_PHRASES, KEYWORD_CONFIDENCE) # Waiting for "Claude"
+            interrupt_spotter = KeywordSpotter(model, STOP_PHRASES + ["ok claude"], KEYWORD_CONFIDENCE) # While Claude answers
+            trigger_spotter = KeywordSpotter(model, TRIGGER_PHRASES, KEYWORD_CONFIDENCE) # While dictating
+            wake_verifier = WakeVerifier(model, WAKE_PHRASES, WAKE_VERIFY_THRESHOLD) if WAKE_VERIFY_THRESHOLD > 0 else None
         except Exception as e:
             self.signal_error.emit(f"Vosk model error: {e}")
             return
+        self.record_phase("vosk model", start)
 
-        print("Loading Whisper model (Transcription)...")
+        start = time.time()
         try:
-            # We use the 'base' model which is a good speed/accuracy compromise
-            # 'small' is better but slower. 'tiny' is very fast but less accurate.
-            whisper_model = whisper.load_model("base")
+            stream = self.audio_source.open()
         except Exception as e:
-            self.signal_error.emit(f"Whisper model error: {e}")
+            self.signal_error.emit(f"Audio input error: {e}")
             return
-
-        p = pyaudio.PyAudio()
-        stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8000)
-        stream.start_stream()
+        # Only the capture thread reads the stream: nothing is lost while Whisper or Vosk are busy
+        self.capture = AudioCapture(stream, chunk=1000, seconds=AUDIO_BUFFER_SECONDS)
+        self.capture.start()
+        reader = self.capture.reader()
+        vad = make_vad(VAD_KIND, hangover_ms=VAD_HANGOVER_MS)
+        self.record_phase("audio stream", start)
         
-        print("Ready (Vosk + Whisper)!")
+        print(f"Ready (Vosk)! Wake word active {time.time() - self.startup_start:.2f}s after start, Whisper still loading in the background")
         
         while True:
             print("Waiting for wake word 'Claude' (Local)...")
+            self.interaction = None
             
             # 1. WAITING FOR WAKE WORD (Always with Vosk for speed)
             while True:
-                data = stream.read(2000, exception_on_overflow=False)
-                if rec.AcceptWaveform(data):
-                    rec.Result() # IMPORTANT: Empty the buffer to avoid memory saturation
-                else:
-                    partial = json.loads(rec.PartialResult())
-                    partial_text = partial.get("partial", "")
-                    if partial_text and "claude" in partial_text.lower():
-                        print(f"Wake Word: {partial_text}")
-                        rec.Reset()
-                        break
+                chunk = reader.read(2000)
+                if not len(chunk):
+                    print("Audio capture stopped")
+                    self.audio_source.close()
+                    return
+                vad.feed(chunk) # Keeps the noise floor up to date
+                wake_phrase = wake_spotter.feed(chunk.tobytes())
+                if wake_phrase and wake_verifier:
+                    # Confirmed on the last seconds of audio before anything visible or costly starts,
+                    # the post-roll included so that the last phoneme isn't cut off
+                    vad.feed(reader.read(int(WAKE_VERIFY_POSTROLL * SAMPLE_RATE)))
+                    verify_start = time.perf_counter()
+                    window_start = max(reader.position - int(WAKE_VERIFY_SECONDS * SAMPLE_RATE), self.capture.ring.oldest)
+                    accepted, score = wake_verifier.verify(self.capture.ring.read(window_start, reader.position).tobytes())
+                    verify_time = time.perf_counter() - verify_start
+                    if not accepted:
+                        print(f"Wake word rejected (score {score:.2f}, {wake_verifier.rejected}/{wake_verifier.candidates} "
+                              f"rejected, {wake_verifier.cpu_seconds:.1f}s CPU spent verifying)")
+                        self.mark("wake_rejected", score=score, position=reader.position)
+                        wake_spotter.reset()
+                        continue
+                if wake_phrase:
+                    print(f"Wake Word: {wake_phrase}")
+                    self.ensure_whisper() # Retries a Whisper that failed to load
+                    self.interaction = tracer.begin()
+                    # How far behind the live microphone the detection happened
+                    tracer.record("wake_word", (self.capture.ring.position - reader.position) / SAMPLE_RATE, self.interaction)
+                    if wake_verifier:
+                        tracer.record("wake_verify", verify_time, self.interaction, score=score)
+                    self.mark("wake", position=reader.position)
+                    wake_spotter.reset()
+                    break
+            utterance_start = max(reader.position - int(PREROLL_SECONDS * SAMPLE_RATE), self.capture.ring.oldest)
             
             # 2. CONVERSATION LOOP
             in_conversation = True
             command_buffer = "" # Buffer to accumulate text (Dictation Mode)
+            pending_frames = [] # Utterances captured before Whisper was ready (copies)
+            capture_stopped = False # End of a replayed file (or the microphone went away)
+            handed_over = False # The LLM thread ends the traced interaction
+            speculation = None # Claude asked ahead of the trigger (SPECULATIVE_PREFETCH)
             
             while in_conversation:
                 # IMPORTANT: Signal that we're listening at each loop iteration
@@ -287,108 +841,168 @@ class AudioWorker(QThread):
                 print("Listening for command (Conversation)...")
                 
                 command_text = ""
-                start_listen_time = time.time()
-                last_partial = ""
-                last_change_time = time.time()
+                # Timings use the audio clock: after a slow Whisper pass we catch up on
+                # buffered audio faster than real time, wall-clock silence would be wrong
+                start_listen_time = reader.seconds
+                vad.reset()
                 
-                # Audio buffer for Whisper
-                audio_frames = []
+                # Audio for Whisper: ring buffer positions [utterance_start, reader.position)
+                if utterance_start is None:
+                    utterance_start = reader.position
                 
-                rec.Reset()
+                # Background transcription while the user is speaking
+                transcriber = None
+                if STREAMING_TRANSCRIPTION and self.whisper_ready.is_set():
+                    def on_partial(text, buffer=command_buffer):
+                        if text and not self.is_processing_llm:
+                            self.signal_recognized.emit((buffer + " " + text).strip() + "...")
+                    transcriber = StreamingTranscriber(self.whisper_model, on_partial=on_partial)
+                    # Pre-roll: the wake word, not yet a reason for a pass
+                    transcriber.feed(self.capture.ring.read(utterance_start, reader.position).tobytes(), speech=False)
+                
+                interrupt_spotter.reset()
+                trigger_spotter.reset()
+                spotted_trigger = None # "Envoyer" heard by the trigger spotter: no need to wait for the whole hangover
+                trigger_frames = 0 # vad.speech_frames when it was heard
+                ended_by_silence = False
                 
                 while True:
-                    data = stream.read(1000, exception_on_overflow=False)
-                    audio_frames.append(data) # Record everything
+                    chunk = reader.read(1000)
+                    if not len(chunk):
+                        capture_stopped = True
+                        break
+                    data = chunk.tobytes()
                     
-                    # Use Vosk ONLY for VAD (Voice Activity Detection)
-                    # and for quick interruptions (Thanks/Stop)
-                    if rec.AcceptWaveform(data):
-                        # Ignore Vosk final result, we just want to know it's finished
-                        pass
-                    else:
-                        partial_json = json.loads(rec.PartialResult())
-                        partial = partial_json.get("partial", "")
+                    # End of speech: cheap VAD on every chunk (hangover = silence that ends the sentence)
+                    speech_frames = vad.speech_frames
+                    speech_ended = vad.feed(chunk)
+                    if transcriber:
+                        transcriber.feed(data, speech=vad.speech_frames > speech_frames)
+                    if speech_ended:
+                        print(f"VAD end (Silence detected, {vad.silence_duration:.1f}s)")
+                        tracer.record("vad", vad.silence_duration, self.interaction) # Hangover it waited for
+                        self.mark("speech_end", position=reader.position)
+                        ended_by_silence = True
+                        break
+                    
+                    # Vosk only runs on speech: stop words while the LLM answers, triggers while dictating
+                    speaking = vad.in_speech or vad.speech_run > 0 # speech_run: the onset chunk too
+                    if self.is_processing_llm and speaking:
+                        heard = interrupt_spotter.feed(data)
                         
-                        if partial:
-                            if partial != last_partial:
-                                last_partial = partial
-                                last_change_time = time.time()
-                                # print(f"Vosk partial (VAD): {partial}")
-                                
-                                # INTERRUPTION DURING PROCESSING (Absolute Priority)
-                                if self.is_processing_llm:
-                                    check_interrupt = partial.lower()
-                                    if "thanks" in check_interrupt or "stop" in check_interrupt or "ok claude" in check_interrupt:
-                                        print("INTERRUPTION DETECTED!")
-                                        if self.current_llm_process:
-                                            self.current_llm_process.terminate()
-                                            self.current_llm_process = None
-                                        self.is_processing_llm = False
-                                        self.signal_finished.emit("Cancelled.")
-                                        time.sleep(0.5)
-                                        if "thanks" in check_interrupt or "stop" in check_interrupt:
-                                            in_conversation = False
-                                            self.signal_error.emit("STOP_OVERLAY")
-                                            break
-                                        rec.Reset()
-                                        last_partial = ""
-                                        audio_frames = [] # Reset audio
-                                        continue
-
-                            else:
-                                # VAD: 1.2s of silence = end of sentence
-                                if time.time() - last_change_time > 1.2:
-                                    print("VAD end (Silence detected)")
-                                    break
+                        # INTERRUPTION DURING PROCESSING (Absolute Priority)
+                        if heard:
+                            print(f"INTERRUPTION DETECTED! ({heard})")
+                            self.cancel_llm()
+                            time.sleep(0.5)
+                            if heard in STOP_PHRASES:
+                                in_conversation = False
+                                self.signal_error.emit("STOP_OVERLAY")
+                                break
+                            interrupt_spotter.reset()
+                            vad.reset()
+                            utterance_start = reader.position # Reset audio
+                            if transcriber:
+                                transcriber.reset()
+                            continue
+                    
+                    elif spotted_trigger:
+                        # A trigger only ends the sentence if the user stops talking after it
+                        if (vad.speech_frames - trigger_frames) * vad.frame_seconds * 1000 > TRIGGER_TAIL_MS:
+                            print(f"Trigger spotted mid-sentence, ignored: {spotted_trigger}")
+                            spotted_trigger = None
+                            trigger_spotter.reset()
+                        elif vad.silence_duration * 1000 >= TRIGGER_SILENCE_MS:
+                            print(f"Trigger confirmed by silence: {spotted_trigger}")
+                            self.mark("speech_end", position=reader.position)
+                            break
+                    
+                    elif speaking and not self.is_processing_llm:
+                        spotted_trigger = trigger_spotter.feed(data)
+                        if spotted_trigger:
+                            print(f"Trigger spotted: {spotted_trigger}")
+                            trigger_frames = vad.speech_frames
                     
                     # Timeout: 20s max
-                    if time.time() - start_listen_time > 20:
+                    if reader.seconds - start_listen_time > 20:
                         print("Listening timeout")
                         break
+
+                    # Whisper just finished loading (or failed to): transcribe the queue unless the user is speaking
+                    if pending_frames and not vad.in_speech and (self.whisper_ready.is_set() or self.whisper_failed):
+                        break
                 
+                tracer.record("capture", reader.seconds - start_listen_time, self.interaction)
+
                 # If we broke the loop due to a "Thanks" interruption, exit
                 if not in_conversation:
+                    if transcriber:
+                        transcriber.cancel()
                     break
 
+                # Zero-copy view on the ring buffer (the next utterance starts here)
+                audio_frames = self.capture.ring.read(utterance_start, reader.position)
+                utterance_start = None
+
+                if not vad.heard_speech:
+                    audio_frames = audio_frames[:0] # Only silence or noise: nothing for Whisper
+                if self.whisper_failed and (len(audio_frames) or pending_frames):
+                    # Nobody will ever transcribe them: say so and end the conversation
+                    print(f"Whisper failed to load, {len(pending_frames) + bool(len(audio_frames))} utterance(s) dropped")
+                    pending_frames = []
+                    if transcriber:
+                        transcriber.cancel()
+                    self.signal_error.emit(f"Speech recognition unavailable: {self.whisper_failed}")
+                    in_conversation = False
+                    break
+                # Whisper still loading: queue what was said (in order) and keep listening
+                if len(audio_frames) and not self.whisper_ready.is_set():
+                    print("Whisper not ready yet, utterance queued")
+                    pending_frames.append(audio_frames.copy()) # The ring will overwrite it
+                    audio_frames = audio_frames[:0]
+                elif pending_frames:
+                    audio_frames = np.concatenate(pending_frames + [audio_frames])
+                    pending_frames = []
+                    if transcriber:
+                        transcriber.cancel() # It only heard the last part
+                        transcriber = None
+
                 # WHISPER TRANSCRIPTION
-                if audio_frames:
+                if len(audio_frames):
                     print("Whisper transcription in progress...")
-                    # Temporary WAV save
-                    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_wav:
-                        temp_wav_path = temp_wav.name
-                    
+                    end_of_speech = time.time()
                     try:
-                        # Write WAV file
-                        wf = wave.open(temp_wav_path, 'wb')
-                        wf.setnchannels(1)
-                        wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-                        wf.setframerate(16000)
-                        wf.writeframes(b''.join(audio_frames))
-                        wf.close()
-                        
-                        # Transcription
-                        result = whisper_model.transcribe(temp_wav_path, fp16=False, language='fr') # French language for transcription
-                        # Note: fp16=False to avoid CPU warning
-                        
-                        command_text = result["text"].strip()
-                        print(f"Whisper heard: {command_text}")
-                        
+                        with tracer.span("transcription", self.interaction, streaming=transcriber is not None):
+                            if transcriber:
+                                # Only the uncommitted tail is left to decode
+                                command_text = transcriber.finalize()
+                            else:
+                                with transcription_lock(self.whisper_model):
+                                    result = transcribe_frames(self.whisper_model, audio_frames)
+                                command_text = result["text"].strip()
+                        command_text = WAKE_WORD_PREFIX.sub("", command_text)
+                        print(f"Whisper heard: {command_text} ({(time.time() - end_of_speech)*1000:.0f} ms after end of speech)")
+                        self.mark("transcribed", text=command_text)
+                        if self.record_asr_sample and command_text and len(audio_frames) >= AUTO_RECORD_SECONDS * WHISPER_SAMPLE_RATE:
+                            self.record_asr_sample = False
+                            save_benchmark_sample(audio_frames)
                     except Exception as e:
                         print(f"Whisper Transcription Error: {e}")
-                    finally:
-                        if os.path.exists(temp_wav_path):
-                            os.remove(temp_wav_path)
+                elif transcriber:
+                    transcriber.cancel()
 
                 if command_text:
-                    cmd_lower = command_text.lower()
                     
                     # If processing in progress, ignore (except interruption already handled)
                     if self.is_processing_llm:
                         continue
 
                     # 1. IMMEDIATE STOP COMMAND HANDLING
-                    if "stop" in cmd_lower or "close" in cmd_lower or "thanks" in cmd_lower:
+                    if is_stop_command(command_text):
                         print("Stop command detected.")
+                        if speculation:
+                            self.discard_speculation(speculation)
+                            speculation = None
                         self.signal_finished.emit("Goodbye!")
                         time.sleep(1.5)
                         in_conversation = False
@@ -399,7 +1013,10 @@ class AudioWorker(QThread):
                     
                     # Check for TRIGGER "End Claude" (Priority)
                     # Whisper is more accurate, so we can be stricter on triggers
-                    has_trigger = "end claude" in cmd_lower or "that's all" in cmd_lower or "send" in cmd_lower or "done" in cmd_lower
+                    has_trigger = ends_with_trigger(command_text) or spotted_trigger is not None
+                    if spotted_trigger:
+                        # Whisper's spelling of the trigger, at the end of the sentence
+                        command_text = re.sub(re.escape(spotted_trigger) + r"\W*$", "", command_text, flags=re.IGNORECASE).strip()
                     
                     # Add text to buffer
                     if command_buffer:
@@ -412,30 +1029,24 @@ class AudioWorker(QThread):
                     
                     if has_trigger:
                         # Clean the trigger
-                        final_command = command_buffer
-                        # Smarter cleaning with regex for Whisper which adds punctuation
-                        import re
-                        triggers = ["end claude", "that's all", "send", "done"]
-                        for t in triggers:
-                            final_command = re.sub(t, "", final_command, flags=re.IGNORECASE)
-                        
-                        final_command = final_command.strip()
-                        # Clean final punctuation
-                        final_command = final_command.rstrip(".,!?")
+                        final_command = clean_command(command_buffer)
                         
                         if not final_command:
                             pass 
                         
                         print(f"Command validated (Trigger): {final_command}")
+                        self.mark("command", text=final_command)
                         self.signal_recognized.emit(final_command)
                         
-                        response_text, keep_open = self.process_command(final_command)
+                        response_text, keep_open = self.process_command(final_command, speculation)
                         command_buffer = "" 
+                        speculation = None
                         
                         # SAME EXIT LOGIC
                         if not keep_open:
                             if response_text == "Processing...":
                                 print("LLM launched, exiting listening loop")
+                                handed_over = True
                                 in_conversation = False
                                 break
                             else:
@@ -449,16 +1060,30 @@ class AudioWorker(QThread):
                     else:
                         print(f"Dictation Mode: Accumulating ({len(command_buffer.split())} words)...")
                         # Continue listening AS LONG AS no trigger
+                        if speculation: # The user kept talking: that answer is for another question
+                            self.discard_speculation(speculation)
+                            speculation = None
+                        if SPECULATIVE_PREFETCH and ended_by_silence and looks_complete(command_buffer, SPECULATION_MIN_WORDS):
+                            speculation = self.speculate(command_buffer)
                         
                 else:
                     # Timeout (Nothing heard)
                     if not self.is_processing_llm:
-                        if not command_buffer:
+                        if not command_buffer and not pending_frames:
                             print("Conversation timeout (Empty buffer).")
                             in_conversation = False
                             self.signal_error.emit("STOP_OVERLAY")
                         else:
                             print("Timeout but buffer not empty, waiting more...")
-            
+
+                if capture_stopped and in_conversation:
+                    # Nothing more will come (end of a replay): back to the wake loop, which exits
+                    print("Audio capture stopped during the conversation")
+                    in_conversation = False
+
+            if speculation:
+                self.discard_speculation(speculation)
+            if not handed_over:
+                tracer.finish(self.interaction)
             # End of conversation, reset everything for the next Wake Word
-            rec.Reset()
+            wake_spotter.reset()